@@ -0,0 +1,198 @@
+"""
+Routes reads of selected views to a read replica.
+
+Reads only go to the replica inside ``replica_reads()`` (or views decorated
+with ``read_from_replica``) and on admin pages. A request that writes is
+pinned to the primary for the rest of the request, and for
+DATABASE_REPLICA_PIN_SECONDS afterwards through a cookie, so clients read
+their own writes. Reads also fall back to the primary while the replica
+lags by more than DATABASE_REPLICA_MAX_LAG seconds.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.urls import NoReverseMatch, reverse
+
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE_NAME = 'db_pin_primary'
+
+# 0 when the replica has replayed everything it received; NULL when the
+# server is not a standby, which is treated as no lag.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class RoutingState:
+    __slots__ = ('use_replica', 'pinned', 'wrote')
+
+    def __init__(self, use_replica=False, pinned=False):
+        self.use_replica = use_replica
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Holds a mutable RoutingState so that writes made in a thread spawned by
+# sync_to_async still pin the request that owns it.
+_routing_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def replica_reads():
+    """
+    Sends the reads in the block to the replica, unless the current request
+    has written or the replica lags.
+    """
+    state = _routing_state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _routing_state.set(state)
+    previous = state.use_replica
+    state.use_replica = True
+    try:
+        yield state
+    finally:
+        state.use_replica = previous
+        if token is not None:
+            _routing_state.reset(token)
+
+
+def read_from_replica(view):
+    """
+    Decorator for (sync or async) views and view methods whose reads may be
+    served by the replica.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+    else:
+        @wraps(view)
+        def inner(*args, **kwargs):
+            with replica_reads():
+                return view(*args, **kwargs)
+    return inner
+
+
+class ReplicaLagMonitor:
+    """
+    Measures replica lag at most once per DATABASE_REPLICA_LAG_CHECK_INTERVAL
+    seconds per process, so routing a read rarely costs an extra query.
+    """
+
+    def __init__(self):
+        self._checked_at = None
+        self._lag = None
+
+    def is_lagging(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+            self._lag = self.measure_lag()
+            self._checked_at = now
+        return self._lag is None or self._lag > settings.DATABASE_REPLICA_MAX_LAG
+
+    def reset(self):
+        self._checked_at = None
+
+    @staticmethod
+    def measure_lag():
+        """
+        :return: Replica lag in seconds, or None if the replica cannot be reached
+        """
+        connection = connections[REPLICA_DB_ALIAS]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                row = cursor.fetchone()
+        except DatabaseError:
+            return None
+        return float(row[0] or 0)
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if state is None or not state.use_replica or state.pinned or lag_monitor.is_lagging():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None and model._meta.label not in settings.DATABASE_REPLICA_UNPINNED_MODELS:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Gives every request its own routing state: admin pages read from the
+    replica, and clients that wrote within DATABASE_REPLICA_PIN_SECONDS
+    stay on the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._admin_prefix = None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self._get_state(request)
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self._pin(state, response)
+
+    async def __acall__(self, request):
+        state = self._get_state(request)
+        token = _routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        return self._pin(state, response)
+
+    def _get_state(self, request):
+        if self._admin_prefix is None:
+            try:
+                self._admin_prefix = reverse('admin:index')
+            except NoReverseMatch:
+                self._admin_prefix = ''
+        return RoutingState(
+            use_replica=bool(self._admin_prefix) and request.path.startswith(self._admin_prefix),
+            pinned=PIN_COOKIE_NAME in request.COOKIES,
+        )
+
+    @staticmethod
+    def _pin(state, response):
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE_NAME, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS, httponly=True)
+        return response
@@ -0,0 +1,242 @@
+"""
+Per-request timing split into database, Google API and render phases,
+exposed at /metrics in the Prometheus text format.
+
+Database time comes from an execute wrapper installed on every connection,
+Google time from the Calendar HTTP transports (see track_google_call), and
+render time from the DRF response's render step. What is left of a request
+is reported as the "app" phase. Outside requests the hooks do nothing.
+
+Metrics live in process memory, so every worker exposes its own series.
+"""
+import contextvars
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ('db', 'google', 'render', 'app')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts, made cumulative on render, then sum
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), series):
+                    cumulative += count
+                    bucket_labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {series[-1]:.6f}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+REQUESTS = Counter('schedulease_requests_total', 'Requests handled, by endpoint and status.',
+                   ('endpoint', 'method', 'status'))
+REQUEST_DURATION = Histogram('schedulease_request_duration_seconds', 'Time spent handling requests.',
+                             ('endpoint', 'method'))
+PHASE_DURATION = Histogram('schedulease_request_phase_seconds',
+                           'Time spent per request in the database, the Google API, rendering and the app.',
+                           ('endpoint', 'phase'))
+DB_QUERIES = Counter('schedulease_db_queries_total', 'Database queries run while handling requests.',
+                     ('endpoint',))
+GOOGLE_CALLS = Counter('schedulease_google_calls_total', 'Google API calls made while handling requests.',
+                       ('endpoint',))
+GOOGLE_QUOTA = Counter('schedulease_google_quota_total',
+                       'Google API calls queued, shed or retried after a rate-limit error by the quota governor.',
+                       ('outcome', 'priority'))
+CIRCUIT_TRANSITIONS = Counter('schedulease_circuit_transitions_total',
+                              'Circuit breaker state changes, by breaker and new state.', ('breaker', 'state'))
+METRICS = (REQUESTS, REQUEST_DURATION, PHASE_DURATION, DB_QUERIES, GOOGLE_CALLS, GOOGLE_QUOTA, CIRCUIT_TRANSITIONS)
+
+
+class RequestTiming:
+    __slots__ = ('db_seconds', 'db_queries', 'google_seconds', 'google_calls', 'render_seconds')
+
+    def __init__(self):
+        self.db_seconds = self.google_seconds = self.render_seconds = 0.0
+        self.db_queries = self.google_calls = 0
+
+
+# Holds a mutable RequestTiming so that work done in threads spawned by
+# sync_to_async is charged to the request that owns it.
+_request_timing = contextvars.ContextVar('request_timing', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    timing = _request_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db_seconds += time.perf_counter() - started
+        timing.db_queries += 1
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_query_timer)
+
+
+@contextmanager
+def track_google_call():
+    """
+    Charges the block to the Google phase of the current request. Calls made
+    concurrently each count in full.
+    """
+    timing = _request_timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.google_seconds += time.perf_counter() - started
+        timing.google_calls += 1
+
+
+class RequestTimingMiddleware:
+    """
+    Records the duration of every request and its split into phases. Keep
+    it first in MIDDLEWARE so that the other middleware count as app time.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timing.reset(token)
+        self._record(request, response, timing, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timing.reset(token)
+        self._record(request, response, timing, time.perf_counter() - started)
+        return response
+
+    def process_template_response(self, request, response):
+        # runs right before DRF renders the response
+        timing = _request_timing.get()
+        if timing is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timing.render_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def _record(request, response, timing, duration):
+        match = request.resolver_match
+        endpoint = match.view_name if match is not None else 'unmatched'
+        REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+        REQUEST_DURATION.observe((endpoint, request.method), duration)
+        # queries run while rendering count as both db and render time
+        app_seconds = max(0.0, duration - timing.db_seconds - timing.google_seconds - timing.render_seconds)
+        for phase, seconds in zip(PHASES, (timing.db_seconds, timing.google_seconds,
+                                           timing.render_seconds, app_seconds)):
+            PHASE_DURATION.observe((endpoint, phase), seconds)
+        if timing.db_queries:
+            DB_QUERIES.inc((endpoint,), timing.db_queries)
+        if timing.google_calls:
+            GOOGLE_CALLS.inc((endpoint,), timing.google_calls)
+
+
+def render_metrics():
+    return '\n'.join(line for metric in METRICS for line in metric.render()) + '\n'
+
+
+def metrics_view(request):
+    """
+    Serves the metrics of this process to scrapers that send METRICS_TOKEN
+    as a bearer token. Without a token they are only served under DEBUG.
+    """
+    if settings.METRICS_TOKEN:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                      f'Bearer {settings.METRICS_TOKEN}'.encode())
+    else:
+        allowed = settings.DEBUG
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
 ]
@@ -53,21 +54,27 @@ INSTALLED_APPS = INSTALLED_APPS + PROJECT_APPS
 # JWT settings
 import datetime
 
-JWT_SECRET_KEY = 'your_secret_key'  # Ensure this is secure
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your_secret_key')  # Ensure this is secure
 JWT_ALGORITHM = 'HS256'
 JWT_ACCESS_TOKEN_EXPIRY = datetime.timedelta(minutes=30)
 JWT_REFRESH_TOKEN_EXPIRY = datetime.timedelta(days=7)
+JWT_CLAIMS_CACHE_SIZE = 4096  # verified access tokens remembered per process
 
-# DRF authentication class for future usage
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.BasicAuthentication',
+        'users.api.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'users.api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 MIDDLEWARE = [
+    'SchedulEase.metrics.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'SchedulEase.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -111,6 +118,24 @@ DATABASES = {
     }
 }
 
+# Read replica for slot listings, slot search and the admin. Until
+# DB_REPLICA_HOST is set it points at the primary and no router is installed.
+# Tests get a separate replica database, so routing tests can tell which
+# database a read was served from.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+    'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+    'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"},
+}
+DATABASE_ROUTERS = ['SchedulEase.db_router.ReplicaRouter'] if os.getenv('DB_REPLICA_HOST') else []
+DATABASE_REPLICA_MAX_LAG = 5  # seconds of replay lag before reads fall back to the primary
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = 1  # seconds between lag probes per process
+DATABASE_REPLICA_PIN_SECONDS = 5  # a client that wrote reads from the primary this long
+# Bookkeeping whose writes say nothing about what the client reads back,
+# so writing it does not move a request off the replica.
+DATABASE_REPLICA_UNPINNED_MODELS = ['users.GoogleQuotaBucket']
+
 
 
 
@@ -162,4 +187,59 @@ GOOGLE_TOKEN_FILE = os.path.join(BASE_DIR, 'token.json')
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
 GOOGLE_SCOPE = ['https://www.googleapis.com/auth/calendar']
-
+GOOGLE_TOKEN_URI = 'https://oauth2.googleapis.com/token'
+GOOGLE_API_ROOT_URL = os.getenv('GOOGLE_API_ROOT_URL', 'https://www.googleapis.com/')  # benchmarks point this at a fake server
+GOOGLE_TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=10)  # refresh_google_tokens runs ahead of expiry
+GOOGLE_HTTP_TIMEOUT = 30  # seconds
+GOOGLE_CLIENT_CACHE_SIZE = 256  # cached Calendar services per worker thread
+GOOGLE_CREDENTIALS_CACHE_SIZE = 10000  # users whose Google credentials a worker keeps in memory
+GOOGLE_ASYNC_MAX_CONNECTIONS = 100  # pooled connections to Google per event loop in async views
+GOOGLE_PRELOAD = os.getenv('GOOGLE_PRELOAD', 'false').lower() == 'true'  # import the Google libraries at startup
+# Calendars whose busy times block bookings when a user's calendar is not mirrored
+GOOGLE_BUSY_CALENDAR_IDS = os.getenv('GOOGLE_BUSY_CALENDAR_IDS', 'primary').split(',')
+
+# Free/busy reads get a shorter timeout and a circuit breaker. While it is
+# open, availability is answered from the busy times last read per day.
+GOOGLE_READ_TIMEOUT = 5  # seconds
+GOOGLE_CIRCUIT_ERROR_THRESHOLD = 0.5  # share of failed reads that opens the circuit
+GOOGLE_CIRCUIT_MIN_CALLS = 10  # reads in the window before the circuit may open
+GOOGLE_CIRCUIT_WINDOW = 30  # seconds of reads the error rate is taken over
+GOOGLE_CIRCUIT_OPEN_SECONDS = 30  # before a half-open probe is let through
+GOOGLE_CIRCUIT_HALF_OPEN_PROBES = 1
+GOOGLE_BUSY_CACHE_SIZE = 50000  # user-days of busy times kept per process
+GOOGLE_BUSY_CACHE_MAX_AGE = datetime.timedelta(hours=6)  # older busy times are not used
+
+# Quota governor: token buckets shared through the database, one for the
+# project and one per user, in Calendar API calls per second.
+GOOGLE_QUOTA_ENABLED = os.getenv('GOOGLE_QUOTA_ENABLED', 'true').lower() == 'true'
+GOOGLE_QUOTA_PROJECT_RATE = float(os.getenv('GOOGLE_QUOTA_PROJECT_RATE', '100'))
+GOOGLE_QUOTA_PROJECT_BURST = float(os.getenv('GOOGLE_QUOTA_PROJECT_BURST', '200'))
+GOOGLE_QUOTA_USER_RATE = float(os.getenv('GOOGLE_QUOTA_USER_RATE', '10'))  # Google allows 600 per user per minute
+GOOGLE_QUOTA_USER_BURST = float(os.getenv('GOOGLE_QUOTA_USER_BURST', '20'))
+# Share of each bucket a priority leaves to the ones above it, and how long
+# its calls queue for tokens before they are shed.
+GOOGLE_QUOTA_RESERVE = {'high': 0.0, 'normal': 0.2, 'low': 0.5}
+GOOGLE_QUOTA_MAX_WAIT = {'high': 10.0, 'normal': 2.0, 'low': 60.0}  # seconds
+GOOGLE_QUOTA_MAX_RETRIES = 4  # retries of a call rejected with a rate-limit error
+GOOGLE_QUOTA_BACKOFF_BASE = 0.5  # seconds, doubled on every retry and jittered
+GOOGLE_QUOTA_BACKOFF_MAX = 32.0  # seconds
+GOOGLE_QUOTA_MIN_RATE_SCALE = 0.1  # a rate-limit error halves the bucket's rate down to this share
+GOOGLE_QUOTA_RATE_RECOVERY = 0.02  # share of the rate won back by every admitted call
+
+# Asynchronous booking: write the Event immediately and insert it into
+# Google Calendar from the process_calendar_jobs worker.
+GOOGLE_ASYNC_BOOKING = os.getenv('GOOGLE_ASYNC_BOOKING', 'false').lower() == 'true'
+CALENDAR_JOB_MAX_ATTEMPTS = 5
+CALENDAR_JOB_RETRY_DELAY = datetime.timedelta(seconds=30)  # doubled on every retry
+CALENDAR_JOB_MAX_RETRY_DELAY = datetime.timedelta(hours=1)
+CALENDAR_JOB_LOCK_TIMEOUT = datetime.timedelta(minutes=10)  # reclaim jobs of crashed workers
+PENDING_EVENT_TIMEOUT = datetime.timedelta(minutes=10)  # settle bookings whose request died mid-insert
+
+SLOT_HOLD_TTL = datetime.timedelta(minutes=5)  # how long a guest may hold a slot before booking
+OPEN_INTERVAL_HORIZON_DAYS = 90  # days of free time materialized ahead, extended nightly
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # bearer token required to read /metrics; unset, only DEBUG serves it
+
+# Cold start of a worker: setting up Django and loading every URL route.
+STARTUP_IMPORT_BUDGET_MS = 1500  # summed -X importtime of the imports
+STARTUP_RSS_BUDGET_MB = 150  # peak resident memory
@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from SchedulEase.metrics import metrics_view
+
 admin.autodiscover()
 admin.site.site_header = "ScheduleEase Admin Panel"
 admin.site.site_title = "ScheduleEase"
@@ -24,6 +26,8 @@ admin.site.index_title = "ScheduleEase"
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    path('metrics', metrics_view, name='metrics'),
+
     path('api/users/', include((
         'users.api.urls','users'), namespace='users_api')),
 ]
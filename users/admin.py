@@ -1,15 +1,12 @@
-from django.contrib.admin import ModelAdmin
 from django.contrib import admin
 
 # Register your models here.
-from users.models import User, UserAvailabilitySlot, EventType, Event
+from users.admin_utils import LargeTableModelAdmin
+from users.models import User, UserAvailabilitySlot, EventType, Event, CalendarJob, SlotHold
 
 
-class NoResultModelAdmin(ModelAdmin):
-    show_full_result_count = False
-
 @admin.register(User)
-class UserAdmin(NoResultModelAdmin):
+class UserAdmin(LargeTableModelAdmin):
     list_display = [
         'name',
         'email',
@@ -22,7 +19,7 @@ class UserAdmin(NoResultModelAdmin):
     search_fields = ['name', 'email']
 
 @admin.register(UserAvailabilitySlot)
-class UserAvailabilitySlotAdmin(NoResultModelAdmin):
+class UserAvailabilitySlotAdmin(LargeTableModelAdmin):
     list_display = [
         'user',
         'day_of_week',
@@ -33,7 +30,7 @@ class UserAvailabilitySlotAdmin(NoResultModelAdmin):
     search_fields = ['user__name']
 
 @admin.register(EventType)
-class EventTypeAdmin(NoResultModelAdmin):
+class EventTypeAdmin(LargeTableModelAdmin):
     list_display = [
         'name',
         'duration',
@@ -44,11 +41,37 @@ class EventTypeAdmin(NoResultModelAdmin):
     search_fields = ['name']
 
 @admin.register(Event)
-class EventAdmin(NoResultModelAdmin):
+class EventAdmin(LargeTableModelAdmin):
     list_display = [
         'event_type',
         'guest_email',
         'description',
-        'user'
+        'user',
+        'status'
     ]
     search_fields = ['event_type__name', 'guest_email']
+
+
+@admin.register(CalendarJob)
+class CalendarJobAdmin(LargeTableModelAdmin):
+    list_display = [
+        'event',
+        'status',
+        'attempts',
+        'run_at',
+        'last_error'
+    ]
+    list_filter = ['status']
+    extra_list_select_related = ['event__event_type']
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(LargeTableModelAdmin):
+    list_display = [
+        'user',
+        'guest_email',
+        'start_datetime',
+        'end_datetime',
+        'expires_at'
+    ]
+    search_fields = ['guest_email']
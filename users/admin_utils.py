@@ -0,0 +1,150 @@
+import json
+
+from django.contrib.admin import ModelAdmin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this many rows estimates are replaced by exact counts.
+EXACT_COUNT_THRESHOLD = 10000
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Takes the row count of large tables from the Postgres planner instead of
+    running COUNT(*): the table statistics for an unfiltered list, the
+    query plan otherwise. Small results are still counted exactly.
+    """
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        if queryset.query.is_sliced or queryset.query.distinct_fields:
+            return super().count
+        if queryset.query.has_filters():
+            plan = json.loads(queryset.explain(format='json'))
+            estimate = plan[0]['Plan']['Plan Rows']
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                               [queryset.model._meta.db_table])
+                estimate = cursor.fetchone()[0]
+        if estimate < EXACT_COUNT_THRESHOLD:
+            # also covers tables that were never analyzed (-1)
+            return super().count
+        self.count_is_estimate = True
+        return estimate
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Pages with ?after=<pk> / ?before=<pk> cursors instead of OFFSET while the
+    list is ordered by primary key only, which is the default. Every page
+    then costs one index range scan however deep it is. Lists sorted by a
+    column, or with editable fields, keep numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.after = request.GET.get(AFTER_VAR)
+        self.before = request.GET.get(BEFORE_VAR)
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        lookup_params.pop(BEFORE_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # sorting, filtering and searching start over from the first page
+        return super().get_query_string(new_params, [*(remove or []), AFTER_VAR, BEFORE_VAR])
+
+    def _pk_ordering(self):
+        """
+        :return: True for descending, False for ascending primary key order, None otherwise
+        """
+        ordering = self.queryset.query.order_by
+        pk = self.lookup_opts.pk
+        if len(ordering) != 1 or not isinstance(ordering[0], str):
+            return None
+        descending = ordering[0].startswith('-')
+        return descending if ordering[0].lstrip('-') in ('pk', pk.name, pk.attname) else None
+
+    def get_results(self, request):
+        descending = self._pk_ordering()
+        self.keyset_pagination = descending is not None and not self.list_editable and not self.show_all
+        if not self.keyset_pagination:
+            return super().get_results(request)
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        try:
+            after = self.lookup_opts.pk.to_python(self.after) if self.after else None
+            before = self.lookup_opts.pk.to_python(self.before) if self.before else None
+        except ValidationError:
+            raise IncorrectLookupParameters
+        queryset = self.queryset
+        if after is not None:
+            queryset = queryset.filter(pk__lt=after) if descending else queryset.filter(pk__gt=after)
+        elif before is not None:
+            queryset = queryset.filter(pk__gt=before) if descending else queryset.filter(pk__lt=before)
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if before is not None:
+            rows.reverse()
+
+        self.result_count = paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_more or after is not None or before is not None
+        self.paginator = paginator
+        pk_attname = self.lookup_opts.pk.attname
+        has_next = has_more if before is None else True
+        has_previous = (has_more if before is not None else after is not None) and bool(rows)
+        self.next_page_url = has_next and rows and self.get_query_string(
+            {AFTER_VAR: getattr(rows[-1], pk_attname)})
+        self.previous_page_url = has_previous and self.get_query_string(
+            {BEFORE_VAR: getattr(rows[0], pk_attname)})
+        self.first_page_url = (after is not None or before is not None) and self.get_query_string()
+
+
+class LargeTableModelAdmin(ModelAdmin):
+    """
+    Admin for tables with millions of rows: estimated counts, keyset
+    pagination and joins limited to the foreign keys shown in the list.
+    Add related paths that __str__ of a listed object needs to
+    extra_list_select_related.
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    extra_list_select_related = ()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_list_select_related(self, request):
+        if self.list_select_related is not False:
+            return self.list_select_related
+        related = []
+        for name in self.get_list_display(request):
+            if not isinstance(name, str):
+                continue
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_one or field.one_to_one:
+                related.append(name)
+        return [*related, *self.extra_list_select_related] or False
@@ -0,0 +1,41 @@
+import json
+
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from users.api.renderers import ORJSONResponse
+from users.api.utils import EventUtils, parse_flag
+
+# Async counterparts of the EventViewSet endpoints for ASGI deployments.
+# DRF views are synchronous, so these are plain Django views.
+view_class = EventUtils()
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@require_GET
+async def get_user_events(request):
+    if parse_flag(request.GET.get('stream')):
+        lines, status_code = await view_class.astream_user_events(**request.GET)
+        if status_code != 200:
+            return ORJSONResponse(lines, status=status_code)
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    response, status_code = await view_class.aget_user_events(**request.GET)
+    return ORJSONResponse(response, status=status_code)
+
+
+@csrf_exempt
+@require_POST
+async def create_event(request):
+    data = _json_body(request)
+    if data is None:
+        return ORJSONResponse({"error": "Request body must be a JSON object"}, status=400)
+    response, status_code = await view_class.acreate_event(**data)
+    return ORJSONResponse(response, status=status_code)
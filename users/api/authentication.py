@@ -0,0 +1,29 @@
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from users.helpers.jwt_helper import jwt_helper
+
+
+class JWTAuthentication(BaseAuthentication):
+    """
+    Authenticates "Authorization: Bearer <access token>" headers issued by
+    login_user. Verification is HMAC only and request.user is built from the
+    token's claims, so authenticated requests cost no password hash and no
+    user query.
+    """
+    keyword = b'bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword:
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid Authorization header')
+        token = auth[1].decode('latin-1')
+        payload = jwt_helper.verify_access_token(token)
+        if payload is None:
+            raise exceptions.AuthenticationFailed('Invalid or expired access token')
+        return jwt_helper.user_from_claims(payload), payload
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
@@ -1,4 +1,18 @@
-from users.models import EventType, Event, User, UserAvailabilitySlot
+from users.app_settings import EventStatus
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.models import EventType, Event, User, UserAvailabilitySlot, bump_schedule_version, rebuild_availability_bitmap
+
+open_interval_helper = OpenIntervalHelper()
+
+
+def changes_busy_time(fields, statuses):
+    """
+    Whether an update frees or takes busy time: a booking moved, or one
+    given up because its Google insert failed.
+    """
+    return bool({'start_datetime', 'end_datetime'} & set(fields)) or \
+        ('status' in fields and EventStatus.FAILED in statuses)
+
 
 class EventDataUtils:
     @staticmethod
@@ -16,10 +30,54 @@ class EventDataUtils:
         except EventType.DoesNotExist:
             return None
 
+    @staticmethod
+    def get_event_types_in_bulk(event_type_ids):
+        return EventType.objects.in_bulk(event_type_ids)
+
     @staticmethod
     def create_event(**kwargs):
         return Event.objects.create(**kwargs)
 
+    @staticmethod
+    def bulk_create_events(events):
+        created = Event.objects.bulk_create(events)
+        # bulk writes skip the model signals that maintain the schedule
+        bump_schedule_version({event.user_id for event in created})
+        open_interval_helper.refresh_ranges(
+            (event.user_id, event.start_datetime, event.end_datetime) for event in created)
+        return created
+
+    @staticmethod
+    def update_event(event_id, **kwargs):
+        events = Event.objects.filter(id=event_id)
+        refresh = changes_busy_time(kwargs, [kwargs.get('status')])
+        if refresh:
+            # the old range is freed as well as the new one taken
+            ranges = list(events.values_list('user_id', 'start_datetime', 'end_datetime'))
+        updated = events.update(**kwargs)
+        bump_schedule_version(events.values('user_id'))
+        if refresh:
+            open_interval_helper.refresh_ranges(
+                ranges + list(events.values_list('user_id', 'start_datetime', 'end_datetime')))
+        return updated
+
+    @staticmethod
+    def bulk_update_events(events, fields):
+        updated = Event.objects.bulk_update(events, fields)
+        bump_schedule_version({event.user_id for event in events})
+        if changes_busy_time(fields, {event.status for event in events}):
+            open_interval_helper.refresh_ranges(
+                (event.user_id, event.start_datetime, event.end_datetime) for event in events)
+        return updated
+
+    @staticmethod
+    def delete_event(event_id):
+        return Event.objects.filter(id=event_id).delete()
+
+    @staticmethod
+    def delete_events(event_ids):
+        return Event.objects.filter(id__in=event_ids).delete()
+
 class UserDataUtils:
     @staticmethod
     def filter_users(**kwargs):
@@ -42,12 +100,24 @@ class UserDataUtils:
     @staticmethod
     def update_user(user_id, **kwargs):
         return User.objects.filter(id=user_id).update(**kwargs)
+
+    @staticmethod
+    def get_schedule_version(user_id, using=None):
+        return User.objects.using(using).filter(id=user_id).values_list('schedule_version', flat=True).first()
         
 class UserAvailabilitySlotDataUtils:
     @staticmethod
     def filter_user_availability_slots(**kwargs):
         return UserAvailabilitySlot.objects.filter(**kwargs)
 
+    @staticmethod
+    def get_availability_slot_rows(user_id):
+        """
+        :return: List of (day_of_week, start_time, end_time) tuples ordered by day and time
+        """
+        return list(UserAvailabilitySlot.objects.filter(user_id=user_id).order_by(
+            'day_of_week', 'start_time').values_list('day_of_week', 'start_time', 'end_time'))
+
     @staticmethod
     def create_user_availability_slot(**kwargs):
         return UserAvailabilitySlot.objects.create(**kwargs)
@@ -61,7 +131,15 @@ class UserAvailabilitySlotDataUtils:
 
     @staticmethod
     def update_user_availability_slot(user_availability_slot_id, **kwargs):
-        return UserAvailabilitySlot.objects.filter(id=user_availability_slot_id).update(**kwargs)
+        slots = UserAvailabilitySlot.objects.filter(id=user_availability_slot_id)
+        updated = slots.update(**kwargs)
+        # queryset updates skip post_save, so refresh the packed schedule here
+        user_ids = list(slots.values_list('user_id', flat=True))
+        for user_id in user_ids:
+            rebuild_availability_bitmap(user_id)
+        bump_schedule_version(user_ids)
+        open_interval_helper.refresh_users(user_ids)
+        return updated
 
     @staticmethod
     def delete_user_availability_slot(user_availability_slot_id):
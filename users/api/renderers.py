@@ -0,0 +1,48 @@
+import orjson
+from django.http import HttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# UTC datetimes end in "Z" as with DRF's encoder, and integer keys such as
+# row indexes of validation errors are allowed as with the json module.
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+_fallback_encoder = JSONEncoder()
+
+
+def dumps(data, option=0):
+    """
+    Encodes to JSON bytes with orjson, which handles dicts, lists, strings,
+    numbers, datetimes, dates, times, UUIDs, enums and numpy arrays natively.
+    Anything else, such as Decimals or lazy translations, goes through DRF's
+    encoder.
+    """
+    return orjson.dumps(data, default=_fallback_encoder.default, option=ORJSON_OPTIONS | option)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer backed by orjson. Honours
+    an ``indent`` parameter of the accepted media type with two spaces.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = 0
+        if accepted_media_type and 'indent=' in accepted_media_type:
+            option = orjson.OPT_INDENT_2
+        return dumps(data, option)
+
+
+class ORJSONResponse(HttpResponse):
+    """
+    JsonResponse counterpart for plain Django views, rendered with orjson.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
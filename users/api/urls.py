@@ -1,6 +1,7 @@
 from django.urls import path
 
-from users.api.views import UsersViewSet, EventViewSet, SignupView, LoginView, RefreshTokenView
+from users.api import async_views
+from users.api.views import UsersViewSet, EventViewSet, UserAvailabilitySlotViewSet, SignupView, LoginView, RefreshTokenView
 
 urlpatterns = [
     path('say_hi/', UsersViewSet.as_view({
@@ -14,6 +15,18 @@ urlpatterns = [
         "post": "create_event"
     }), name='create_event'),
 
+    path('bulk_create_events/', EventViewSet.as_view({
+        "post": "bulk_create_events"
+    }), name='bulk_create_events'),
+
+    path('hold_slot/', EventViewSet.as_view({
+        "post": "hold_slot"
+    }), name='hold_slot'),
+
+    path('release_slot_hold/', EventViewSet.as_view({
+        "post": "release_slot_hold"
+    }), name='release_slot_hold'),
+
     path('signup/', SignupView.as_view({
         "post": "sigup_user"
     }), name='sigup_user'),
@@ -22,8 +35,34 @@ urlpatterns = [
         "post": "login_user"
     }), name='login_user'),
 
+    path('refresh_token/', RefreshTokenView.as_view(), name='refresh_token'),
+
     path('get_user_events/', EventViewSet.as_view({
         "get": "get_user_events"
     }), name='get_user_events'),
 
-]
\ No newline at end of file
+    path('get_availability_slots/', UserAvailabilitySlotViewSet.as_view({
+        "get": "get_availability_slots"
+    }), name='get_availability_slots'),
+
+    path('set_availability_slots/', UserAvailabilitySlotViewSet.as_view({
+        "post": "set_availability_slots"
+    }), name='set_availability_slots'),
+
+    path('get_available_slots/', EventViewSet.as_view({
+        "get": "get_available_slots"
+    }), name='get_available_slots'),
+
+    path('check_collective_availability/', EventViewSet.as_view({
+        "post": "check_collective_availability"
+    }), name='check_collective_availability'),
+
+    path('get_collective_slots/', EventViewSet.as_view({
+        "get": "get_collective_slots"
+    }), name='get_collective_slots'),
+
+    path('async/create_event/', async_views.create_event, name='async_create_event'),
+
+    path('async/get_user_events/', async_views.get_user_events, name='async_get_user_events'),
+
+]
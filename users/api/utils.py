@@ -1,47 +1,123 @@
 import pytz
+import itertools
 import json
 import os
+import uuid
 import django
 
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta, timezone
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 
 from users.api.data_utils import EventDataUtils, UserDataUtils, UserAvailabilitySlotDataUtils
-from users.helpers.event_helper import EventHelper
-from users.app_settings import DaysOfWeek
+from users.api.renderers import dumps
+from users.helpers.availability_import_helper import AvailabilityImportHelper
+from users.helpers.busy_cache import flags_stale_busy_data
+from users.helpers.calendar_job_helper import CalendarJobHelper
+from users.helpers.collective_helper import CollectiveAvailabilityHelper
+from users.helpers.event_helper import (
+    EventHelper, UPCOMING_EVENTS_MAX_PAGE_SIZE, UPCOMING_EVENTS_PAGE_SIZE, decode_events_cursor, google_event_id,
+    is_booking_conflict, parse_booking_datetime
+)
+from users.helpers.google_libs import google_libs
+from users.helpers.jwt_helper import decode_jwt_token, generate_tokens, jwt_helper
+from users.helpers.quota_governor import google_call_priority
+from users.helpers.slot_finder import find_open_slots, find_slots_in_intervals, format_slot_times
+from users.helpers.slot_hold_helper import SlotHoldHelper
+from users.app_settings import (
+    BULK_BOOKING_MAX_EVENTS, DAY_OF_WEEK_LABELS, DaysOfWeek, DEFAULT_TIMEZONE, EventStatus, GoogleCallPriority,
+    ScheduleMode
+)
+from users.models import Event
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.errors import HttpError
+_file_credentials = None
 
 def get_credentials():
-    creds = None
-    if os.path.exists(settings.GOOGLE_TOKEN_FILE):
+    """
+    Loads the project's credentials from GOOGLE_TOKEN_FILE once per process.
+    The file is only written back when the token was refreshed or re-issued.
+    """
+    global _file_credentials
+    creds = _file_credentials
+    if creds is None and os.path.exists(settings.GOOGLE_TOKEN_FILE):
         try:
-            creds = Credentials.from_authorized_user_file(settings.GOOGLE_TOKEN_FILE)
-            with open(settings.GOOGLE_TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
+            creds = google_libs.Credentials.from_authorized_user_file(settings.GOOGLE_TOKEN_FILE)
         except json.JSONDecodeError:
             print("Token file is invalid. Regenerating token.")
             os.remove(settings.GOOGLE_TOKEN_FILE)
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+            creds.refresh(google_libs.Request())
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', settings.GOOGLE_SCOPES)
+            flow = google_libs.InstalledAppFlow.from_client_secrets_file(
+                'credentials.json', settings.GOOGLE_SCOPE)
             creds = flow.run_local_server(port=8000)
-            with open(settings.GOOGLE_TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-    print(creds.to_json())
+        with open(settings.GOOGLE_TOKEN_FILE, 'w') as token:
+            token.write(creds.to_json())
+    _file_credentials = creds
     return creds
 
+
+def parse_flag(value, default=False):
+    """
+    Reads a boolean request field. JSON bodies may send true/false, query
+    strings send text such as "true", "1" or "0"; a list is the values of a
+    repeated query parameter, of which the last counts.
+    """
+    if isinstance(value, list):
+        value = value[-1] if value else None
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes', 'on')
+    return bool(value)
+
+
+def parse_user_ids(values):
+    """
+    Reads a list of user ids, as sent in a JSON body or repeated query
+    parameters.
+    :return: Set of integer ids, or None if any of them is not one
+    """
+    try:
+        return {int(value) for value in values}
+    except (TypeError, ValueError):
+        return None
+
+
+def schedule_etag(request, *args, **kwargs):
+    """
+    ETag of a user's schedule, from the version bumped on every change to
+    their availability slots, event types and events. Answering a matching
+    If-None-Match with 304 costs this single lookup. The version is read on
+    the primary, since a lagging replica would answer 304 right after a
+    change, and kept on the request for replica_has_schedule_version.
+    """
+    try:
+        user_id = int(request.GET.get('user_id'))
+    except (TypeError, ValueError):
+        return None
+    version = request.schedule_version = UserDataUtils.get_schedule_version(user_id, using=DEFAULT_DB_ALIAS)
+    if version is None:
+        return None
+    return f"{user_id}-{version}"
+
+
+def replica_has_schedule_version(request):
+    """
+    Whether the database reads are routed to has caught up with the
+    version schedule_etag sent, so the body matches its ETag.
+    """
+    version = getattr(request, 'schedule_version', None)
+    return version is not None and UserDataUtils.get_schedule_version(int(request.GET['user_id'])) == version
+
+
 class UsersUtils:
     data_class = UserDataUtils()
 
@@ -74,35 +150,55 @@ class UsersUtils:
             return {"error": "User not found"}, 404
         if not user.check_password(password):
             return {"error": "Invalid credentials"}, 400
+        access_token, refresh_token = generate_tokens(user)
         if user.google_access_token and user.google_refresh_token:
             return {
                 "message": "User logged in successfully with existing Google tokens.",
                 "data": {
                     "user_id": user.id,
                     "name": user.name,
-                    "email": user.email
+                    "email": user.email,
+                    "access": access_token,
+                    "refresh": refresh_token
                 }
             }, status.HTTP_200_OK
-        flow = InstalledAppFlow.from_client_secrets_file('credentials.json', setting.GOOGLE_SCOPES)
+        flow = google_libs.InstalledAppFlow.from_client_secrets_file('credentials.json', settings.GOOGLE_SCOPE)
         creds = flow.run_local_server(port=8081)
-        creds = creds.to_json()
-        creds = json.loads(creds)
         self.data_class.update_user(user.id, **{
-            "google_access_token": creds['token'],
-            "google_refresh_token": creds['refresh_token']
+            "google_access_token": creds.token,
+            "google_refresh_token": creds.refresh_token,
+            "google_token_expiry": creds.expiry.replace(tzinfo=timezone.utc) if creds.expiry else None
         })
         return {
             "message": "User logged in successfully.",
             "data": {
                 "user_id": user.id,
                 "name": user.name,
-                "email": user.email
+                "email": user.email,
+                "access": access_token,
+                "refresh": refresh_token
             }
         }, status.HTTP_200_OK
 
+    def refresh_tokens(self, **kwargs):
+        """
+        Trades a refresh token for a new access and refresh token pair.
+        :param refresh: Refresh token returned by login_user or an earlier refresh
+        :return: Response message and status code
+        """
+        payload = decode_jwt_token(kwargs.get('refresh'))
+        if payload is None:
+            return {"error": "Invalid or expired refresh token"}, status.HTTP_401_UNAUTHORIZED
+        user = jwt_helper.get_user_for_refresh(payload)
+        if not user:
+            return {"error": "Invalid or expired refresh token"}, status.HTTP_401_UNAUTHORIZED
+        access_token, refresh_token = generate_tokens(user)
+        return {"access": access_token, "refresh": refresh_token}, status.HTTP_200_OK
+
 
 class UserAvailabilitySlotUtils:
     data_class = UserAvailabilitySlotDataUtils()
+    import_helper = AvailabilityImportHelper()
     user_du = UserDataUtils()
 
     def create_availability_slot(self, **kwargs):
@@ -132,63 +228,245 @@ class UserAvailabilitySlotUtils:
         user_id = kwargs.get('user_id')
         if not user_id:
             return {"error": "Missing required fields"}, 400
+        rows = self.data_class.get_availability_slot_rows(int(user_id[0]))
+        if not rows:
+            # the user is only looked up when there is nothing to list
+            if not self.user_du.filter_users(id=int(user_id[0])).exists():
+                return {"error": f"User not found for the id: {user_id}"}, 404
+            return {"message": "No availability slots found"}, 200
+        slots = [
+            {"day_of_week": DAY_OF_WEEK_LABELS[day_of_week], "start_time": start_time, "end_time": end_time}
+            for day_of_week, start_time, end_time in rows
+        ]
+        return {"message": "Availability slots retrieved successfully", "data": slots}, 200
+
+    def set_availability_slots(self, **kwargs):
+        """
+        Replaces or extends a user's whole weekly schedule in one request.
+        :param user_id: Id of the user
+        :param slots: List of objects with day_of_week, start_time and end_time
+        :param mode: "replace" (default) drops the existing slots, "merge" keeps them
+        :return: Response message and status code
+        """
+        user_id = kwargs.get('user_id')
+        slots = kwargs.get('slots')
+        mode = kwargs.get('mode', ScheduleMode.REPLACE)
+        if not user_id or not isinstance(slots, list):
+            return {"error": "Missing required fields"}, 400
+        if mode not in ScheduleMode.values:
+            return {"error": f"mode must be one of {', '.join(ScheduleMode.values)}"}, 400
         user = self.user_du.get_user(id=user_id)
         if not user:
             return {"error": f"User not found for the id: {user_id}"}, 404
-        availability_slots = self.data_class.filter_availability_slots(user=user)
-        if not availability_slots.exists():
-            return {"message": "No availability slots found"}, 200
-        slots = []
-        for slot in availability_slots:
-            slots.append({
-                "day_of_week": slot.get_day_of_week_display(),
-                "start_time": slot.start_time,
-                "end_time": slot.end_time
-            })
-        return {"message": "Availability slots retrieved successfully", "data": slots}, 200
+        parsed, errors = [], {}
+        for index, slot in enumerate(slots):
+            try:
+                parsed.append(self.import_helper.parse_slot(slot))
+            except (AttributeError, ValidationError) as e:
+                errors[index] = e.messages[0] if isinstance(e, ValidationError) else "Invalid slot"
+        if errors:
+            return {"error": "Invalid availability slots", "data": errors}, 400
+        try:
+            rejected = self.import_helper.save_schedules({user.id: parsed}, mode)
+        except IntegrityError:
+            # a concurrent write to the same schedule won the exclusion constraint
+            return {"error": "Availability slots overlap"}, 409
+        if rejected:
+            return {"error": rejected[user.id]}, 400
+        return {"message": "Availability slots saved successfully"}, 200
 
 
 
 class EventUtils:
     data_class = EventDataUtils()
     event_helper = EventHelper()
+    job_helper = CalendarJobHelper()
+    collective_helper = CollectiveAvailabilityHelper()
+    hold_helper = SlotHoldHelper()
     user_du = UserDataUtils()
 
     def get_user_events(self, **kwargs):
+        """
+        Lists the user's upcoming Google Calendar events one page at a time.
+        :param user_id: Id of the user
+        :param page_size: Optional number of events per page (default 10, at most 2500)
+        :param cursor: Optional next_cursor of the previous page
+        :return: Response message with the page and the cursor of the next one, and status code
+        """
+        user, page_size, error = self._parse_user_events_params(kwargs, UPCOMING_EVENTS_PAGE_SIZE)
+        if error:
+            return error
+        cursor, error = self._parse_events_cursor(kwargs)
+        if error:
+            return error
+        try:
+            events, next_cursor = next(self.event_helper.iter_upcoming_event_pages(user, page_size, cursor))
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve events"}, 500
+        if not events and not cursor:
+            return {"message": "No upcoming events found", "data": [], "next_cursor": None}, 200
+        return {"message": "Events retrieved successfully", "data": events, "next_cursor": next_cursor}, 200
+
+    def stream_user_events(self, **kwargs):
+        """
+        Streaming variant of get_user_events that walks every page. The
+        first page is fetched up front so that failures still produce an
+        error response; later pages are fetched as the client reads.
+        :return: Generator of newline-delimited JSON lines and status code,
+                 or an error response and status code
+        """
+        user, page_size, error = self._parse_user_events_params(kwargs, UPCOMING_EVENTS_MAX_PAGE_SIZE)
+        if error:
+            return error
+        pages = self.event_helper.iter_upcoming_event_pages(user, page_size)
+        try:
+            first_page = next(pages)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve events"}, 500
+
+        def lines():
+            for events, _ in itertools.chain([first_page], pages):
+                yield b''.join(dumps(event) + b'\n' for event in events)
+
+        return lines(), 200
+
+    async def aget_user_events(self, **kwargs):
+        """
+        Async variant of get_user_events.
+        """
+        user, page_size, error = await sync_to_async(self._parse_user_events_params)(
+            kwargs, UPCOMING_EVENTS_PAGE_SIZE)
+        if error:
+            return error
+        cursor, error = self._parse_events_cursor(kwargs)
+        if error:
+            return error
+        pages = self.event_helper.aiter_upcoming_event_pages(user, page_size, cursor)
+        try:
+            events, next_cursor = await anext(pages)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve events"}, 500
+        finally:
+            await pages.aclose()
+        if not events and not cursor:
+            return {"message": "No upcoming events found", "data": [], "next_cursor": None}, 200
+        return {"message": "Events retrieved successfully", "data": events, "next_cursor": next_cursor}, 200
+
+    async def astream_user_events(self, **kwargs):
+        """
+        Async variant of stream_user_events, returning an async generator
+        that ASGI servers drain without a thread.
+        """
+        user, page_size, error = await sync_to_async(self._parse_user_events_params)(
+            kwargs, UPCOMING_EVENTS_MAX_PAGE_SIZE)
+        if error:
+            return error
+        pages = self.event_helper.aiter_upcoming_event_pages(user, page_size)
+        try:
+            first_page = await anext(pages)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve events"}, 500
+
+        async def lines():
+            events, _ = first_page
+            yield b''.join(dumps(event) + b'\n' for event in events)
+            async for events, _ in pages:
+                yield b''.join(dumps(event) + b'\n' for event in events)
+
+        return lines(), 200
+
+    def _parse_user_events_params(self, kwargs, default_page_size):
+        """
+        :return: (user, page_size, None), or (None, None, error response and status code)
+        """
         user_id = kwargs.get('user_id')
         if not user_id:
-            return {"error": "Missing required fields"}, 400
+            return None, None, ({"error": "Missing required fields"}, 400)
         user = self.user_du.get_user(id=int(user_id[0]))
         if not user:
-            return {"error": f"User not found for the id: {user_id}"}, 404
-        credentials = Credentials(token=user.google_access_token, refresh_token=user.google_refresh_token)
-        service = build('calendar', 'v3', credentials=credentials)
+            return None, None, ({"error": f"User not found for the id: {user_id}"}, 404)
+        page_size = kwargs.get('page_size')
+        if not page_size:
+            return user, default_page_size, None
         try:
-            now = datetime.utcnow().isoformat() + 'Z'
-            events_result = service.events().list(
-                calendarId='primary',
-                timeMin=now,
-                maxResults=10,
-                singleEvents=True,
-                orderBy='startTime',
-            ).execute()
-            events = events_result.get('items', [])
-            if not events:
-                return {"message": "No upcoming events found"}, 200
-            filtered_events = []
-            for event in events:
-                filtered_events.append({
-                    "summary": event.get('summary'),
-                    "description": event.get('description'),
-                    "start_time": event['start'].get('dateTime', event['start'].get('date')),
-                    "end_time": event['end'].get('dateTime', event['end'].get('date')),
-                    "hangout_link": event.get('hangoutLink'),
-                    "attendees": [attendee.get('email') for attendee in event.get('attendees', [])]
-                })
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            return {"error": "Failed to retrieve events"}, 500
-        return {"message": "Events retrieved successfully", "data": filtered_events}, 200
+            page_size = int(page_size[0])
+        except ValueError:
+            page_size = 0
+        if not 0 < page_size <= UPCOMING_EVENTS_MAX_PAGE_SIZE:
+            return None, None, ({"error": f"page_size must be between 1 and {UPCOMING_EVENTS_MAX_PAGE_SIZE}"}, 400)
+        return user, page_size, None
+
+    @staticmethod
+    def _parse_events_cursor(kwargs):
+        """
+        :return: (cursor or None, None), or (None, error response and status code)
+        """
+        cursor = kwargs.get('cursor')
+        if not cursor:
+            return None, None
+        try:
+            decode_events_cursor(cursor[0])
+        except ValueError:
+            return None, ({"error": "Invalid cursor"}, 400)
+        return cursor[0], None
+
+    @flags_stale_busy_data
+    def get_available_slots(self, **kwargs):
+        """
+        Lists every open slot of an EventType's duration within its date range.
+        :param event_type_id: Id of the EventType to book
+        :param start_date: Optional first date (YYYY-MM-DD) to narrow the search to
+        :param end_date: Optional last date (YYYY-MM-DD) to narrow the search to
+        :return: Response message and status code
+        """
+        event_type_id = kwargs.get('event_type_id')
+        if not event_type_id:
+            return {"error": "Missing required fields"}, 400
+        event_type = self.data_class.get_event_type(int(event_type_id[0]))
+        if not event_type:
+            return {"error": "EventType not found"}, 404
+        try:
+            start_date = max(event_type.start_date, datetime.fromisoformat(kwargs['start_date'][0]).date()) \
+                if kwargs.get('start_date') else event_type.start_date
+            end_date = min(event_type.end_date, datetime.fromisoformat(kwargs['end_date'][0]).date()) \
+                if kwargs.get('end_date') else event_type.end_date
+        except ValueError:
+            return {"error": "Dates must be in YYYY-MM-DD format"}, 400
+        user = event_type.user
+        zone = pytz.timezone(DEFAULT_TIMEZONE)
+        range_start = zone.localize(datetime.combine(start_date, datetime.min.time()))
+        range_end = zone.localize(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        open_interval_helper = self.event_helper.open_interval_helper
+        if open_interval_helper.is_materialized(user, range_start, range_end):
+            held = self.event_helper.get_held_intervals([user.id], range_start, range_end)
+            slot_starts = find_slots_in_intervals(
+                open_interval_helper.get_open_intervals(user.id, range_start, range_end),
+                [(start, end) for _, start, end in held], start_date,
+                event_type.duration, zone, not_before=datetime.now(timezone.utc)
+            )
+        else:
+            try:
+                busy_intervals = self.event_helper.get_busy_intervals(user, range_start, range_end)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                return {"error": "Failed to retrieve busy times"}, 500
+            slot_starts = find_open_slots(
+                user.get_availability_bitmap(), busy_intervals, start_date, end_date,
+                event_type.duration, zone, not_before=datetime.now(timezone.utc)
+            )
+        slots = [
+            {"start_time": start, "end_time": end}
+            for start, end in format_slot_times(slot_starts, event_type.duration)
+        ]
+        return {
+            "message": "Available slots retrieved successfully",
+            "timezone": DEFAULT_TIMEZONE,
+            "data": slots
+        }, 200
 
     def create_event_type(self, user, **kwargs):
         name = kwargs.get('name')
@@ -204,54 +482,430 @@ class EventUtils:
         )
         return {"message": f"EventType '{event_type.name}' created successfully"}, 200
 
+    @flags_stale_busy_data
+    @google_call_priority(GoogleCallPriority.HIGH)
     def create_event(self, **kwargs):
+        booking, error = self._parse_booking(kwargs)
+        if error:
+            return error
+        is_available = self.event_helper.check_user_availability(
+            booking['user'], booking['start_datetime'], booking['end_datetime'],
+            exclude_hold_token=booking['hold_token'])
+        if not is_available:
+            return {"error": "User is not available at this time"}, 400
+        async_booking = parse_flag(kwargs.get('async_booking'), settings.GOOGLE_ASYNC_BOOKING)
+        event, error = self._insert_pending_event(booking, async_booking)
+        if error:
+            return error
+        if async_booking:
+            return self._queued_response(event)
+        try:
+            google_event_data, created = self.event_helper.create_google_event(
+                booking['user'], booking['event_type'], booking['guest_email'], booking['description'],
+                booking['start_datetime'], booking['end_datetime'], event_id=google_event_id(event.id))
+        except Exception as e:
+            google_event_data, created = {'message': f"An error occurred while creating the event: {e}"}, False
+        return self._finish_event(event, google_event_data, created)
+
+    @flags_stale_busy_data
+    async def acreate_event(self, **kwargs):
+        """
+        Async variant of create_event for ASGI deployments: waiting on Google
+        does not hold a thread, and the Google busy lookup runs concurrently
+        with the local availability checks.
+        """
+        with google_call_priority(GoogleCallPriority.HIGH):
+            booking, error = await sync_to_async(self._parse_booking)(kwargs)
+            if error:
+                return error
+            is_available = await self.event_helper.acheck_user_availability(
+                booking['user'], booking['start_datetime'], booking['end_datetime'],
+                exclude_hold_token=booking['hold_token'])
+            if not is_available:
+                return {"error": "User is not available at this time"}, 400
+            async_booking = parse_flag(kwargs.get('async_booking'), settings.GOOGLE_ASYNC_BOOKING)
+            event, error = await sync_to_async(self._insert_pending_event)(booking, async_booking)
+            if error:
+                return error
+            if async_booking:
+                return self._queued_response(event)
+            google_event_data, created = await self.event_helper.acreate_google_event(
+                booking['user'], booking['event_type'], booking['guest_email'], booking['description'],
+                booking['start_datetime'], booking['end_datetime'], event_id=google_event_id(event.id))
+            return await sync_to_async(self._finish_event)(event, google_event_data, created)
+
+    def _parse_booking(self, kwargs):
+        """
+        Validates the fields of a booking request and loads its EventType and host.
+        :return: (booking dict, None), or (None, error response and status code)
+        """
         event_type_id = kwargs.get('event_type_id')
         guest_email = kwargs.get('guest_email')
-        description = kwargs.get('description')
         start_datetime = kwargs.get('start_datetime')
         end_datetime = kwargs.get('end_datetime')
         user_id = kwargs.get('user_id')
+        hold_token = kwargs.get('hold_token')
         if not all([event_type_id, guest_email, start_datetime, end_datetime]):
-            return {"error": "Missing required fields"}, 400
+            return None, ({"error": "Missing required fields"}, 400)
+        if hold_token:
+            try:
+                hold_token = uuid.UUID(str(hold_token))
+            except ValueError:
+                return None, ({"error": "Invalid hold token"}, 400)
         event_type = self.data_class.get_event_type(event_type_id)
         if not event_type:
-            return {"error": "EventType not found"}, 404
+            return None, ({"error": "EventType not found"}, 404)
         user = self.user_du.get_user(id=user_id)
         if not user:
-            return {"error": f"User not found for the id: {user_id}"}, 404
-        is_available = self.event_helper.check_user_availability(
-            user, start_datetime, end_datetime)
-        if not is_available:
-            return {"error": "User is not available at this time"}, 400
+            return None, ({"error": f"User not found for the id: {user_id}"}, 404)
         try:
-            event_data = {
-                'event_type': event_type.name,
-                'guest_email': guest_email,
-                'description': description,
-                'start_datetime': start_datetime,
-                'end_datetime': end_datetime,
-                'user': user,
-                'timezone': 'Asia/Kolkata',
-            }
-            google_event_data, status = self.event_helper.create_google_event(event_data)
-            if not status:
-                return {
-                    'code': 1,
-                    'message': google_event_data['message']
-                }, 400
-            self.data_class.create_event(
-                event_type=event_type,
-                guest_email=guest_email,
-                description=description,
-                user=user,
-                meet_link=google_event_data.get("google_meet_link")
-            )
+            start = parse_booking_datetime(start_datetime)
+            end = parse_booking_datetime(end_datetime)
+        except (AttributeError, ValueError):
+            return None, ({"error": "Invalid start or end datetime"}, 400)
+        return {
+            "event_type": event_type,
+            "user": user,
+            "guest_email": guest_email,
+            "description": kwargs.get('description'),
+            "start_datetime": start_datetime,
+            "end_datetime": end_datetime,
+            "start": start,
+            "end": end,
+            "hold_token": hold_token,
+        }, None
+
+    def _insert_pending_event(self, booking, async_booking):
+        """
+        Saves the booking as a pending Event, consuming its slot hold and
+        queueing its Google insert in the same transaction.
+        :return: (event, None), or (None, error response and status code)
+        """
+        try:
+            with transaction.atomic():
+                if booking['hold_token'] and not self.hold_helper.consume_hold(
+                        booking['hold_token'], booking['user'], booking['start'], booking['end']):
+                    return None, ({"error": "Slot hold has expired or does not match this booking"}, 409)
+                event = self.data_class.create_event(
+                    event_type=booking['event_type'],
+                    guest_email=booking['guest_email'],
+                    description=booking['description'],
+                    user=booking['user'],
+                    start_datetime=booking['start'],
+                    end_datetime=booking['end'],
+                    status=EventStatus.PENDING
+                )
+                if async_booking:
+                    self.job_helper.enqueue_event(event, booking['start_datetime'], booking['end_datetime'])
+        except IntegrityError as e:
+            if is_booking_conflict(e):
+                return None, ({"error": "User is not available at this time"}, 400)
+            return None, ({"error": f"An error occurred while creating the event: {e}"}, 400)
+        return event, None
+
+    @staticmethod
+    def _queued_response(event):
+        return {
+            'code': 0,
+            "message": f"Event booking queued for {event.guest_email}",
+            "event_id": event.id,
+            "status": event.status
+        }, 202
+
+    def _finish_event(self, event, google_event_data, created):
+        """
+        Confirms the pending Event once Google created it, or drops it.
+        """
+        if not created:
+            self.data_class.delete_event(event.id)
             return {
-                'code': 0,
-                "message": f"Event created successfully for {guest_email}",
-                "google_meet_link": google_event_data.get("google_meet_link"),
-                "calendar_event_link": google_event_data.get("calendar_event_link")
-            }, 200
+                'code': 1,
+                'message': google_event_data['message']
+            }, 400
+        self.data_class.update_event(
+            event.id,
+            meet_link=google_event_data.get("google_meet_link"),
+            status=EventStatus.CONFIRMED
+        )
+        return {
+            'code': 0,
+            "message": f"Event created successfully for {event.guest_email}",
+            "google_meet_link": google_event_data.get("google_meet_link"),
+            "calendar_event_link": google_event_data.get("calendar_event_link")
+        }, 200
+
+    @flags_stale_busy_data
+    @google_call_priority(GoogleCallPriority.HIGH)
+    def bulk_create_events(self, **kwargs):
+        """
+        Books many events for one user in a single request.
+        :param user_id: Id of the host
+        :param events: List of objects with the fields accepted by create_event
+        :param async_booking: Queue the Google inserts instead of waiting for them
+        :return: Response message with a per-event result, and status code
+        """
+        user_id = kwargs.get('user_id')
+        bookings = kwargs.get('events')
+        if not user_id or not isinstance(bookings, list) or not bookings:
+            return {"error": "Missing required fields"}, 400
+        if len(bookings) > BULK_BOOKING_MAX_EVENTS:
+            return {"error": f"At most {BULK_BOOKING_MAX_EVENTS} events can be booked at once"}, 400
+        user = self.user_du.get_user(id=user_id)
+        if not user:
+            return {"error": f"User not found for the id: {user_id}"}, 404
+        event_type_ids = set()
+        for booking in bookings:
+            try:
+                event_type_ids.add(int(booking.get('event_type_id')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        event_types = self.data_class.get_event_types_in_bulk(event_type_ids)
+
+        results = [None] * len(bookings)
+        valid = []
+        for index, booking in enumerate(bookings):
+            if not isinstance(booking, dict) or not all([booking.get(field) for field in (
+                    'event_type_id', 'guest_email', 'start_datetime', 'end_datetime')]):
+                results[index] = {'code': 1, "error": "Missing required fields"}
+                continue
+            event_type = event_types.get(int(booking['event_type_id'])) \
+                if str(booking['event_type_id']).isdigit() else None
+            if not event_type:
+                results[index] = {'code': 1, "error": "EventType not found"}
+                continue
+            valid.append((index, {
+                'event_type': event_type,
+                'guest_email': booking['guest_email'],
+                'description': booking.get('description') or '',
+                'start_datetime': booking['start_datetime'],
+                'end_datetime': booking['end_datetime'],
+            }))
+        errors = self.event_helper.check_bulk_availability(
+            user, [(booking['start_datetime'], booking['end_datetime']) for _, booking in valid])
+        available = []
+        for (index, booking), error in zip(valid, errors):
+            if error:
+                results[index] = {'code': 1, "error": error}
+            else:
+                available.append((index, booking))
+
+        async_booking = parse_flag(kwargs.get('async_booking'), settings.GOOGLE_ASYNC_BOOKING)
+        inserted = self._insert_pending_events(user, available, results, enqueue=async_booking)
+        if inserted and async_booking:
+            for index, booking, event in inserted:
+                results[index] = {
+                    'code': 0,
+                    "message": f"Event booking queued for {booking['guest_email']}",
+                    "event_id": event.id,
+                    "status": event.status
+                }
+        elif inserted:
+            google_results = self.event_helper.create_google_events(
+                user, [dict(booking, event_id=google_event_id(event.id)) for _, booking, event in inserted])
+            confirmed = []
+            failed_ids = []
+            for (index, booking, event), (google_event_data, status) in zip(inserted, google_results):
+                if not status:
+                    failed_ids.append(event.id)
+                    results[index] = {'code': 1, 'message': google_event_data['message']}
+                    continue
+                event.meet_link = google_event_data.get("google_meet_link")
+                event.status = EventStatus.CONFIRMED
+                confirmed.append(event)
+                results[index] = {
+                    'code': 0,
+                    "message": f"Event created successfully for {booking['guest_email']}",
+                    "google_meet_link": google_event_data.get("google_meet_link"),
+                    "calendar_event_link": google_event_data.get("calendar_event_link")
+                }
+            with transaction.atomic():
+                self.data_class.bulk_update_events(confirmed, ['meet_link', 'status'])
+                self.data_class.delete_events(failed_ids)
+
+        succeeded = sum(1 for result in results if result['code'] == 0)
+        return {
+            "message": f"{succeeded} of {len(bookings)} events booked",
+            "data": results
+        }, 200
+
+    def _insert_pending_events(self, user, bookings, results, enqueue=False):
+        """
+        Writes validated bookings as pending events in one bulk insert. If a
+        concurrent booking trips the double-booking constraint, the rows are
+        retried one by one so only the conflicting ones are rejected.
+        :param enqueue: Queue the Google inserts of the events in the same transaction
+        :return: List of (index, booking, event) for the inserted rows
+        """
+        events = [
+            Event(event_type=booking['event_type'], guest_email=booking['guest_email'],
+                  description=booking['description'], user=user, status=EventStatus.PENDING,
+                  start_datetime=parse_booking_datetime(booking['start_datetime']),
+                  end_datetime=parse_booking_datetime(booking['end_datetime']))
+            for _, booking in bookings
+        ]
+        try:
+            with transaction.atomic():
+                self.data_class.bulk_create_events(events)
+                if enqueue:
+                    self.job_helper.enqueue_events([
+                        (event, booking['start_datetime'], booking['end_datetime'])
+                        for (_, booking), event in zip(bookings, events)
+                    ])
+            return [(index, booking, event) for (index, booking), event in zip(bookings, events)]
+        except IntegrityError:
+            pass
+        inserted = []
+        for (index, booking), event in zip(bookings, events):
+            event.pk = None
+            try:
+                with transaction.atomic():
+                    event.save()
+                    if enqueue:
+                        self.job_helper.enqueue_event(event, booking['start_datetime'], booking['end_datetime'])
+            except IntegrityError:
+                results[index] = {'code': 1, "error": "User is not available at this time"}
+                continue
+            inserted.append((index, booking, event))
+        return inserted
+
+    @flags_stale_busy_data
+    def check_collective_availability(self, **kwargs):
+        """
+        Checks whether every host in a group is free for the given range.
+        :param user_ids: List of host ids
+        :param start_datetime: Start datetime of the meeting
+        :param end_datetime: End datetime of the meeting
+        :return: Response message and status code
+        """
+        user_ids = kwargs.get('user_ids')
+        start_datetime = kwargs.get('start_datetime')
+        end_datetime = kwargs.get('end_datetime')
+        if not all([user_ids, start_datetime, end_datetime]) or not isinstance(user_ids, list):
+            return {"error": "Missing required fields"}, 400
+        user_ids = parse_user_ids(user_ids)
+        if user_ids is None:
+            return {"error": "User ids must be integers"}, 400
+        users = list(self.user_du.filter_users(id__in=user_ids))
+        if len(users) != len(user_ids):
+            return {"error": "One or more users not found"}, 404
+        zone = pytz.timezone(DEFAULT_TIMEZONE)
+        try:
+            start_datetime = datetime.fromisoformat(start_datetime.replace('Z', '+05:30')).astimezone(zone)
+            end_datetime = datetime.fromisoformat(end_datetime.replace('Z', '+05:30')).astimezone(zone)
+            is_available = self.collective_helper.check_availability(users, start_datetime, end_datetime)
+        except ValueError:
+            return {"error": "Invalid start or end datetime"}, 400
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve busy times"}, 500
+        return {
+            "message": "All users are available" if is_available else "Not all users are available",
+            "data": {"available": is_available}
+        }, 200
+
+    @flags_stale_busy_data
+    def get_collective_slots(self, **kwargs):
+        """
+        Lists the slots in which every host in a group is free.
+        :param user_ids: Host ids
+        :param start_date: First date (YYYY-MM-DD) to search
+        :param end_date: Last date (YYYY-MM-DD) to search
+        :param duration: Meeting length in minutes
+        :return: Response message and status code
+        """
+        user_ids = kwargs.get('user_ids')
+        if not all([user_ids, kwargs.get('start_date'), kwargs.get('end_date'), kwargs.get('duration')]):
+            return {"error": "Missing required fields"}, 400
+        try:
+            start_date = datetime.fromisoformat(kwargs['start_date'][0]).date()
+            end_date = datetime.fromisoformat(kwargs['end_date'][0]).date()
+            duration = timedelta(minutes=int(kwargs['duration'][0]))
+        except ValueError:
+            return {"error": "Dates must be in YYYY-MM-DD format and duration in minutes"}, 400
+        user_ids = parse_user_ids(user_ids)
+        if user_ids is None:
+            return {"error": "User ids must be integers"}, 400
+        users = list(self.user_du.filter_users(id__in=user_ids))
+        if len(users) != len(user_ids):
+            return {"error": "One or more users not found"}, 404
+        zone = pytz.timezone(DEFAULT_TIMEZONE)
+        range_start = max(
+            zone.localize(datetime.combine(start_date, datetime.min.time())),
+            datetime.now(timezone.utc).astimezone(zone)
+        )
+        range_end = zone.localize(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        try:
+            slot_starts = self.collective_helper.find_slots(users, range_start, range_end, duration)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve busy times"}, 500
+        return {
+            "message": "Available slots retrieved successfully",
+            "timezone": DEFAULT_TIMEZONE,
+            "data": [
+                {
+                    "start_time": slot.strftime('%Y-%m-%dT%H:%M:%S'),
+                    "end_time": (slot + duration).strftime('%Y-%m-%dT%H:%M:%S')
+                }
+                for slot in slot_starts
+            ]
+        }, 200
+
+    @flags_stale_busy_data
+    def hold_slot(self, **kwargs):
+        """
+        Holds a slot for a guest for SLOT_HOLD_TTL while they complete the
+        booking. Pass the returned hold_token to create_event.
+        :param user_id: Id of the host
+        :param guest_email: Email of the guest
+        :param start_datetime: Start datetime of the slot
+        :param end_datetime: End datetime of the slot
+        :return: Response message and status code
+        """
+        user_id = kwargs.get('user_id')
+        guest_email = kwargs.get('guest_email')
+        start_datetime = kwargs.get('start_datetime')
+        end_datetime = kwargs.get('end_datetime')
+        if not all([user_id, guest_email, start_datetime, end_datetime]):
+            return {"error": "Missing required fields"}, 400
+        user = self.user_du.get_user(id=user_id)
+        if not user:
+            return {"error": f"User not found for the id: {user_id}"}, 404
+        try:
+            start = parse_booking_datetime(start_datetime)
+            end = parse_booking_datetime(end_datetime)
+        except (AttributeError, ValueError):
+            return {"error": "Invalid start or end datetime"}, 400
+        if end <= start:
+            return {"error": "end_datetime must be after start_datetime"}, 400
+        try:
+            hold = self.hold_helper.place_hold(user, guest_email, start, end)
         except Exception as e:
-            return {"error": f"An error occurred while creating the event: {e}"}, 400
+            print(f"An error occurred: {e}")
+            return {"error": "Failed to retrieve busy times"}, 500
+        if hold is None:
+            return {"error": "User is not available at this time"}, 409
+        return {
+            "message": "Slot held successfully",
+            "data": {
+                "hold_token": str(hold.token),
+                "expires_at": hold.expires_at.isoformat()
+            }
+        }, 201
 
+    def release_slot_hold(self, **kwargs):
+        """
+        Releases a slot hold before it expires.
+        :param hold_token: Token returned by hold_slot
+        :return: Response message and status code
+        """
+        hold_token = kwargs.get('hold_token')
+        if not hold_token:
+            return {"error": "Missing required fields"}, 400
+        try:
+            hold_token = uuid.UUID(str(hold_token))
+        except ValueError:
+            return {"error": "Invalid hold token"}, 400
+        if not self.hold_helper.release_hold(hold_token):
+            return {"error": "Slot hold not found"}, 404
+        return {"message": "Slot hold released"}, 200
@@ -2,13 +2,17 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 
-from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
 from rest_framework.response import Response
 from rest_framework import status
 
-from users.api.utils import UsersUtils, EventUtils
+from SchedulEase.db_router import read_from_replica, replica_reads
+from users.api.utils import (
+    UsersUtils, EventUtils, UserAvailabilitySlotUtils, parse_flag, replica_has_schedule_version, schedule_etag
+)
 from _sebase.api.views import BaseViewSet
 
 
@@ -20,14 +24,50 @@ class UsersViewSet(BaseViewSet):
         return Response(resp, status=status_code)
 
 
+class UserAvailabilitySlotViewSet(BaseViewSet):
+    view_class = UserAvailabilitySlotUtils()
+
+    @method_decorator(condition(etag_func=schedule_etag))
+    def get_availability_slots(self, request):
+        with replica_reads() as routing:
+            # a replica behind the primary would pair the new ETag with an old body
+            if not replica_has_schedule_version(request):
+                routing.pinned = True
+            response, status_code = self.view_class.get_availability_slots(**request.query_params)
+        return Response(response, status=status_code)
+
+    def set_availability_slots(self, request):
+        response, status_code = self.view_class.set_availability_slots(**request.data)
+        return Response(response, status=status_code)
+
+
 # learn about APIViewSet
 class EventViewSet(BaseViewSet):
     view_class = EventUtils()
 
     def get_user_events(self, request):
+        if parse_flag(request.query_params.get('stream')):
+            lines, status_code = self.view_class.stream_user_events(**request.query_params)
+            if status_code != status.HTTP_200_OK:
+                return Response(lines, status=status_code)
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
         response, status_code = self.view_class.get_user_events(**request.query_params)
         return Response(response, status=status_code)
 
+    @read_from_replica
+    def get_available_slots(self, request):
+        response, status_code = self.view_class.get_available_slots(**request.query_params)
+        return Response(response, status=status_code)
+
+    def check_collective_availability(self, request):
+        response, status_code = self.view_class.check_collective_availability(**request.data)
+        return Response(response, status=status_code)
+
+    @read_from_replica
+    def get_collective_slots(self, request):
+        response, status_code = self.view_class.get_collective_slots(**request.query_params)
+        return Response(response, status=status_code)
+
     def create_event_type(self, request):
         response, status_code = self.view_class.create_event_type(
             request.user, **request.data)
@@ -38,6 +78,18 @@ class EventViewSet(BaseViewSet):
              **request.data)
         return Response(response, status=status_code)
 
+    def bulk_create_events(self, request):
+        response, status_code = self.view_class.bulk_create_events(**request.data)
+        return Response(response, status=status_code)
+
+    def hold_slot(self, request):
+        response, status_code = self.view_class.hold_slot(**request.data)
+        return Response(response, status=status_code)
+
+    def release_slot_hold(self, request):
+        response, status_code = self.view_class.release_slot_hold(**request.data)
+        return Response(response, status=status_code)
+
 
 class SignupView(BaseViewSet):
     view_class = UsersUtils()
@@ -54,21 +106,10 @@ class LoginView(BaseViewSet):
         return Response(response, status=status_code)
 
 class RefreshTokenView(APIView):
+    # a refresh request carries no access token to check
+    authentication_classes = []
+    view_class = UsersUtils()
+
     def post(self, request):
-        refresh_token = request.data.get('refresh')
-
-        payload = decode_jwt_token(refresh_token)
-        if payload is None:
-            return Response({'error': 'Invalid or expired refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
-
-        user_id = payload.get('user_id')
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
-
-        access_token, refresh_token = generate_tokens(user)
-        return Response({
-            'access': access_token,
-            'refresh': refresh_token
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        response, status_code = self.view_class.refresh_tokens(**request.data)
+        return Response(response, status=status_code)
\ No newline at end of file
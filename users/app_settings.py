@@ -8,3 +8,41 @@ class DaysOfWeek(models.IntegerChoices):
     FRIDAY = 5, "Friday"
     SATURDAY = 6, "Saturday"
     SUNDAY = 7, "Sunday"
+
+
+# Label of every DaysOfWeek value, indexed by the value itself.
+DAY_OF_WEEK_LABELS = ('', *DaysOfWeek.labels)
+
+
+# Granularity of the packed weekly availability bitmap stored on each user.
+AVAILABILITY_RESOLUTION_MINUTES = 15
+
+# Timezone bookings are interpreted in until users carry their own.
+DEFAULT_TIMEZONE = 'Asia/Kolkata'
+
+
+class EventStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    CONFIRMED = "confirmed", "Confirmed"
+    FAILED = "failed", "Failed"
+
+
+class CalendarJobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+# Upper bound on the number of events accepted by one bulk booking request.
+BULK_BOOKING_MAX_EVENTS = 500
+
+
+class ScheduleMode(models.TextChoices):
+    REPLACE = "replace", "Replace"
+    MERGE = "merge", "Merge"
+
+
+class GoogleCallPriority(models.TextChoices):
+    HIGH = "high", "High"  # bookings made while the guest waits
+    NORMAL = "normal", "Normal"  # availability and event lookups
+    LOW = "low", "Low"  # background workers, which retry later
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        import users.signals  # noqa: F401
+        if settings.GOOGLE_PRELOAD:
+            from users.helpers.google_libs import google_libs
+            google_libs.preload()
@@ -0,0 +1,241 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from email.parser import BytesParser, Parser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+EVENTS_PATH = re.compile(r'^/calendar/v3/calendars/(?P<calendar_id>[^/]+)/events$')
+EVENT_PATH = re.compile(r'^/calendar/v3/calendars/(?P<calendar_id>[^/]+)/events/(?P<event_id>[^/]+)$')
+FREEBUSY_PATH = '/calendar/v3/freeBusy'
+BATCH_PATH = '/batch/calendar/v3'
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FakeCalendarServer:
+    """
+    Local HTTP stand-in for the Calendar v3 endpoints the app calls:
+    events.list, events.get, events.insert and freebusy.query, on their own
+    or as parts of a batch request. Inserts with a client-supplied id that
+    already exists fail with a 409 like Google's. Calendars are keyed by
+    the bearer token, so every benchmark user gets their own; batch parts
+    carry their own token. Each HTTP request waits ``latency`` seconds
+    (plus up to ``jitter``) like a round trip to Google would, and fails
+    with a 503 with probability ``error_rate``.
+
+    Point GOOGLE_API_ROOT_URL at ``root_url`` to route the app to it.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calendars = {}
+        self._ids = itertools.count(1)
+        self.request_count = 0
+        self.error_count = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def root_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server._handle(self, 'GET')
+
+            def do_POST(self):
+                server._handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_event(self, token, start, end, **fields):
+        """
+        Seeds busy time on the calendar of the user holding ``token``.
+        """
+        return self._insert_event(token, {
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': end.isoformat()},
+            **fields,
+        })
+
+    def get_events(self, token):
+        with self._lock:
+            return list(self._calendars.get(token, []))
+
+    def _handle(self, handler, method):
+        url = urlsplit(handler.path)
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+        token = handler.headers.get('Authorization', '').removeprefix('Bearer ')
+
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        if delay:
+            time.sleep(delay)
+
+        if token and not failed and method == 'POST' and url.path == BATCH_PATH:
+            status_code = 200
+            content_type, data = self._handle_batch(handler.headers['Content-Type'], body)
+        else:
+            if not token:
+                status_code, payload = 401, self._error(401, 'Login Required')
+            elif failed:
+                status_code, payload = 503, self._error(503, 'Backend Error')
+            else:
+                status_code, payload = self._respond(method, url, body, token)
+            content_type, data = 'application/json; charset=UTF-8', json.dumps(payload).encode()
+
+        handler.send_response(status_code)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _respond(self, method, url, body, token):
+        """
+        :return: (status code, JSON payload) of one API call
+        """
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = json.loads(body or b'{}')
+        if not token:
+            return 401, self._error(401, 'Login Required')
+        if method == 'GET' and EVENTS_PATH.match(url.path):
+            return 200, self._list_events(token, query)
+        if method == 'GET' and EVENT_PATH.match(url.path):
+            event = self._get_event(token, EVENT_PATH.match(url.path)['event_id'])
+            return (200, event) if event else (404, self._error(404, 'Not Found'))
+        if method == 'POST' and EVENTS_PATH.match(url.path):
+            event = self._insert_event(token, body)
+            return (200, event) if event else (409, self._error(409, 'The requested identifier already exists.'))
+        if method == 'POST' and url.path == FREEBUSY_PATH:
+            return 200, self._query_free_busy(token, body)
+        return 404, self._error(404, 'Not Found')
+
+    def _handle_batch(self, content_type, body):
+        """
+        Answers every part of a multipart/mixed batch request as its own call.
+        :return: (content type, body) of the multipart/mixed response
+        """
+        request = BytesParser().parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+        boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+        for part in request.get_payload():
+            request_line, message = part.get_payload().split('\n', 1)
+            method, target, _ = request_line.split(' ', 2)
+            message = Parser().parsestr(message)
+            token = (message['Authorization'] or '').removeprefix('Bearer ')
+            status_code, payload = self._respond(method, urlsplit(target), message.get_payload().encode(), token)
+            parts.append(
+                f'--{boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: {part["Content-ID"].replace("<", "<response-", 1)}\r\n\r\n'
+                f'HTTP/1.1 {status_code} {HTTPStatus(status_code).phrase}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{json.dumps(payload)}\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n')
+        return f'multipart/mixed; boundary={boundary}', ''.join(parts).encode()
+
+    @staticmethod
+    def _error(code, message):
+        return {'error': {'code': code, 'message': message, 'errors': [{'message': message}]}}
+
+    def _list_events(self, token, query):
+        events = self.get_events(token)
+        if 'timeMin' in query:
+            time_min = _parse_time(query['timeMin'])
+            events = [event for event in events if _parse_time(event['end']['dateTime']) > time_min]
+        events.sort(key=lambda event: _parse_time(event['start']['dateTime']))
+        offset = int(query.get('pageToken') or 0)
+        page_size = int(query.get('maxResults') or 250)
+        result = {'kind': 'calendar#events', 'items': events[offset:offset + page_size]}
+        if offset + page_size < len(events):
+            result['nextPageToken'] = str(offset + page_size)
+        return result
+
+    def _get_event(self, token, event_id):
+        return next((event for event in self.get_events(token) if event['id'] == event_id), None)
+
+    def _insert_event(self, token, body):
+        """
+        :return: The stored event, or None if its client-supplied id is taken
+        """
+        event_id = body.get('id') or f'fake{next(self._ids)}'
+        meet_link = f'https://meet.google.com/{event_id}'
+        event = {
+            **body,
+            'id': event_id,
+            'status': 'confirmed',
+            'htmlLink': f'https://calendar.google.com/event?eid={event_id}',
+            'hangoutLink': meet_link,
+        }
+        if 'conferenceData' in body:
+            event['conferenceData'] = {
+                **body['conferenceData'],
+                'entryPoints': [{'entryPointType': 'video', 'uri': meet_link}],
+            }
+        with self._lock:
+            calendar = self._calendars.setdefault(token, [])
+            if any(existing['id'] == event_id for existing in calendar):
+                return None
+            calendar.append(event)
+        return event
+
+    def _query_free_busy(self, token, body):
+        time_min = _parse_time(body['timeMin'])
+        time_max = _parse_time(body['timeMax'])
+        busy = [
+            {'start': event['start']['dateTime'], 'end': event['end']['dateTime']}
+            for event in self.get_events(token)
+            if _parse_time(event['start']['dateTime']) < time_max and _parse_time(event['end']['dateTime']) > time_min
+        ]
+        return {
+            'kind': 'calendar#freeBusy',
+            'timeMin': body['timeMin'],
+            'timeMax': body['timeMax'],
+            'calendars': {item['id']: {'busy': busy} for item in body.get('items', [])},
+        }
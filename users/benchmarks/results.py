@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+# Metrics compared against a baseline and whether a higher value is worse.
+COMPARED_METRICS = {
+    'p50_ms': True,
+    'p95_ms': True,
+    'p99_ms': True,
+    'throughput': False,
+    'peak_kb': True,
+}
+# Allowed increase of a scenario's error rate, in absolute terms.
+ERROR_RATE_TOLERANCE = 0.01
+
+
+class BenchmarkRecorder:
+    """
+    Collects per-scenario request latencies from any number of threads and
+    the wall-clock time of each scenario, from which throughput follows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._wall_time = defaultdict(float)
+        self._peak_memory = {}
+
+    def record(self, scenario, seconds, ok=True):
+        with self._lock:
+            self._latencies[scenario].append(seconds)
+            if not ok:
+                self._errors[scenario] += 1
+
+    def record_peak_memory(self, scenario, size):
+        """
+        :param size: Bytes allocated at most by one run of the scenario
+        """
+        with self._lock:
+            self._peak_memory[scenario] = max(size, self._peak_memory.get(scenario, 0))
+
+    @contextmanager
+    def scenario(self, scenario):
+        """
+        Times the whole block as the wall-clock time of the scenario.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._wall_time[scenario] += time.perf_counter() - started
+
+    def summary(self):
+        """
+        :return: {scenario: {requests, errors, throughput, mean_ms, p50_ms, p95_ms, p99_ms}},
+                 plus peak_kb for scenarios with a recorded peak
+        """
+        summary = {}
+        with self._lock:
+            for scenario, latencies in self._latencies.items():
+                milliseconds = np.array(latencies) * 1000
+                wall_time = self._wall_time.get(scenario) or milliseconds.sum() / 1000
+                summary[scenario] = {
+                    'requests': len(latencies),
+                    'errors': self._errors[scenario],
+                    'throughput': round(len(latencies) / wall_time, 2) if wall_time else 0.0,
+                    'mean_ms': round(float(milliseconds.mean()), 2),
+                    **{
+                        f'p{percentile}_ms': round(float(value), 2)
+                        for percentile, value in zip(PERCENTILES, np.percentile(milliseconds, PERCENTILES))
+                    },
+                }
+                if scenario in self._peak_memory:
+                    summary[scenario]['peak_kb'] = round(self._peak_memory[scenario] / 1024, 1)
+        return summary
+
+
+def save_results(path, summary, config):
+    with open(path, 'w') as f:
+        json.dump({'config': config, 'scenarios': summary}, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(summary, baseline, tolerance):
+    """
+    Flags every metric that got worse than the baseline by more than the
+    tolerance. Scenarios missing from either side are skipped.
+    :param summary: Output of BenchmarkRecorder.summary()
+    :param baseline: Contents of a results file written by save_results
+    :param tolerance: Allowed relative slowdown, 0.2 being 20%
+    :return: List of regression messages, empty if there are none
+    """
+    regressions = []
+    for scenario, baseline_metrics in sorted(baseline.get('scenarios', {}).items()):
+        metrics = summary.get(scenario)
+        if metrics is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            previous, current = baseline_metrics.get(metric), metrics.get(metric)
+            if not previous or current is None:
+                continue
+            change = (current - previous) / previous
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append(f"{scenario}: {metric} {previous} -> {current} ({change:+.0%})")
+        previous_rate = baseline_metrics.get('errors', 0) / max(baseline_metrics.get('requests', 0), 1)
+        current_rate = metrics['errors'] / max(metrics['requests'], 1)
+        if current_rate > previous_rate + ERROR_RATE_TOLERANCE:
+            regressions.append(f"{scenario}: error rate {previous_rate:.1%} -> {current_rate:.1%}")
+    return regressions
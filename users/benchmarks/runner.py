@@ -0,0 +1,35 @@
+from django.test import override_settings
+
+from users.benchmarks.fake_calendar import FakeCalendarServer
+from users.benchmarks.results import BenchmarkRecorder
+from users.benchmarks.scenarios import BookingScenarios
+from users.benchmarks.serialization import SerializationScenarios
+
+
+def run_suite(hosts=20, bookings_per_host=5, lookup_rounds=3, concurrency=8,
+              latency=0.05, jitter=0.02, error_rate=0.0, seed=None,
+              slot_minutes=15, events=2500, serialization_rounds=20):
+    """
+    Runs every booking scenario against a fresh fake Calendar server, then
+    compares the old and new JSON serialization of the list endpoints.
+    Expects an empty database, such as the one set up by run_benchmarks.
+    :param latency: Seconds every fake Google call takes, plus up to ``jitter``
+    :param error_rate: Share of fake Google calls failing with a 503
+    :param slot_minutes: Length of the slots filling the week of the listed schedule
+    :param events: Number of events in the listed page
+    :return: BenchmarkRecorder.summary() of the run
+    """
+    recorder = BenchmarkRecorder()
+    with FakeCalendarServer(latency=latency, jitter=jitter, error_rate=error_rate, seed=seed) as server, \
+            override_settings(GOOGLE_API_ROOT_URL=server.root_url, GOOGLE_ASYNC_BOOKING=False):
+        scenarios = BookingScenarios(recorder)
+        users = scenarios.signup(hosts)
+        event_types = scenarios.setup_availability(users)
+        slots = scenarios.lookup_slots(event_types, lookup_rounds)
+        scenarios.check_availability(event_types, slots)
+        scenarios.book_concurrently(event_types, slots, bookings_per_host, concurrency)
+        scenarios.list_events(users, concurrency)
+    serialization = SerializationScenarios(recorder)
+    serialization.schedule_listing(serialization.setup_schedule(slot_minutes), serialization_rounds)
+    serialization.event_listing(events, serialization_rounds)
+    return recorder.summary()
@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytz
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from users.app_settings import DEFAULT_TIMEZONE, DaysOfWeek
+from users.helpers.event_helper import EventHelper
+from users.models import EventType, User
+
+WORKDAYS = [DaysOfWeek.MONDAY, DaysOfWeek.TUESDAY, DaysOfWeek.WEDNESDAY, DaysOfWeek.THURSDAY, DaysOfWeek.FRIDAY]
+WORKING_HOURS = ('09:00', '17:00')
+BOOKING_WINDOW_DAYS = 14
+MEETING_DURATION = timedelta(minutes=30)
+
+
+class BookingScenarios:
+    """
+    Drives the booking flow end to end through the URL routes, the way
+    clients do: signup, weekly availability setup, slot lookup, availability
+    checks, event listing and concurrent booking. Every request's latency
+    goes to the recorder under the scenario's name.
+    """
+
+    def __init__(self, recorder, prefix='bench'):
+        self.recorder = recorder
+        self.prefix = prefix
+        self.zone = pytz.timezone(DEFAULT_TIMEZONE)
+        self.event_helper = EventHelper()
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            # server errors count as failed requests instead of ending the run
+            self._local.client = Client(raise_request_exception=False)
+        return self._local.client
+
+    def _request(self, scenario, method, url_name, data=None, ok_statuses=(200,)):
+        client = self._client()
+        started = time.perf_counter()
+        if method == 'get':
+            response = client.get(reverse(f'users_api:{url_name}'), data)
+        else:
+            response = client.post(reverse(f'users_api:{url_name}'), data, content_type='application/json')
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        self.recorder.record(scenario, time.perf_counter() - started, ok=response.status_code in ok_statuses)
+        return response
+
+    def _run_concurrently(self, scenario, tasks, concurrency):
+        """
+        Runs the callables on ``concurrency`` threads, each holding its own
+        client and database connection for the whole scenario.
+        """
+        pending = queue.Queue()
+        for task in tasks:
+            pending.put(task)
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        task = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    task()
+            finally:
+                connections.close_all()
+
+        with self.recorder.scenario(scenario):
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    def signup(self, count):
+        """
+        Signs up ``count`` hosts and links them to the fake Calendar server
+        through a per-user access token.
+        :return: The created users
+        """
+        with self.recorder.scenario('signup'):
+            for index in range(count):
+                self._request('signup', 'post', 'sigup_user', {
+                    'name': f'{self.prefix} host {index}',
+                    'email': f'{self.prefix}-host-{index}@example.com',
+                    'password': 'benchmark',
+                })
+        users = list(User.objects.filter(email__startswith=f'{self.prefix}-host-').order_by('id'))
+        for user in users:
+            user.google_access_token = f'{self.prefix}-token-{user.id}'
+            user.google_token_expiry = None
+        User.objects.bulk_update(users, ['google_access_token', 'google_token_expiry'])
+        return users
+
+    def setup_availability(self, users):
+        with self.recorder.scenario('availability_setup'):
+            for user in users:
+                self._request('availability_setup', 'post', 'set_availability_slots', {
+                    'user_id': user.id,
+                    'slots': [
+                        {'day_of_week': day, 'start_time': WORKING_HOURS[0], 'end_time': WORKING_HOURS[1]}
+                        for day in WORKDAYS
+                    ],
+                })
+        first_day = date.today() + timedelta(days=1)
+        return EventType.objects.bulk_create([
+            EventType(name=f'{self.prefix} meeting', duration=MEETING_DURATION, user=user,
+                      start_date=first_day, end_date=first_day + timedelta(days=BOOKING_WINDOW_DAYS - 1))
+            for user in users
+        ])
+
+    def lookup_slots(self, event_types, rounds):
+        """
+        :return: {event_type id: [(start, end) ISO strings with offsets, ...]} from the last round
+        """
+        slots = {}
+        with self.recorder.scenario('slot_lookup'):
+            for _ in range(rounds):
+                for event_type in event_types:
+                    response = self._request('slot_lookup', 'get', 'get_available_slots',
+                                             {'event_type_id': event_type.id})
+                    slots[event_type.id] = [
+                        (self._localize(slot['start_time']), self._localize(slot['end_time']))
+                        for slot in response.json().get('data', [])
+                    ]
+        return slots
+
+    def check_availability(self, event_types, slots):
+        """
+        Calls EventHelper.check_user_availability directly for the first
+        open slot of every host, free busy lookup included.
+        """
+        with self.recorder.scenario('check_availability'):
+            for event_type in event_types:
+                if not slots.get(event_type.id):
+                    continue
+                start, end = slots[event_type.id][0]
+                started = time.perf_counter()
+                available = self.event_helper.check_user_availability(event_type.user, start, end)
+                self.recorder.record('check_availability', time.perf_counter() - started, ok=available)
+
+    def book_concurrently(self, event_types, slots, bookings_per_host, concurrency):
+        """
+        Books distinct open slots of every host from ``concurrency`` threads
+        at once, interleaving hosts so threads contend on the same calendars.
+        """
+        bookings = []
+        for index in range(bookings_per_host):
+            for event_type in event_types:
+                host_slots = slots.get(event_type.id, [])
+                # slots start every quarter hour; every other one keeps
+                # half-hour bookings from overlapping
+                if 2 * index < len(host_slots):
+                    start, end = host_slots[2 * index]
+                    bookings.append({
+                        'event_type_id': event_type.id,
+                        'user_id': event_type.user_id,
+                        'guest_email': f'{self.prefix}-guest-{len(bookings)}@example.com',
+                        'description': 'Benchmark booking',
+                        'start_datetime': start,
+                        'end_datetime': end,
+                        'async_booking': False,
+                    })
+        self._run_concurrently('create_event', [
+            lambda booking=booking: self._request('create_event', 'post', 'create_event', booking)
+            for booking in bookings
+        ], concurrency)
+
+    def list_events(self, users, concurrency):
+        self._run_concurrently('get_user_events', [
+            lambda user=user: self._request('get_user_events', 'get', 'get_user_events', {'user_id': user.id})
+            for user in users
+        ], concurrency)
+
+    def _localize(self, value):
+        return self.zone.localize(datetime.fromisoformat(value)).isoformat()
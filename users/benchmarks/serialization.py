@@ -0,0 +1,100 @@
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from users.api.renderers import ORJSONRenderer
+from users.api.utils import UserAvailabilitySlotUtils
+from users.app_settings import DaysOfWeek
+from users.helpers.event_helper import serialize_google_event
+from users.models import User, UserAvailabilitySlot
+
+
+def legacy_availability_slots(user_id):
+    """
+    The availability listing as it was built before the values_list
+    projection: full model instances, an exists() query up front and
+    get_day_of_week_display() per row.
+    """
+    user = User.objects.get(id=user_id)
+    availability_slots = UserAvailabilitySlot.objects.filter(user=user)
+    if not availability_slots.exists():
+        return {"message": "No availability slots found"}, 200
+    slots = []
+    for slot in availability_slots:
+        slots.append({
+            "day_of_week": slot.get_day_of_week_display(),
+            "start_time": slot.start_time,
+            "end_time": slot.end_time
+        })
+    return {"message": "Availability slots retrieved successfully", "data": slots}, 200
+
+
+class SerializationScenarios:
+    """
+    Compares the old and the new way of turning list endpoint results into
+    JSON: a full weekly schedule, and a page of upcoming events as returned
+    by the Calendar API. Each path's latency goes to the recorder, and the
+    peak memory allocated by one run to its peak_kb.
+    """
+
+    def __init__(self, recorder, prefix='bench'):
+        self.recorder = recorder
+        self.prefix = prefix
+        self.slot_utils = UserAvailabilitySlotUtils()
+
+    def _measure(self, scenario, render, rounds):
+        with self.recorder.scenario(scenario):
+            for _ in range(rounds):
+                started = time.perf_counter()
+                render()
+                self.recorder.record(scenario, time.perf_counter() - started)
+        tracemalloc.start()
+        try:
+            render()
+            self.recorder.record_peak_memory(scenario, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    def setup_schedule(self, slot_minutes):
+        """
+        Creates a host available all week in back-to-back slots of ``slot_minutes``.
+        :return: The host's id
+        """
+        user = User.objects.create_user(email=f'{self.prefix}-schedule@example.com', password='benchmark',
+                                        name='Schedule host')
+        midnight = datetime(2000, 1, 1)
+        starts = [midnight + timedelta(minutes=offset) for offset in range(0, 24 * 60, slot_minutes)]
+        UserAvailabilitySlot.objects.bulk_create([
+            UserAvailabilitySlot(user=user, day_of_week=day, start_time=start.time(),
+                                 end_time=min(start + timedelta(minutes=slot_minutes),
+                                              midnight + timedelta(hours=23, minutes=59)).time())
+            for day in DaysOfWeek.values for start in starts
+        ])
+        return user.id
+
+    def schedule_listing(self, user_id, rounds):
+        legacy_renderer, renderer = JSONRenderer(), ORJSONRenderer()
+        self._measure('slots_json_legacy', lambda: legacy_renderer.render(
+            legacy_availability_slots(user_id)[0]), rounds)
+        self._measure('slots_json_fast', lambda: renderer.render(
+            self.slot_utils.get_availability_slots(user_id=[str(user_id)])[0]), rounds)
+
+    def event_listing(self, events, rounds):
+        start = datetime(2024, 9, 2, 9, tzinfo=timezone.utc)
+        payload = {
+            "message": "Events retrieved successfully",
+            "data": [serialize_google_event({
+                'summary': f'Meeting {index}',
+                'description': 'Benchmark event',
+                'start': {'dateTime': (start + timedelta(minutes=30 * index)).isoformat()},
+                'end': {'dateTime': (start + timedelta(minutes=30 * index + 30)).isoformat()},
+                'hangoutLink': f'https://meet.google.com/bench-{index}',
+                'attendees': [{'email': f'guest{index}@example.com'}, {'email': 'host@example.com'}],
+            }) for index in range(events)],
+            "next_cursor": None,
+        }
+        legacy_renderer, renderer = JSONRenderer(), ORJSONRenderer()
+        self._measure('events_json_legacy', lambda: legacy_renderer.render(payload), rounds)
+        self._measure('events_json_fast', lambda: renderer.render(payload), rounds)
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Runs in a fresh interpreter: sets up Django and loads every URL route, as
+# a worker does before it serves its first request.
+STARTUP_SCRIPT = """
+import json, resource, sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'rss_kb': rss // 1024 if sys.platform == 'darwin' else rss, 'modules': sorted(sys.modules)}))
+"""
+
+
+def parse_import_time(output):
+    """
+    :param output: stderr of ``python -X importtime``
+    :return: Total milliseconds spent in top-level imports, nested ones included
+    """
+    total_us = 0
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        # nested imports are indented below the import that caused them
+        if cumulative.strip().isdigit() and not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def measure_startup(env=None):
+    """
+    Boots the project in a new interpreter under ``-X importtime``.
+    :param env: Extra environment variables, e.g. {'GOOGLE_PRELOAD': 'true'}
+    :return: {'import_ms': ..., 'rss_kb': ..., 'modules': [loaded module names]}
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        capture_output=True, text=True, check=True, cwd=settings.BASE_DIR, env={**os.environ, **(env or {})},
+    )
+    startup = json.loads(result.stdout.splitlines()[-1])
+    startup['import_ms'] = parse_import_time(result.stderr)
+    return startup
+
+
+def check_startup_budget(startup):
+    """
+    :param startup: Return value of measure_startup
+    :return: Messages for each of STARTUP_IMPORT_BUDGET_MS and STARTUP_RSS_BUDGET_MB exceeded
+    """
+    over_budget = []
+    if startup['import_ms'] > settings.STARTUP_IMPORT_BUDGET_MS:
+        over_budget.append(f"imports took {startup['import_ms']:.0f} ms, "
+                           f"budget {settings.STARTUP_IMPORT_BUDGET_MS} ms")
+    if startup['rss_kb'] > settings.STARTUP_RSS_BUDGET_MB * 1024:
+        over_budget.append(f"peak RSS was {startup['rss_kb'] // 1024} MB, "
+                           f"budget {settings.STARTUP_RSS_BUDGET_MB} MB")
+    return over_budget
@@ -0,0 +1,72 @@
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from SchedulEase.metrics import track_google_call
+from users.helpers.google_libs import google_libs
+from users.helpers.quota_governor import google_quota
+from users.helpers.token_manager import token_manager
+
+
+class AsyncCalendarClient:
+    """
+    Calls the Calendar v3 REST API with httpx so that async views wait on
+    Google without holding a thread. Each event loop gets one pooled
+    keep-alive client. Tokens come from the shared token manager, which
+    only touches the database when a token has to be refreshed, and
+    requests are admitted by the quota governor.
+    """
+
+    def __init__(self):
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            httpx = google_libs.httpx
+            client = httpx.AsyncClient(
+                base_url=f'{settings.GOOGLE_API_ROOT_URL}calendar/v3',
+                timeout=settings.GOOGLE_HTTP_TIMEOUT,
+                limits=httpx.Limits(max_connections=settings.GOOGLE_ASYNC_MAX_CONNECTIONS),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def _request(self, user, method, path, **kwargs):
+        credentials = token_manager.get_cached_credentials(user.id)
+        if credentials is None:
+            credentials = await sync_to_async(token_manager.get_credentials)(user)
+        response = await self._send(user, method, path, credentials, **kwargs)
+        if response.status_code == 401 and user.google_refresh_token:
+            # revoked or expired early; refresh once and retry
+            credentials = await sync_to_async(token_manager.refresh)(user.id)
+            response = await self._send(user, method, path, credentials, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def _send(self, user, method, path, credentials, **kwargs):
+        async def send():
+            with track_google_call():
+                return await self._get_client().request(
+                    method, path, headers={'Authorization': f'Bearer {credentials.token}'}, **kwargs)
+
+        return await google_quota.acall(user.id, send)
+
+    async def list_events(self, user, calendar_id='primary', **params):
+        return await self._request(user, 'GET', f'/calendars/{calendar_id}/events', params=params)
+
+    async def get_event(self, user, event_id, calendar_id='primary'):
+        return await self._request(user, 'GET', f'/calendars/{calendar_id}/events/{event_id}')
+
+    async def insert_event(self, user, body, calendar_id='primary', **params):
+        return await self._request(user, 'POST', f'/calendars/{calendar_id}/events', params=params, json=body)
+
+    async def query_free_busy(self, user, body, timeout=None):
+        return await self._request(user, 'POST', '/freeBusy', json=body,
+                                   timeout=timeout or settings.GOOGLE_HTTP_TIMEOUT)
+
+
+async_calendar_client = AsyncCalendarClient()
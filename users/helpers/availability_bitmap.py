@@ -0,0 +1,115 @@
+import math
+import re
+
+from users.app_settings import AVAILABILITY_RESOLUTION_MINUTES
+
+MINUTES_PER_DAY = 24 * 60
+SLOTS_PER_DAY = MINUTES_PER_DAY // AVAILABILITY_RESOLUTION_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + (value.second + value.microsecond / 1e6) / 60
+
+
+class AvailabilityBitmap:
+    """
+    A user's weekly availability packed into 7 x 96 quarter-hour bits.
+    Bit ``(day_of_week - 1) * SLOTS_PER_DAY + n`` is set when the user is
+    available during the n-th quarter hour of that day, so containment
+    checks are a single mask comparison instead of a query.
+
+    Slot boundaries that do not fall on a quarter hour are rounded inwards
+    when stored, and requested ranges are rounded outwards when checked
+    for containment, so the bitmap never reports availability that the
+    underlying slots do not provide.
+
+    Availability is the union of the slots: a range is covered when every
+    quarter hour it touches is set, whichever slots set them, so a booking
+    may run from one slot into an adjacent one, just as the slot search
+    and the materialized open intervals offer it. The week is a ring, but
+    since a slot must end before midnight, the last quarter hour of a day
+    is never set and no booking is covered across midnight.
+    """
+    SIZE = SLOTS_PER_WEEK // 8
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        return cls(int.from_bytes(bytes(data), 'little'))
+
+    def to_bytes(self):
+        return self.bits.to_bytes(self.SIZE, 'little')
+
+    @classmethod
+    def from_slots(cls, slots):
+        """
+        :param slots: Iterable of (day_of_week, start_time, end_time) tuples
+        """
+        bitmap = cls()
+        for day_of_week, start_time, end_time in slots:
+            bitmap.bits |= cls._day_mask(day_of_week, start_time, end_time, inward=True)
+        return bitmap
+
+    @staticmethod
+    def _mask(start_index, end_index):
+        """
+        Mask for the half-open slot range [start_index, end_index), wrapping
+        from Sunday night into Monday morning.
+        """
+        if end_index - start_index >= SLOTS_PER_WEEK:
+            return (1 << SLOTS_PER_WEEK) - 1
+        if end_index <= start_index:
+            return 0
+        length = end_index - start_index
+        start_index %= SLOTS_PER_WEEK
+        end_index = start_index + length
+        mask = ((1 << (min(end_index, SLOTS_PER_WEEK) - start_index)) - 1) << start_index
+        if end_index > SLOTS_PER_WEEK:
+            mask |= (1 << (end_index - SLOTS_PER_WEEK)) - 1
+        return mask
+
+    @classmethod
+    def _day_mask(cls, day_of_week, start_time, end_time, inward):
+        offset = (day_of_week - 1) * SLOTS_PER_DAY
+        start = _minutes(start_time) / AVAILABILITY_RESOLUTION_MINUTES
+        end = _minutes(end_time) / AVAILABILITY_RESOLUTION_MINUTES
+        if inward:
+            start_index, end_index = math.ceil(start), math.floor(end)
+        else:
+            start_index, end_index = math.floor(start), math.ceil(end)
+        return cls._mask(offset + start_index, offset + end_index)
+
+    def covers(self, start_datetime, end_datetime):
+        """
+        Checks whether the whole range between two datetimes falls inside
+        the weekly availability, using the weekday and wall-clock time of
+        ``start_datetime``.
+        """
+        start = (start_datetime.weekday() * MINUTES_PER_DAY + _minutes(start_datetime)) \
+            / AVAILABILITY_RESOLUTION_MINUTES
+        length = (end_datetime - start_datetime).total_seconds() / 60 / AVAILABILITY_RESOLUTION_MINUTES
+        mask = self._mask(math.floor(start), math.ceil(start + length))
+        return mask != 0 and self.bits & mask == mask
+
+    def iter_runs(self):
+        """
+        Yields the (start_index, end_index) slot ranges of continuous
+        availability within the week, Monday 00:00 being index 0.
+        """
+        for run in re.finditer('1+', format(self.bits, f'0{SLOTS_PER_WEEK}b')[::-1]):
+            yield run.start(), run.end()
+
+    def iter_day_runs(self, weekday):
+        """
+        Yields the (start_index, end_index) slot ranges of availability
+        within one day, 0 being midnight.
+        :param weekday: Day as returned by date.weekday(), Monday being 0
+        """
+        day_bits = (self.bits >> (weekday * SLOTS_PER_DAY)) & ((1 << SLOTS_PER_DAY) - 1)
+        for run in re.finditer('1+', format(day_bits, f'0{SLOTS_PER_DAY}b')[::-1]):
+            yield run.start(), run.end()
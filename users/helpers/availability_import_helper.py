@@ -0,0 +1,114 @@
+from collections import defaultdict
+from datetime import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from users.app_settings import DaysOfWeek, ScheduleMode
+from users.helpers.availability_bitmap import AvailabilityBitmap
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.models import User, UserAvailabilitySlot, validate_time_interval
+
+DAYS_BY_LABEL = {label.lower(): value for value, label in DaysOfWeek.choices}
+
+
+class AvailabilityImportHelper:
+    """
+    Writes whole weekly schedules for many users at once. Input is parsed
+    and checked for overlaps in memory, and each call touches the database
+    with a fixed number of queries regardless of the number of users.
+    """
+    open_interval_helper = OpenIntervalHelper()
+
+    @staticmethod
+    def parse_slot(slot):
+        """
+        :param slot: Mapping with day_of_week (label or number), start_time and end_time (HH:MM[:SS])
+        :return: (day_of_week, start_time, end_time)
+        """
+        day_of_week = slot.get('day_of_week')
+        if isinstance(day_of_week, str) and not day_of_week.isdigit():
+            day_of_week = DAYS_BY_LABEL.get(day_of_week.strip().lower())
+        try:
+            day_of_week = int(day_of_week)
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid day of week")
+        if day_of_week not in DaysOfWeek.values:
+            raise ValidationError("Invalid day of week")
+        try:
+            start_time = time.fromisoformat(str(slot.get('start_time')).strip())
+            end_time = time.fromisoformat(str(slot.get('end_time')).strip())
+        except ValueError:
+            raise ValidationError("Times must be in HH:MM or HH:MM:SS format")
+        validate_time_interval(start_time, end_time)
+        return day_of_week, start_time, end_time
+
+    @staticmethod
+    def find_overlap(slots):
+        """
+        Single pass over the sorted slots of one user.
+        :param slots: Distinct (day_of_week, start_time, end_time) tuples
+        :return: The first pair of overlapping slots, or None
+        """
+        slots = sorted(slots)
+        for previous, current in zip(slots, slots[1:]):
+            if previous[0] == current[0] and current[1] < previous[2]:
+                return previous, current
+        return None
+
+    def save_schedules(self, schedules, mode=ScheduleMode.REPLACE):
+        """
+        Replaces or extends the weekly availability of several users in one
+        transaction.
+        :param schedules: {user_id: [(day_of_week, start_time, end_time), ...]}
+        :param mode: ScheduleMode.REPLACE drops the existing slots of each user,
+                     ScheduleMode.MERGE keeps them and adds the new ones
+        :return: {user_id: error message} for the schedules that were
+                 rejected; every other schedule is saved
+        """
+        final = {user_id: set(slots) for user_id, slots in schedules.items()}
+        existing = defaultdict(set)
+        if mode == ScheduleMode.MERGE:
+            for user_id, *slot in UserAvailabilitySlot.objects.filter(user_id__in=final).values_list(
+                    'user_id', 'day_of_week', 'start_time', 'end_time'):
+                existing[user_id].add(tuple(slot))
+                final[user_id].add(tuple(slot))
+        errors = {}
+        for user_id, slots in final.items():
+            overlap = self.find_overlap(slots)
+            if overlap:
+                errors[user_id] = "Slots {} and {} overlap".format(
+                    *(f"{DaysOfWeek(day).label} {start:%H:%M}-{end:%H:%M}" for day, start, end in overlap))
+        for user_id in errors:
+            del final[user_id]
+        if not final:
+            return errors
+        with transaction.atomic():
+            if mode == ScheduleMode.REPLACE:
+                # one DELETE without the per-row signals, whose bitmap, open
+                # interval and version updates are done in bulk below
+                replaced = UserAvailabilitySlot.objects.filter(user_id__in=final)
+                replaced._raw_delete(using=replaced.db)
+            UserAvailabilitySlot.objects.bulk_create(
+                [
+                    UserAvailabilitySlot(user_id=user_id, day_of_week=day, start_time=start, end_time=end)
+                    for user_id, slots in final.items()
+                    for day, start, end in sorted(slots - existing[user_id])
+                ],
+                batch_size=1000,
+            )
+            User.objects.bulk_update(
+                [
+                    User(
+                        id=user_id,
+                        availability_bitmap=AvailabilityBitmap.from_slots(slots).to_bytes(),
+                        schedule_version=F('schedule_version') + 1,
+                    )
+                    for user_id, slots in final.items()
+                ],
+                ['availability_bitmap', 'schedule_version'],
+                batch_size=1000,
+            )
+            self.open_interval_helper.refresh_users(final)
+        return errors
@@ -0,0 +1,128 @@
+import contextvars
+import threading
+from datetime import datetime, time, timedelta, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from cachetools import LRUCache
+from django.conf import settings
+
+ONE_DAY = timedelta(days=1)
+
+
+def day_window(start_datetime, end_datetime):
+    """
+    :return: The window widened to whole UTC days, as aware datetimes
+    """
+    start = datetime.combine(start_datetime.astimezone(timezone.utc).date(), time(), timezone.utc)
+    end = datetime.combine(end_datetime.astimezone(timezone.utc).date(), time(), timezone.utc)
+    return start, (end if end == end_datetime else end + ONE_DAY)
+
+
+class BusyIntervalCache:
+    """
+    The busy intervals last read from Google, per user and UTC day, for
+    answering availability checks while the Calendar API is unreachable.
+    Entries live in process memory and are evicted least recently used.
+    """
+
+    def __init__(self):
+        self._days = LRUCache(maxsize=settings.GOOGLE_BUSY_CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    def store(self, user_id, start_datetime, end_datetime, intervals, fetched_at=None):
+        """
+        :param start_datetime: Start of the window that was read, at midnight UTC
+        :param end_datetime: End of the window that was read, at midnight UTC
+        :param intervals: All busy (start, end) intervals of the window
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        day = start_datetime
+        with self._lock:
+            while day < end_datetime:
+                next_day = day + ONE_DAY
+                self._days[user_id, day] = fetched_at, [
+                    (start, end) for start, end in intervals if start < next_day and end > day]
+                day = next_day
+
+    def lookup(self, user_id, start_datetime, end_datetime):
+        """
+        :return: (busy intervals overlapping the window, time of the oldest read
+                 they come from), or None unless every day of the window was read
+                 within GOOGLE_BUSY_CACHE_MAX_AGE
+        """
+        oldest_allowed = datetime.now(timezone.utc) - settings.GOOGLE_BUSY_CACHE_MAX_AGE
+        day, end = day_window(start_datetime, end_datetime)
+        intervals = set()
+        as_of = None
+        with self._lock:
+            while day < end:
+                entry = self._days.get((user_id, day))
+                if entry is None or entry[0] < oldest_allowed:
+                    return None
+                as_of = entry[0] if as_of is None else min(as_of, entry[0])
+                intervals.update(entry[1])
+                day += ONE_DAY
+        return [(start, end) for start, end in sorted(intervals)
+                if start < end_datetime and end > start_datetime], as_of
+
+
+busy_interval_cache = BusyIntervalCache()
+
+
+class BusyDataFreshness:
+    __slots__ = ('stale_since',)
+
+    def __init__(self):
+        self.stale_since = None
+
+    def mark_stale(self, as_of):
+        if self.stale_since is None or as_of < self.stale_since:
+            self.stale_since = as_of
+
+
+# Holds a mutable BusyDataFreshness so that fallbacks taken in threads
+# spawned by sync_to_async reach the response of the request that owns them.
+_busy_data_freshness = contextvars.ContextVar('busy_data_freshness', default=None)
+
+
+def mark_busy_data_stale(as_of):
+    freshness = _busy_data_freshness.get()
+    if freshness is not None:
+        freshness.mark_stale(as_of)
+
+
+def _flag_stale(response, freshness):
+    data, status_code = response
+    if freshness.stale_since is not None and isinstance(data, dict):
+        data['busy_data_stale'] = True
+        data['busy_data_as_of'] = freshness.stale_since.isoformat()
+    return data, status_code
+
+
+def flags_stale_busy_data(method):
+    """
+    Adds "busy_data_stale" and "busy_data_as_of" to the (data, status)
+    response of a utils method when it decided on cached busy times
+    because Google Calendar could not be read.
+    """
+    if iscoroutinefunction(method):
+        @wraps(method)
+        async def ainner(*args, **kwargs):
+            freshness = BusyDataFreshness()
+            token = _busy_data_freshness.set(freshness)
+            try:
+                return _flag_stale(await method(*args, **kwargs), freshness)
+            finally:
+                _busy_data_freshness.reset(token)
+        return ainner
+
+    @wraps(method)
+    def inner(*args, **kwargs):
+        freshness = BusyDataFreshness()
+        token = _busy_data_freshness.set(freshness)
+        try:
+            return _flag_stale(method(*args, **kwargs), freshness)
+        finally:
+            _busy_data_freshness.reset(token)
+    return inner
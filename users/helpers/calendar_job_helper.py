@@ -0,0 +1,144 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from users.app_settings import CalendarJobStatus, EventStatus
+from users.helpers.event_helper import EventHelper, google_event_id
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.models import CalendarJob, Event, bump_schedule_version
+
+
+class CalendarJobHelper:
+    event_helper = EventHelper()
+    open_interval_helper = OpenIntervalHelper()
+
+    def enqueue_event(self, event, start_datetime, end_datetime):
+        """
+        Queues the Google Calendar insert for an Event that was saved as pending.
+        :param event: Event instance
+        :param start_datetime: Start datetime of the event as a string
+        :param end_datetime: End datetime of the event as a string
+        """
+        return CalendarJob.objects.create(event=event, payload={
+            'start_datetime': start_datetime,
+            'end_datetime': end_datetime,
+        })
+
+    def enqueue_events(self, bookings):
+        """
+        Bulk variant of enqueue_event.
+        :param bookings: List of (event, start_datetime, end_datetime) tuples
+        """
+        return CalendarJob.objects.bulk_create([
+            CalendarJob(event=event, payload={
+                'start_datetime': start_datetime,
+                'end_datetime': end_datetime,
+            })
+            for event, start_datetime, end_datetime in bookings
+        ])
+
+    def claim_jobs(self, batch_size):
+        """
+        Claims up to ``batch_size`` due jobs. Rows locked by another worker are
+        skipped rather than waited on, and jobs left running by a crashed
+        worker become claimable again after CALENDAR_JOB_LOCK_TIMEOUT.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                CalendarJob.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('event__event_type', 'event__user')
+                .filter(
+                    Q(status=CalendarJobStatus.QUEUED, run_at__lte=now) |
+                    Q(status=CalendarJobStatus.RUNNING, locked_at__lt=now - settings.CALENDAR_JOB_LOCK_TIMEOUT)
+                )
+                .order_by('run_at')[:batch_size]
+            )
+            CalendarJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=CalendarJobStatus.RUNNING, locked_at=now, attempts=F('attempts') + 1
+            )
+        for job in jobs:
+            job.attempts += 1
+        return jobs
+
+    def run_job(self, job):
+        """
+        Inserts the job's event into Google Calendar and backfills its meet link,
+        rescheduling with exponential backoff on failure. The Google event id is
+        derived from the Event, so a retry or a reclaimed job picks up the event
+        an earlier attempt created instead of inviting the guest twice.
+        :return: True if the event was created
+        """
+        event = job.event
+        google_event_data, created = self.event_helper.create_google_event(
+            event.user, event.event_type, event.guest_email, event.description,
+            job.payload['start_datetime'], job.payload['end_datetime'],
+            request_id=f"schedulease-event-{event.id}", event_id=google_event_id(event.id),
+        )
+        if created:
+            with transaction.atomic():
+                Event.objects.filter(id=event.id).update(
+                    meet_link=google_event_data.get('google_meet_link'), status=EventStatus.CONFIRMED)
+                bump_schedule_version([event.user_id])
+                CalendarJob.objects.filter(id=job.id).update(
+                    status=CalendarJobStatus.DONE, locked_at=None, last_error=None)
+            return True
+        if job.attempts >= settings.CALENDAR_JOB_MAX_ATTEMPTS:
+            with transaction.atomic():
+                Event.objects.filter(id=event.id).update(status=EventStatus.FAILED)
+                bump_schedule_version([event.user_id])
+                self.open_interval_helper.refresh_ranges([(event.user_id, event.start_datetime, event.end_datetime)])
+                CalendarJob.objects.filter(id=job.id).update(
+                    status=CalendarJobStatus.FAILED, locked_at=None, last_error=google_event_data['message'])
+            return False
+        CalendarJob.objects.filter(id=job.id).update(
+            status=CalendarJobStatus.QUEUED,
+            locked_at=None,
+            run_at=timezone.now() + self.get_retry_delay(job.attempts),
+            last_error=google_event_data['message'],
+        )
+        return False
+
+    def settle_abandoned_events(self):
+        """
+        Settles pending Events of synchronous bookings whose request died
+        between saving the Event and hearing back from Google, which would
+        otherwise hold their slot forever. Each booking's Google event id is
+        derived from the Event, so Google is asked whether it was created:
+        if so the Event is confirmed, if not it is dropped. Events Google
+        cannot be asked about right now are left for the next round.
+        :return: (confirmed count, dropped count)
+        """
+        cutoff = timezone.now() - settings.PENDING_EVENT_TIMEOUT
+        events = Event.objects.filter(
+            Q(created_at__lt=cutoff) | Q(created_at__isnull=True),
+            status=EventStatus.PENDING, calendarjob__isnull=True,
+        ).select_related('user')
+        confirmed = dropped = 0
+        for event in events:
+            try:
+                google_event = self.event_helper.get_google_event(event.user, google_event_id(event.id))
+            except Exception as e:
+                print(f"Could not settle pending event {event.id}: {e}")
+                continue
+            if google_event is None:
+                # deleting frees the slot through the Event post_delete signal
+                Event.objects.filter(id=event.id, status=EventStatus.PENDING).delete()
+                dropped += 1
+                continue
+            self.event_helper.sync_helper.record_event(event.user, google_event)
+            with transaction.atomic():
+                Event.objects.filter(id=event.id, status=EventStatus.PENDING).update(
+                    meet_link=self.event_helper._get_event_links(google_event)['google_meet_link'],
+                    status=EventStatus.CONFIRMED)
+                bump_schedule_version([event.user_id])
+            confirmed += 1
+        return confirmed, dropped
+
+    @staticmethod
+    def get_retry_delay(attempts):
+        delay = min(settings.CALENDAR_JOB_RETRY_DELAY * 2 ** (attempts - 1), settings.CALENDAR_JOB_MAX_RETRY_DELAY)
+        return delay * random.uniform(0.5, 1)
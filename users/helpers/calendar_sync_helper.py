@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+import pytz
+
+from django.db import transaction
+
+from users.app_settings import DEFAULT_TIMEZONE
+from users.helpers.google_libs import get_calendar_service, google_libs
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.models import BusyInterval, User, bump_schedule_version
+
+# How far back the initial full sync reaches; later syncs only see changes.
+FULL_SYNC_LOOKBACK = timedelta(days=1)
+
+
+def parse_google_time(value, zone):
+    """
+    Converts a Google Calendar start/end object to an aware datetime.
+    All-day events only carry a date, which is taken as midnight in ``zone``.
+    """
+    if 'dateTime' in value:
+        return datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+    return zone.localize(datetime.fromisoformat(value['date']))
+
+
+class CalendarSyncHelper:
+    open_interval_helper = OpenIntervalHelper()
+
+    def sync_user(self, user, service=None):
+        """
+        Brings the user's BusyInterval mirror up to date with their primary
+        Google Calendar. Uses the stored sync token to fetch only what changed
+        since the last run, and falls back to a full sync when Google reports
+        the token as expired (HTTP 410).
+        :param user: User instance
+        :param service: Optional Calendar API service, built from the user's tokens if omitted
+        :return: Number of intervals added, updated or removed
+        """
+        if service is None:
+            service = get_calendar_service(user)
+        sync_token = user.google_sync_token
+        try:
+            busy, freed, next_sync_token = self._fetch_changes(service, sync_token)
+        except google_libs.HttpError as e:
+            if e.resp.status != 410 or sync_token is None:
+                raise
+            sync_token = None
+            busy, freed, next_sync_token = self._fetch_changes(service, sync_token)
+        with transaction.atomic():
+            if sync_token is None:
+                BusyInterval.objects.filter(user=user).delete()
+                changed = None
+            else:
+                # moved and deleted events also free the time they used to take
+                changed = list(busy.values()) + list(BusyInterval.objects.filter(
+                    user=user, google_event_id__in=[*busy, *freed]).values_list('start', 'end'))
+            if freed:
+                BusyInterval.objects.filter(user=user, google_event_id__in=freed).delete()
+            BusyInterval.objects.bulk_create(
+                [
+                    BusyInterval(user=user, google_event_id=event_id, start=start, end=end)
+                    for event_id, (start, end) in busy.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'google_event_id'],
+                update_fields=['start', 'end'],
+            )
+            user.google_sync_token = next_sync_token
+            user.google_synced_at = datetime.now(timezone.utc)
+            User.objects.filter(id=user.id).update(
+                google_sync_token=user.google_sync_token,
+                google_synced_at=user.google_synced_at,
+            )
+            if busy or freed:
+                # edits made directly in Google change the events listing too
+                bump_schedule_version([user.id])
+                if changed is None:
+                    self.open_interval_helper.refresh_users([user.id])
+                else:
+                    self.open_interval_helper.refresh_ranges([(user.id, start, end) for start, end in changed])
+        return len(busy) + len(freed)
+
+    def record_event(self, user, event):
+        """
+        Mirrors an event we just created ourselves, so it blocks the slot
+        before the next sync picks it up.
+        :param user: User instance
+        :param event: Event resource returned by the Calendar API
+        """
+        self.record_events(user, [event])
+
+    def record_events(self, user, events):
+        zone = pytz.timezone(DEFAULT_TIMEZONE)
+        BusyInterval.objects.bulk_create(
+            [
+                BusyInterval(
+                    user=user,
+                    google_event_id=event['id'],
+                    start=parse_google_time(event['start'], zone),
+                    end=parse_google_time(event['end'], zone),
+                )
+                for event in events
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'google_event_id'],
+            update_fields=['start', 'end'],
+        )
+
+    def _fetch_changes(self, service, sync_token):
+        """
+        Pages through events().list and splits the result into busy events
+        to upsert and event ids that no longer block time.
+        :return: ({event_id: (start, end)}, [event_id], next_sync_token)
+        """
+        zone = pytz.timezone(DEFAULT_TIMEZONE)
+        busy = {}
+        freed = []
+        params = {'calendarId': 'primary', 'singleEvents': True, 'maxResults': 2500}
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            params['timeMin'] = (datetime.now(timezone.utc) - FULL_SYNC_LOOKBACK).isoformat()
+        page_token = None
+        while True:
+            events_result = service.events().list(pageToken=page_token, **params).execute()
+            for event in events_result.get('items', []):
+                if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+                    busy.pop(event['id'], None)
+                    freed.append(event['id'])
+                    continue
+                busy[event['id']] = (
+                    parse_google_time(event['start'], zone),
+                    parse_google_time(event['end'], zone),
+                )
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                return busy, freed, events_result.get('nextSyncToken')
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from SchedulEase.metrics import CIRCUIT_TRANSITIONS
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """
+    The call was refused without being attempted because its circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency that keeps failing. The breaker opens when
+    at least ``error_threshold`` of the calls made in the last ``window``
+    seconds failed, counting only once ``min_calls`` were made. While open,
+    calls fail at once with CircuitOpenError. After ``open_seconds`` up to
+    ``half_open_probes`` calls are let through: a success closes the
+    breaker, a failure opens it again. State is per process.
+    """
+
+    def __init__(self, name, error_threshold, min_calls, window, open_seconds, half_open_probes=1):
+        self.name = name
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._half_open_if_due(time.monotonic())
+            return self._state
+
+    def _transition(self, state, now):
+        self._state = state
+        self._outcomes.clear()
+        self._probes = 0
+        self._opened_at = now if state == OPEN else None
+        CIRCUIT_TRANSITIONS.inc((self.name, state))
+
+    def _half_open_if_due(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN, now)
+
+    def allow(self):
+        """
+        :raise CircuitOpenError: if the call must not be made now
+        """
+        with self._lock:
+            self._half_open_if_due(time.monotonic())
+            if self._state == OPEN:
+                raise CircuitOpenError(f"Circuit {self.name} is open")
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    raise CircuitOpenError(f"Circuit {self.name} is half-open and waiting for its probes")
+                self._probes += 1
+
+    def record_success(self):
+        self._record(False)
+
+    def record_failure(self):
+        self._record(True)
+
+    def _record(self, failed):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(OPEN if failed else CLOSED, now)
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append((now, failed))
+            while self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            calls = len(self._outcomes)
+            failures = sum(outcome_failed for _, outcome_failed in self._outcomes)
+            if failed and calls >= self.min_calls and failures >= self.error_threshold * calls:
+                self._transition(OPEN, now)
+
+    def release(self):
+        """
+        Gives back a half-open probe whose call ended without an outcome,
+        such as a cancelled request, so that another call can probe.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def reset(self):
+        with self._lock:
+            self._transition(CLOSED, time.monotonic())
+
+    @contextmanager
+    def guard(self, is_failure=lambda error: True):
+        """
+        Runs the block as one call through the breaker. Exceptions for which
+        ``is_failure`` is false, such as client errors, count as successes.
+        A block that is cancelled before it finishes records nothing.
+        :raise CircuitOpenError: instead of running the block while open
+        """
+        self.allow()
+        try:
+            yield
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                self.release()
+            elif is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+import heapq
+import itertools
+
+import pytz
+
+from users.app_settings import AVAILABILITY_RESOLUTION_MINUTES, DEFAULT_TIMEZONE
+from users.helpers.event_helper import EventHelper
+
+RESOLUTION = timedelta(minutes=AVAILABILITY_RESOLUTION_MINUTES)
+
+
+def _coalesce(intervals):
+    """
+    Merges sorted (start, end) intervals into disjoint ones.
+    """
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _boundaries(intervals, index, busy):
+    """
+    Turns sorted, disjoint intervals of one user into sweep events of the
+    form (moment, user_index, open_delta, busy_delta).
+    """
+    for start, end in intervals:
+        if busy:
+            yield start, index, 0, 1
+            yield end, index, 0, -1
+        else:
+            yield start, index, 1, 0
+            yield end, index, -1, 0
+
+
+class CollectiveAvailabilityHelper:
+    """
+    Answers availability questions for a group of hosts who must all be free.
+    Each host's weekly windows and busy intervals become a sorted stream of
+    boundary events; the N streams are merged with a heap and swept once,
+    tracking how many hosts are free, so the cost is O(T log N) for T
+    intervals across N hosts.
+    """
+    event_helper = EventHelper()
+
+    def get_free_intervals(self, users, start_datetime, end_datetime):
+        """
+        :param users: List of User instances
+        :param start_datetime: Aware start of the window
+        :param end_datetime: Aware end of the window
+        :return: Sorted, disjoint (start, end) intervals in which every user is free
+        """
+        if not users:
+            return []
+        busy_by_user = self.event_helper.get_busy_intervals_for_users(users, start_datetime, end_datetime)
+        streams = [
+            heapq.merge(
+                _boundaries(self._expand_weekly_windows(user, start_datetime, end_datetime), index, busy=False),
+                _boundaries(_coalesce(sorted(busy_by_user.get(user.id, []))), index, busy=True),
+            )
+            for index, user in enumerate(users)
+        ]
+
+        open_depth = [0] * len(users)
+        busy_depth = [0] * len(users)
+        free_count = 0
+        run_start = None
+        free_intervals = []
+        for moment, events in itertools.groupby(heapq.merge(*streams), key=lambda event: event[0]):
+            for _, index, open_delta, busy_delta in events:
+                was_free = open_depth[index] > 0 and busy_depth[index] == 0
+                open_depth[index] += open_delta
+                busy_depth[index] += busy_delta
+                free_count += (open_depth[index] > 0 and busy_depth[index] == 0) - was_free
+            if free_count == len(users) and run_start is None:
+                run_start = moment
+            elif free_count != len(users) and run_start is not None:
+                free_intervals.append((run_start, moment))
+                run_start = None
+        return free_intervals
+
+    def check_availability(self, users, start_datetime, end_datetime):
+        """
+        :return: True if every user is free for the whole range
+        """
+        return any(
+            start <= start_datetime and end_datetime <= end
+            for start, end in self.get_free_intervals(users, start_datetime, end_datetime)
+        )
+
+    def find_slots(self, users, start_datetime, end_datetime, duration):
+        """
+        Lists quarter-hour aligned start times at which every user is free
+        for ``duration``.
+        :return: List of aware slot start datetimes
+        """
+        slots = []
+        for start, end in self.get_free_intervals(users, start_datetime, end_datetime):
+            local_start = start.astimezone(start_datetime.tzinfo)
+            remainder = (local_start - local_start.replace(hour=0, minute=0, second=0, microsecond=0)) % RESOLUTION
+            slot = local_start + (RESOLUTION - remainder if remainder else timedelta(0))
+            while slot + duration <= end:
+                slots.append(slot)
+                slot += RESOLUTION
+        return slots
+
+    def _expand_weekly_windows(self, user, start_datetime, end_datetime):
+        """
+        Yields the user's weekly availability windows as aware datetimes,
+        clipped to the window and in chronological order.
+        """
+        zone = pytz.timezone(DEFAULT_TIMEZONE)
+        runs = list(user.get_availability_bitmap().iter_runs())
+        local_start = start_datetime.astimezone(zone)
+        week_start = local_start.date() - timedelta(days=local_start.weekday())
+        while True:
+            origin = zone.localize(datetime.combine(week_start, datetime.min.time()))
+            if origin >= end_datetime:
+                return
+            for start_index, end_index in runs:
+                start = max(origin + start_index * RESOLUTION, start_datetime)
+                end = min(origin + end_index * RESOLUTION, end_datetime)
+                if start < end:
+                    yield start, end
+            week_start += timedelta(weeks=1)
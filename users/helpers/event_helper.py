@@ -1,67 +1,586 @@
 from datetime import datetime, timezone, timedelta
+import asyncio
+import base64
+import binascii
+import bisect
+import json
 import pytz
+import uuid
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db.models import Q
 
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+from users.app_settings import EventStatus
+from users.helpers.async_calendar_client import async_calendar_client
+from users.helpers.busy_cache import busy_interval_cache, day_window, mark_busy_data_stale
+from users.helpers.calendar_sync_helper import CalendarSyncHelper
+from users.helpers.circuit_breaker import CircuitBreaker, CircuitOpenError
+from users.helpers.google_libs import get_calendar_service, google_libs
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.helpers.quota_governor import GoogleQuotaExceeded
+from users.models import BusyInterval, Event, SlotHold
 
-from users.models import UserAvailabilitySlot
+def parse_booking_datetime(value):
+    """
+    Parses a booking datetime string the way the booking API has always read
+    them: a trailing 'Z' stands for Asia/Kolkata wall-clock time.
+    """
+    return datetime.fromisoformat(value.replace('Z', '+05:30')).astimezone(pytz.timezone('Asia/Kolkata'))
+
+
+def is_booking_conflict(error):
+    """
+    Whether an IntegrityError was raised by the event_no_double_booking
+    exclusion constraint (SQLSTATE 23P01).
+    """
+    return getattr(error.__cause__, 'pgcode', None) == '23P01'
+
+
+def google_event_id(event_id):
+    """
+    Google Calendar id of an Event's calendar entry, in the base32hex
+    alphabet Google accepts for client-supplied ids. A second insert with
+    the same id fails with 409 instead of creating and inviting twice.
+    """
+    return base64.b32hexencode(f'schedulease{event_id}'.encode()).decode().rstrip('=').lower()
+
+
+def encode_events_cursor(time_min, page_token):
+    """
+    Opaque cursor of the next page of the upcoming events listing. Google
+    only honours a pageToken when the follow-up request repeats the original
+    parameters, so the listing's timeMin travels with it.
+    :return: The cursor, or None on the last page
+    """
+    if not page_token:
+        return None
+    return base64.urlsafe_b64encode(json.dumps([time_min, page_token]).encode()).decode()
+
+
+def decode_events_cursor(cursor):
+    """
+    :return: (time_min, page_token) of a cursor made by encode_events_cursor
+    :raise ValueError: if the cursor was not made by it
+    """
+    try:
+        time_min, page_token = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        datetime.fromisoformat(time_min)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return time_min, page_token
+
+
+def serialize_google_event(event):
+    return {
+        "summary": event.get('summary'),
+        "description": event.get('description'),
+        "start_time": event['start'].get('dateTime', event['start'].get('date')),
+        "end_time": event['end'].get('dateTime', event['end'].get('date')),
+        "hangout_link": event.get('hangoutLink'),
+        "attendees": [attendee.get('email') for attendee in event.get('attendees', [])]
+    }
+
+
+# The Calendar API accepts at most 50 calls per batch request.
+GOOGLE_BATCH_SIZE = 50
+# Limits of a single freebusy().query call.
+FREEBUSY_MAX_CALENDARS = 50
+FREEBUSY_MAX_RANGE = timedelta(days=60)
+# Page sizes of the upcoming events listing; Google caps events().list at 2500.
+UPCOMING_EVENTS_PAGE_SIZE = 10
+UPCOMING_EVENTS_MAX_PAGE_SIZE = 2500
+# Only the parts of each event that the listing returns.
+UPCOMING_EVENTS_FIELDS = 'nextPageToken,items(summary,description,start,end,hangoutLink,attendees/email)'
+
+# Guards the free/busy reads of availability checks and slot searches.
+calendar_read_breaker = CircuitBreaker(
+    'google_calendar_reads',
+    error_threshold=settings.GOOGLE_CIRCUIT_ERROR_THRESHOLD,
+    min_calls=settings.GOOGLE_CIRCUIT_MIN_CALLS,
+    window=settings.GOOGLE_CIRCUIT_WINDOW,
+    open_seconds=settings.GOOGLE_CIRCUIT_OPEN_SECONDS,
+    half_open_probes=settings.GOOGLE_CIRCUIT_HALF_OPEN_PROBES,
+)
+
+
+def _error_status(error):
+    response = getattr(error, 'resp', None) or getattr(error, 'response', None)
+    return getattr(response, 'status', None) or getattr(response, 'status_code', None)
+
+
+def is_google_outage(error):
+    """
+    Whether a failed Google call points at Google being down: timeouts,
+    connection errors and 5xx responses. Rate-limit responses (429) mean
+    Google is up but we are calling too fast, which the quota governor
+    already slows down; they, other client errors, one user's revoked
+    grant, calls shed by our own quota governor and bugs do not count.
+    """
+    if isinstance(error, GoogleQuotaExceeded):
+        return False
+    status = _error_status(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, google_libs.transport_errors)
+
+
+def can_use_stale_busy_data(error):
+    # a 429 that outlasted the quota governor's retries is no outage, but
+    # like a call it shed, it leaves nothing fresher than the cache
+    return isinstance(error, (CircuitOpenError, GoogleQuotaExceeded)) or is_google_outage(error) \
+        or _error_status(error) == 429
 
 class EventHelper:
+    sync_helper = CalendarSyncHelper()
+    open_interval_helper = OpenIntervalHelper()
 
-    def check_user_availability(self, user, start_datetime, end_datetime):
+    def check_user_availability(self, user, start_datetime, end_datetime, exclude_hold_token=None):
         """
         Checks if the user is available during the provided time range.
         It checks both Google Calendar events and the user's defined availability in the database.
         :param user: User instance
         :param start_datetime: Start datetime of the event as a string
         :param end_datetime: End datetime of the event as a string
+        :param exclude_hold_token: Token of the caller's own slot hold, which must not count as busy
         :return: True if available, False if a conflict exists
         """
-        ist_zone = pytz.timezone('Asia/Kolkata')
-        start_datetime = datetime.fromisoformat(start_datetime.replace('Z', '+05:30')).astimezone(ist_zone)
-        end_datetime = datetime.fromisoformat(end_datetime.replace('Z', '+05:30')).astimezone(ist_zone)
+        start_datetime = parse_booking_datetime(start_datetime)
+        end_datetime = parse_booking_datetime(end_datetime)
         start_datetime_utc = start_datetime.astimezone(pytz.UTC)
         end_datetime_utc = end_datetime.astimezone(pytz.UTC)
+        if self.open_interval_helper.is_materialized(user, start_datetime_utc, end_datetime_utc):
+            # weekly rules, bookings and mirrored busy time are already folded in
+            return self.open_interval_helper.covers(user.id, start_datetime_utc, end_datetime_utc) \
+                and not self.get_held_intervals([user.id], start_datetime_utc, end_datetime_utc, exclude_hold_token)
         try:
-            credentials = Credentials(token=user.google_access_token, refresh_token=user.google_refresh_token)
-            service = build('calendar', 'v3', credentials=credentials)
-            events_result = service.events().list(
-                calendarId='primary',
-                timeMin=start_datetime.isoformat(),
-                timeMax=end_datetime.isoformat(),
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            events = events_result.get('items', [])
-            for event in events:
-                event_start = event['start'].get('dateTime', event['start'].get('date'))
-                event_end = event['end'].get('dateTime', event['end'].get('date'))
-                event_start = datetime.fromisoformat(event_start.replace('Z', '+00:00')).replace(tzinfo=timezone.utc)
-                event_end = datetime.fromisoformat(event_end.replace('Z', '+00:00')).replace(tzinfo=timezone.utc)
-                if start_datetime_utc <= event_end and end_datetime_utc >= event_start:
-                    print(f"Event conflict found: {event['summary']} at {event_start} - {event_end}")
-                    return False  
+            for event_start, event_end in self.get_busy_intervals(
+                    user, start_datetime_utc, end_datetime_utc, exclude_hold_token):
+                if start_datetime_utc < event_end and end_datetime_utc > event_start:
+                    print(f"Event conflict found at {event_start} - {event_end}")
+                    return False
         except Exception as e:
             print(f"Error fetching Google Calendar events: {e}")
             return False
-        start_time = start_datetime.time()
-        end_time = end_datetime.time()
-        day_of_week = start_datetime.weekday() + 1
-        availability_slots = UserAvailabilitySlot.objects.filter(
-            user=user,
-            day_of_week=day_of_week,
-            start_time__lte=start_time,
-            end_time__gte=end_time
-        )
-        if not availability_slots.exists():
-            print(f"No availability slot found for {user.email} on {start_datetime.date()} from {start_time} to {end_time}")
+        if not user.get_availability_bitmap().covers(start_datetime, end_datetime):
+            print(f"No availability slot found for {user.email} on {start_datetime.date()} from {start_datetime.time()} to {end_datetime.time()}")
             return False 
         return True
 
+    async def acheck_user_availability(self, user, start_datetime, end_datetime, exclude_hold_token=None):
+        """
+        Async variant of check_user_availability. The Google busy lookup and
+        the local checks against the weekly availability, bookings and holds
+        run concurrently.
+        """
+        start_datetime = parse_booking_datetime(start_datetime)
+        end_datetime = parse_booking_datetime(end_datetime)
+        start_datetime_utc = start_datetime.astimezone(pytz.UTC)
+        end_datetime_utc = end_datetime.astimezone(pytz.UTC)
+        if self.open_interval_helper.is_materialized(user, start_datetime_utc, end_datetime_utc):
+            covered, held = await asyncio.gather(
+                self.open_interval_helper.acovers(user.id, start_datetime_utc, end_datetime_utc),
+                self.aget_held_intervals([user.id], start_datetime_utc, end_datetime_utc, exclude_hold_token),
+            )
+            return covered and not held
+        try:
+            remote_busy, locally_available = await asyncio.gather(
+                self.aget_remote_busy_intervals(user, start_datetime_utc, end_datetime_utc),
+                self._acheck_local_availability(user, start_datetime, end_datetime, exclude_hold_token),
+            )
+        except Exception as e:
+            print(f"Error fetching Google Calendar events: {e}")
+            return False
+        if not locally_available:
+            return False
+        return not any(start_datetime_utc < busy_end and end_datetime_utc > busy_start
+                       for busy_start, busy_end in remote_busy)
+
+    async def _acheck_local_availability(self, user, start_datetime, end_datetime, exclude_hold_token):
+        if user.availability_bitmap is None:
+            bitmap = await sync_to_async(user.get_availability_bitmap)()
+        else:
+            bitmap = user.get_availability_bitmap()
+        if not bitmap.covers(start_datetime, end_datetime):
+            return False
+        return not await self.aget_booked_intervals(
+            [user.id], start_datetime.astimezone(pytz.UTC), end_datetime.astimezone(pytz.UTC), exclude_hold_token)
+
+    async def aget_remote_busy_intervals(self, user, start_datetime, end_datetime):
+        """
+        Busy time kept in Google: the BusyInterval mirror when the user's
+        calendar is synced, the freebusy API (or its cache while Google is
+        unavailable) otherwise.
+        :return: List of (start, end) aware datetimes
+        """
+        if user.google_sync_token:
+            return [interval async for interval in BusyInterval.objects.filter(
+                user=user,
+                start__lt=end_datetime,
+                end__gt=start_datetime
+            ).values_list('start', 'end')]
+        window_start, window_end = day_window(start_datetime, end_datetime)
+        try:
+            busy, failed = await self.aquery_free_busy(
+                user, settings.GOOGLE_BUSY_CALENDAR_IDS, window_start, window_end)
+        except Exception as e:
+            return self._get_stale_busy_intervals(user, start_datetime, end_datetime, e)
+        return self._record_busy_intervals(user, start_datetime, end_datetime, window_start, window_end, busy, failed)
+
+    def check_bulk_availability(self, user, time_ranges):
+        """
+        Checks many candidate bookings of one user in a single pass: busy
+        intervals are fetched once for the whole span, merged, and each
+        candidate is located with a binary search. Candidates that overlap an
+        earlier candidate in the same request are rejected as well.
+        :param user: User instance
+        :param time_ranges: List of (start_datetime, end_datetime) strings
+        :return: List with None for each available range or an error message
+        """
+        errors = [None] * len(time_ranges)
+        parsed = []
+        for index, (start_datetime, end_datetime) in enumerate(time_ranges):
+            try:
+                start = parse_booking_datetime(start_datetime)
+                end = parse_booking_datetime(end_datetime)
+            except (AttributeError, ValueError):
+                errors[index] = "Invalid start or end datetime"
+                continue
+            if end <= start:
+                errors[index] = "End time must be after start time"
+                continue
+            parsed.append((start, end, index))
+        if not parsed:
+            return errors
+        parsed.sort()
+        try:
+            busy_intervals = sorted(self.get_busy_intervals(
+                user, min(start for start, _, _ in parsed), max(end for _, end, _ in parsed)))
+        except Exception as e:
+            print(f"Error fetching Google Calendar events: {e}")
+            for _, _, index in parsed:
+                errors[index] = "Failed to retrieve busy times"
+            return errors
+        merged = []
+        for busy_start, busy_end in busy_intervals:
+            if merged and busy_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], busy_end)
+            else:
+                merged.append([busy_start, busy_end])
+        busy_starts = [busy_start for busy_start, _ in merged]
+        bitmap = user.get_availability_bitmap()
+        booked_until = None
+        for start, end, index in parsed:
+            position = bisect.bisect_left(busy_starts, end)
+            if position and merged[position - 1][1] > start:
+                errors[index] = "User is not available at this time"
+            elif not bitmap.covers(start, end):
+                errors[index] = "User is not available at this time"
+            elif booked_until is not None and start < booked_until:
+                errors[index] = "Overlaps another event in this request"
+            else:
+                booked_until = end if booked_until is None else max(booked_until, end)
+        return errors
+
+    def get_busy_intervals(self, user, start_datetime, end_datetime, exclude_hold_token=None):
+        """
+        Returns the busy intervals of the user's Google Calendars.
+        Users whose calendar has been mirrored are answered from BusyInterval
+        with one indexed query; others with a live free/busy query over
+        GOOGLE_BUSY_CALENDAR_IDS.
+        :param user: User instance
+        :param start_datetime: Aware start datetime of the window
+        :param end_datetime: Aware end datetime of the window
+        :param exclude_hold_token: Slot hold to leave out of the result
+        :return: List of (start, end) aware datetimes
+        """
+        booked = [(start, end) for _, start, end in self.get_booked_intervals(
+            [user.id], start_datetime, end_datetime, exclude_hold_token)]
+        if user.google_sync_token:
+            return booked + list(BusyInterval.objects.filter(
+                user=user,
+                start__lt=end_datetime,
+                end__gt=start_datetime
+            ).values_list('start', 'end'))
+        return booked + self.get_remote_busy_intervals(user, start_datetime, end_datetime)
+
+    def get_remote_busy_intervals(self, user, start_datetime, end_datetime):
+        """
+        Reads the busy time of a user whose calendar is not mirrored with a
+        free/busy query over whole UTC days, which are cached. If Google
+        cannot be read, the cached days answer instead and the request is
+        flagged as served from stale busy data.
+        :return: List of (start, end) aware datetimes
+        """
+        window_start, window_end = day_window(start_datetime, end_datetime)
+        try:
+            busy, failed = self.query_free_busy(
+                user, settings.GOOGLE_BUSY_CALENDAR_IDS, window_start, window_end)
+        except Exception as e:
+            return self._get_stale_busy_intervals(user, start_datetime, end_datetime, e)
+        return self._record_busy_intervals(user, start_datetime, end_datetime, window_start, window_end, busy, failed)
+
+    def _record_busy_intervals(self, user, start_datetime, end_datetime, window_start, window_end, busy, failed):
+        if failed:
+            error = Exception(f"Could not read busy times of calendars: {', '.join(sorted(failed))}")
+            return self._get_stale_busy_intervals(user, start_datetime, end_datetime, error)
+        intervals = [interval for intervals in busy.values() for interval in intervals]
+        busy_interval_cache.store(user.id, window_start, window_end, intervals)
+        return [(start, end) for start, end in intervals if start < end_datetime and end > start_datetime]
+
+    def _get_stale_busy_intervals(self, user, start_datetime, end_datetime, error):
+        """
+        :return: The cached busy intervals of the window
+        :raise: ``error`` if it is not an outage or the window is not cached
+        """
+        cached = busy_interval_cache.lookup(user.id, start_datetime, end_datetime) \
+            if can_use_stale_busy_data(error) else None
+        if cached is None:
+            raise error
+        intervals, as_of = cached
+        print(f"Google Calendar unavailable ({error}), using busy times of {user.email} from {as_of}")
+        mark_busy_data_stale(as_of)
+        return intervals
 
-    def create_google_event(self, user, event_type, guest_email, description, start_datetime, end_datetime):
+    def get_booked_intervals(self, user_ids, start_datetime, end_datetime, exclude_hold_token=None):
+        """
+        Bookings already stored locally, including those whose Google insert
+        is still queued, plus unexpired slot holds. These are plain bound
+        comparisons narrowed by the user_id index; the GiST indexes behind
+        the exclusion constraints only serve ``&&`` range lookups.
+        :return: List of (user_id, start, end)
+        """
+        booked = list(Event.objects.filter(
+            user_id__in=user_ids,
+            start_datetime__lt=end_datetime,
+            end_datetime__gt=start_datetime
+        ).exclude(status=EventStatus.FAILED).values_list('user_id', 'start_datetime', 'end_datetime'))
+        return booked + self.get_held_intervals(user_ids, start_datetime, end_datetime, exclude_hold_token)
+
+    async def aget_booked_intervals(self, user_ids, start_datetime, end_datetime, exclude_hold_token=None):
+        booked = [interval async for interval in Event.objects.filter(
+            user_id__in=user_ids,
+            start_datetime__lt=end_datetime,
+            end_datetime__gt=start_datetime
+        ).exclude(status=EventStatus.FAILED).values_list('user_id', 'start_datetime', 'end_datetime')]
+        return booked + await self.aget_held_intervals(user_ids, start_datetime, end_datetime, exclude_hold_token)
+
+    def get_held_intervals(self, user_ids, start_datetime, end_datetime, exclude_hold_token=None):
+        """
+        Unexpired slot holds overlapping the window.
+        :return: List of (user_id, start, end)
+        """
+        return list(self._held_intervals(user_ids, start_datetime, end_datetime, exclude_hold_token))
+
+    async def aget_held_intervals(self, user_ids, start_datetime, end_datetime, exclude_hold_token=None):
+        return [interval async for interval in self._held_intervals(
+            user_ids, start_datetime, end_datetime, exclude_hold_token)]
+
+    @staticmethod
+    def _held_intervals(user_ids, start_datetime, end_datetime, exclude_hold_token):
+        holds = SlotHold.objects.filter(
+            user_id__in=user_ids,
+            start_datetime__lt=end_datetime,
+            end_datetime__gt=start_datetime,
+            expires_at__gt=datetime.now(timezone.utc)
+        )
+        if exclude_hold_token:
+            holds = holds.exclude(token=exclude_hold_token)
+        return holds.values_list('user_id', 'start_datetime', 'end_datetime')
+
+    def get_busy_intervals_for_users(self, users, start_datetime, end_datetime):
+        """
+        Busy intervals of many users at once. Mirrored users are loaded with a
+        single query. The rest are read with one free/busy query each over
+        their own GOOGLE_BUSY_CALENDAR_IDS and with their own credentials,
+        since a host cannot be assumed to see the other hosts' calendars, and
+        the queries go out together in batch requests.
+        :param users: List of User instances
+        :return: {user_id: [(start, end), ...]}
+        """
+        busy_by_user = {user.id: [] for user in users}
+        for user_id, start, end in self.get_booked_intervals(list(busy_by_user), start_datetime, end_datetime):
+            busy_by_user[user_id].append((start, end))
+        rows = BusyInterval.objects.filter(
+            user_id__in=[user.id for user in users if user.google_sync_token],
+            start__lt=end_datetime,
+            end__gt=start_datetime
+        ).values_list('user_id', 'start', 'end')
+        for user_id, start, end in rows:
+            busy_by_user[user_id].append((start, end))
+        remote_users = [user for user in users if not user.google_sync_token]
+        if not remote_users:
+            return busy_by_user
+        window_start, window_end = day_window(start_datetime, end_datetime)
+        results = self.query_free_busy_for_users(
+            remote_users, settings.GOOGLE_BUSY_CALENDAR_IDS, window_start, window_end)
+        for user in remote_users:
+            result = results[user.id]
+            if isinstance(result, Exception):
+                busy_by_user[user.id] += self._get_stale_busy_intervals(user, start_datetime, end_datetime, result)
+            else:
+                busy_by_user[user.id] += self._record_busy_intervals(
+                    user, start_datetime, end_datetime, window_start, window_end, *result)
+        return busy_by_user
+
+    def iter_upcoming_event_pages(self, user, page_size, cursor=None):
+        """
+        Pages through the user's upcoming events, one events().list call per
+        page, so callers can stop or flush after every page.
+        :param user: User instance
+        :param page_size: Number of events per page
+        :param cursor: Cursor returned with a previous page
+        :return: Generator of ([event, ...], next_cursor) tuples
+        :raise ValueError: if the cursor is invalid
+        """
+        time_min, page_token = decode_events_cursor(cursor) if cursor else (
+            datetime.now(timezone.utc).isoformat(), None)
+        service = get_calendar_service(user)
+        while True:
+            events_result = service.events().list(
+                calendarId='primary',
+                timeMin=time_min,
+                maxResults=page_size,
+                singleEvents=True,
+                orderBy='startTime',
+                pageToken=page_token,
+                fields=UPCOMING_EVENTS_FIELDS,
+            ).execute()
+            page_token = events_result.get('nextPageToken')
+            yield [serialize_google_event(event) for event in events_result.get('items', [])], \
+                encode_events_cursor(time_min, page_token)
+            if not page_token:
+                return
+
+    async def aiter_upcoming_event_pages(self, user, page_size, cursor=None):
+        """
+        Async variant of iter_upcoming_event_pages.
+        """
+        time_min, page_token = decode_events_cursor(cursor) if cursor else (
+            datetime.now(timezone.utc).isoformat(), None)
+        while True:
+            params = {
+                'timeMin': time_min,
+                'maxResults': page_size,
+                'singleEvents': 'true',
+                'orderBy': 'startTime',
+                'fields': UPCOMING_EVENTS_FIELDS,
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            events_result = await async_calendar_client.list_events(user, **params)
+            page_token = events_result.get('nextPageToken')
+            yield [serialize_google_event(event) for event in events_result.get('items', [])], \
+                encode_events_cursor(time_min, page_token)
+            if not page_token:
+                return
+
+    def query_free_busy(self, user, calendar_ids, start_datetime, end_datetime):
+        """
+        Reads busy intervals through the Calendar freebusy API, which returns
+        only start/end pairs for many calendars per call. Reads go through
+        calendar_read_breaker and fail at once while it is open.
+        :param user: User whose credentials make the request
+        :param calendar_ids: Calendar ids (or email addresses) to read
+        :return: ({calendar_id: [(start, end), ...]}, {calendar_ids that returned errors})
+        """
+        with calendar_read_breaker.guard(is_google_outage):
+            service = get_calendar_service(user, timeout=settings.GOOGLE_READ_TIMEOUT)
+            responses = [
+                service.freebusy().query(body=body).execute()
+                for body in self._free_busy_requests(calendar_ids, start_datetime, end_datetime)
+            ]
+        return self._collect_free_busy(calendar_ids, responses)
+
+    def query_free_busy_for_users(self, users, calendar_ids, start_datetime, end_datetime):
+        """
+        query_free_busy for many users, sent in batch requests of up to
+        GOOGLE_BATCH_SIZE queries. Every query is authorized as its own user;
+        a batch is sent over, and charged to the quota of, the user of its
+        first query. The batches count as one call of calendar_read_breaker.
+        :param users: List of User instances
+        :return: {user_id: (busy, failed)} shaped like the return value of
+                 query_free_busy, or {user_id: exception} for users whose
+                 queries could not be answered
+        """
+        bodies = list(self._free_busy_requests(calendar_ids, start_datetime, end_datetime))
+        parts = [(user, body) for user in users for body in bodies]
+        responses = {user.id: [] for user in users}
+        errors = {}
+
+        def callback(request_id, response, exception):
+            user_id = parts[int(request_id)][0].id
+            if exception is not None:
+                errors.setdefault(user_id, exception)
+            else:
+                responses[user_id].append(response)
+
+        try:
+            with calendar_read_breaker.guard(is_google_outage):
+                for offset in range(0, len(parts), GOOGLE_BATCH_SIZE):
+                    batch = None
+                    for index, (user, body) in enumerate(parts[offset:offset + GOOGLE_BATCH_SIZE], start=offset):
+                        service = get_calendar_service(user, timeout=settings.GOOGLE_READ_TIMEOUT)
+                        batch = batch or service.new_batch_http_request(callback=callback)
+                        batch.add(service.freebusy().query(body=body), request_id=str(index))
+                    batch.execute()
+        except Exception as e:
+            for user in users:
+                if len(responses[user.id]) < len(bodies):
+                    errors.setdefault(user.id, e)
+        return {
+            user.id: errors.get(user.id) or self._collect_free_busy(calendar_ids, responses[user.id])
+            for user in users
+        }
+
+    async def aquery_free_busy(self, user, calendar_ids, start_datetime, end_datetime):
+        """
+        Async variant of query_free_busy that sends all windows and calendar
+        chunks at once.
+        """
+        with calendar_read_breaker.guard(is_google_outage):
+            responses = await asyncio.gather(*(
+                async_calendar_client.query_free_busy(user, body, timeout=settings.GOOGLE_READ_TIMEOUT)
+                for body in self._free_busy_requests(calendar_ids, start_datetime, end_datetime)
+            ))
+        return self._collect_free_busy(calendar_ids, responses)
+
+    @staticmethod
+    def _free_busy_requests(calendar_ids, start_datetime, end_datetime):
+        window_start = start_datetime
+        while window_start < end_datetime:
+            window_end = min(end_datetime, window_start + FREEBUSY_MAX_RANGE)
+            for offset in range(0, len(calendar_ids), FREEBUSY_MAX_CALENDARS):
+                yield {
+                    'timeMin': window_start.isoformat(),
+                    'timeMax': window_end.isoformat(),
+                    'items': [
+                        {'id': calendar_id}
+                        for calendar_id in calendar_ids[offset:offset + FREEBUSY_MAX_CALENDARS]
+                    ],
+                }
+            window_start = window_end
+
+    @staticmethod
+    def _collect_free_busy(calendar_ids, responses):
+        busy = {calendar_id: [] for calendar_id in calendar_ids}
+        failed = set()
+        for response in responses:
+            for calendar_id, calendar in response.get('calendars', {}).items():
+                if calendar.get('errors'):
+                    failed.add(calendar_id)
+                    continue
+                busy.setdefault(calendar_id, []).extend(
+                    (
+                        datetime.fromisoformat(period['start'].replace('Z', '+00:00')),
+                        datetime.fromisoformat(period['end'].replace('Z', '+00:00')),
+                    )
+                    for period in calendar.get('busy', [])
+                )
+        return busy, failed
+
+    def create_google_event(self, user, event_type, guest_email, description, start_datetime, end_datetime,
+                            request_id=None, event_id=None):
         """
         Creates an event in the user's Google Calendar.
         :param user: User instance
@@ -70,51 +589,170 @@ class EventHelper:
         :param description: Event description
         :param start_datetime: Start datetime of the event
         :param end_datetime: End datetime of the event
+        :param request_id: Idempotency key for the Meet conference, random if omitted
+        :param event_id: Client-supplied Google event id; if an earlier attempt
+                         already created it, that event is returned
         :return: Google Meet link and calendar event link
         """
         try:
-            ist_zone = pytz.timezone('Asia/Kolkata')
-            start_datetime = datetime.fromisoformat(start_datetime.replace('Z', '+05:30')).astimezone(ist_zone).isoformat()
-            end_datetime = datetime.fromisoformat(end_datetime.replace('Z', '+05:30')).astimezone(ist_zone).isoformat()
-            credentials = Credentials(token=user.google_access_token, refresh_token=user.google_refresh_token)
-            service = build('calendar', 'v3', credentials=credentials)
-            event = {
-                'summary': event_type.name,
-                'description': description,
-                'start': {
-                    'dateTime': start_datetime,
-                    'timeZone': 'Asia/Kolkata',
-                },
-                'end': {
-                    'dateTime': end_datetime,
-                    'timeZone': 'Asia/Kolkata',
-                },
-                'attendees': [
-                    {'email': guest_email, 'responseStatus': 'needsAction'},
-                    {'email': user.email, 'responseStatus': 'accepted'},
-                ],
-                'conferenceData': {
-                    'createRequest': {
-                        'conferenceSolutionKey': {
-                            'type': 'hangoutsMeet'
-                        },
-                        'requestId': 'sample123'
-                    }
-                },
-            }
-            created_event = service.events().insert(
-                calendarId='primary',
-                body=event,
-                conferenceDataVersion=1,
-                sendUpdates='all'
-            ).execute()
-            google_meet_link = created_event['conferenceData']['entryPoints'][0]['uri']
-            calendar_event_link = created_event.get('htmlLink')
+            service = get_calendar_service(user)
+            event = self._build_google_event(
+                user, event_type, guest_email, description, start_datetime, end_datetime, request_id, event_id)
+            try:
+                created_event = service.events().insert(
+                    calendarId='primary',
+                    body=event,
+                    conferenceDataVersion=1,
+                    sendUpdates='all'
+                ).execute()
+            except google_libs.HttpError as e:
+                if not event_id or e.resp.status != 409:
+                    raise
+                created_event = service.events().get(calendarId='primary', eventId=event_id).execute()
+            self.sync_helper.record_event(user, created_event)
+            return self._get_event_links(created_event), True
+        except Exception as e:
             return {
-                'google_meet_link': google_meet_link,
-                'calendar_event_link': calendar_event_link
-            }, True
+                'message' : F"An error occurred while creating the event: {e}"
+            }, False
+
+    async def acreate_google_event(self, user, event_type, guest_email, description, start_datetime,
+                                   end_datetime, request_id=None, event_id=None):
+        """
+        Async variant of create_google_event.
+        """
+        try:
+            event = self._build_google_event(
+                user, event_type, guest_email, description, start_datetime, end_datetime, request_id, event_id)
+            try:
+                created_event = await async_calendar_client.insert_event(
+                    user, event, conferenceDataVersion=1, sendUpdates='all')
+            except google_libs.httpx.HTTPStatusError as e:
+                if not event_id or e.response.status_code != 409:
+                    raise
+                created_event = await async_calendar_client.get_event(user, event_id)
+            await sync_to_async(self.sync_helper.record_event)(user, created_event)
+            return self._get_event_links(created_event), True
         except Exception as e:
             return {
                 'message' : F"An error occurred while creating the event: {e}"
-            }, False
\ No newline at end of file
+            }, False
+
+    def get_google_event(self, user, event_id):
+        """
+        Looks up an event SchedulEase created in the user's primary calendar.
+        :param event_id: Google event id, see google_event_id
+        :return: The Google event, or None if it does not exist or was deleted
+        """
+        service = get_calendar_service(user)
+        try:
+            event = service.events().get(calendarId='primary', eventId=event_id).execute()
+        except google_libs.HttpError as e:
+            if e.resp.status in (404, 410):
+                return None
+            raise
+        return None if event.get('status') == 'cancelled' else event
+
+    def create_google_events(self, user, bookings):
+        """
+        Creates many events in the user's Google Calendar through batch HTTP
+        requests of up to GOOGLE_BATCH_SIZE inserts each. Inserts rejected
+        with a 409 because an earlier attempt already created their
+        ``event_id`` read that event back, in batches as well.
+        :param user: User instance
+        :param bookings: List of dicts with the keyword arguments of create_google_event
+        :return: List of (data, status) tuples in the order of ``bookings``,
+                 shaped like the return value of create_google_event
+        """
+        results = [None] * len(bookings)
+        created_events = []
+        duplicates = []
+
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            if isinstance(exception, google_libs.HttpError) and exception.resp.status == 409 \
+                    and bookings[index].get('event_id'):
+                duplicates.append(index)
+                return
+            if exception is not None:
+                results[index] = {
+                    'message': f"An error occurred while creating the event: {exception}"
+                }, False
+                return
+            created_events.append(response)
+            results[index] = self._get_event_links(response), True
+
+        try:
+            service = get_calendar_service(user)
+            for offset in range(0, len(bookings), GOOGLE_BATCH_SIZE):
+                batch = service.new_batch_http_request(callback=callback)
+                for index, booking in enumerate(bookings[offset:offset + GOOGLE_BATCH_SIZE], start=offset):
+                    batch.add(service.events().insert(
+                        calendarId='primary',
+                        body=self._build_google_event(user, **booking),
+                        conferenceDataVersion=1,
+                        sendUpdates='all'
+                    ), request_id=str(index))
+                batch.execute()
+            for offset in range(0, len(duplicates), GOOGLE_BATCH_SIZE):
+                batch = service.new_batch_http_request(callback=callback)
+                for index in duplicates[offset:offset + GOOGLE_BATCH_SIZE]:
+                    batch.add(service.events().get(
+                        calendarId='primary', eventId=bookings[index]['event_id']), request_id=str(index))
+                batch.execute()
+        except Exception as e:
+            for index, result in enumerate(results):
+                if result is None:
+                    results[index] = {
+                        'message': f"An error occurred while creating the event: {e}"
+                    }, False
+        if created_events:
+            self.sync_helper.record_events(user, created_events)
+        return results
+
+    def _build_google_event(self, user, event_type, guest_email, description, start_datetime, end_datetime,
+                            request_id=None, event_id=None):
+        ist_zone = pytz.timezone('Asia/Kolkata')
+        start_datetime = datetime.fromisoformat(start_datetime.replace('Z', '+05:30')).astimezone(ist_zone).isoformat()
+        end_datetime = datetime.fromisoformat(end_datetime.replace('Z', '+05:30')).astimezone(ist_zone).isoformat()
+        event = {
+            'summary': event_type.name,
+            'description': description,
+            'start': {
+                'dateTime': start_datetime,
+                'timeZone': 'Asia/Kolkata',
+            },
+            'end': {
+                'dateTime': end_datetime,
+                'timeZone': 'Asia/Kolkata',
+            },
+            'attendees': [
+                {'email': guest_email, 'responseStatus': 'needsAction'},
+                {'email': user.email, 'responseStatus': 'accepted'},
+            ],
+            'conferenceData': {
+                'createRequest': {
+                    'conferenceSolutionKey': {
+                        'type': 'hangoutsMeet'
+                    },
+                    'requestId': request_id or uuid.uuid4().hex
+                }
+            },
+        }
+        if event_id:
+            event['id'] = event_id
+        return event
+
+    @staticmethod
+    def _get_event_links(created_event):
+        """
+        The Meet link is missing while Google is still creating the conference
+        (conferenceData.createRequest.status.statusCode 'pending'), so fall
+        back to hangoutLink, which may be None as well.
+        """
+        entry_points = created_event.get('conferenceData', {}).get('entryPoints') or []
+        video = next((entry['uri'] for entry in entry_points if entry.get('entryPointType') == 'video'), None)
+        return {
+            'google_meet_link': video or created_event.get('hangoutLink'),
+            'calendar_event_link': created_event.get('htmlLink')
+        }
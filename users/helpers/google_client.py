@@ -0,0 +1,120 @@
+import json
+import threading
+
+import httplib2
+from cachetools import LRUCache
+from django.conf import settings
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from SchedulEase.metrics import track_google_call
+from users.helpers.quota_governor import google_quota
+from users.helpers.token_manager import token_manager
+
+# Batch requests are posted here and carry one Content-ID header per call.
+BATCH_PATH = 'batch/calendar/v3'
+BATCH_PART_HEADER = 'Content-ID: '
+
+
+class TimedHttp(httplib2.Http):
+    """
+    httplib2 transport that charges its round trips to the Google phase of
+    the current request.
+    """
+
+    def request(self, *args, **kwargs):
+        with track_google_call():
+            return super().request(*args, **kwargs)
+
+
+class QuotaHttp:
+    """
+    Sends one user's Calendar API requests through the quota governor over
+    the thread's shared transport. Requests to other hosts, such as token
+    refreshes, go straight through.
+    """
+
+    def __init__(self, http, user_id):
+        self.http = http
+        self.user_id = user_id
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        def send():
+            return self.http.request(uri, method, body=body, headers=headers, **kwargs)
+
+        if not uri.startswith(settings.GOOGLE_API_ROOT_URL):
+            return send()
+        # every call of a batch counts against the quota
+        cost = max(1, body.count(BATCH_PART_HEADER)) if uri.endswith(BATCH_PATH) and body else 1
+        return google_quota.call(self.user_id, send, cost)
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+class CalendarClientFactory:
+    """
+    Hands out Calendar v3 service objects without rebuilding them per call.
+    The discovery document bundled with googleapiclient is parsed once per
+    process and pointed at GOOGLE_API_ROOT_URL. httplib2 transports are not
+    thread-safe, so every thread keeps its own keep-alive transport per
+    timeout and its own LRU of services keyed by the user's current access
+    token; a refreshed token simply gets a new entry. Requests are admitted
+    by the quota governor.
+    """
+    _discovery_lock = threading.Lock()
+    _discovery_documents = {}
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @classmethod
+    def get_discovery_document(cls):
+        root_url = settings.GOOGLE_API_ROOT_URL
+        document = cls._discovery_documents.get(root_url)
+        if document is None:
+            with cls._discovery_lock:
+                document = cls._discovery_documents.get(root_url)
+                if document is None:
+                    document = json.loads(get_static_doc('calendar', 'v3'))
+                    # batch requests are sent to rootUrl, so override it
+                    # rather than passing an api_endpoint to build()
+                    document['rootUrl'] = root_url
+                    cls._discovery_documents[root_url] = document
+        return document
+
+    def _get_thread_state(self):
+        if not hasattr(self._local, 'services'):
+            self._local.transports = {}
+            self._local.services = LRUCache(maxsize=settings.GOOGLE_CLIENT_CACHE_SIZE)
+        return self._local
+
+    def get_service(self, user, timeout=None):
+        """
+        :param user: User instance holding Google tokens
+        :param timeout: Socket timeout in seconds, GOOGLE_HTTP_TIMEOUT by default
+        :return: Calendar v3 service authorized as the user
+        """
+        state = self._get_thread_state()
+        timeout = timeout or settings.GOOGLE_HTTP_TIMEOUT
+        credentials = token_manager.get_credentials(user)
+        key = (user.id, credentials.token, settings.GOOGLE_API_ROOT_URL, timeout)
+        service = state.services.get(key)
+        if service is None:
+            http = state.transports.get(timeout)
+            if http is None:
+                http = state.transports[timeout] = TimedHttp(timeout=timeout)
+            service = build_from_document(
+                self.get_discovery_document(),
+                http=AuthorizedHttp(credentials, http=QuotaHttp(http, user.id)),
+            )
+            state.services[key] = service
+        return service
+
+
+calendar_client_factory = CalendarClientFactory()
+
+
+def get_calendar_service(user, timeout=None):
+    return calendar_client_factory.get_service(user, timeout)
@@ -0,0 +1,71 @@
+import importlib
+import socket
+from functools import cached_property
+
+# Top-level packages that only load once Google is called or preloaded.
+GOOGLE_LIBRARY_PACKAGES = (
+    'google', 'google_auth_httplib2', 'google_auth_oauthlib', 'googleapiclient', 'httplib2', 'httpx', 'oauthlib',
+)
+
+
+class GoogleLibraries:
+    """
+    Imports the Google client libraries, and google_client which builds on
+    them, on first use instead of when the app loads. Routes such as signup
+    never touch Google, so workers start without them; after the first
+    access every attribute is a plain lookup. preload() imports everything
+    up front, for workers that should not pay for it on their first booking.
+    """
+
+    @cached_property
+    def Credentials(self):
+        return importlib.import_module('google.oauth2.credentials').Credentials
+
+    @cached_property
+    def Request(self):
+        return importlib.import_module('google.auth.transport.requests').Request
+
+    @cached_property
+    def InstalledAppFlow(self):
+        return importlib.import_module('google_auth_oauthlib.flow').InstalledAppFlow
+
+    @cached_property
+    def HttpError(self):
+        return importlib.import_module('googleapiclient.errors').HttpError
+
+    @cached_property
+    def httpx(self):
+        return importlib.import_module('httpx')
+
+    @cached_property
+    def transport_errors(self):
+        """
+        Exceptions raised when Google could not be reached or did not answer
+        in time, as opposed to answering with an error.
+        """
+        return (
+            TimeoutError, ConnectionError, socket.gaierror,
+            importlib.import_module('httplib2').ServerNotFoundError,
+            self.httpx.TransportError,
+            importlib.import_module('google.auth.exceptions').TransportError,
+        )
+
+    @cached_property
+    def google_client(self):
+        return importlib.import_module('users.helpers.google_client')
+
+    def preload(self):
+        """
+        Imports every library and parses the Calendar discovery document.
+        """
+        for name in ('Credentials', 'Request', 'InstalledAppFlow', 'HttpError', 'httpx', 'transport_errors',
+                     'google_client'):
+            getattr(self, name)
+        self.google_client.CalendarClientFactory.get_discovery_document()
+
+
+google_libs = GoogleLibraries()
+
+
+def get_calendar_service(user, timeout=None):
+    return google_libs.google_client.get_calendar_service(user, timeout)
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import jwt
+from cachetools import LRUCache
+from django.conf import settings
+
+from users.models import User
+
+ACCESS_TOKEN = 'access'
+REFRESH_TOKEN = 'refresh'
+# Claims copied into access tokens, enough to build request.user without a query.
+USER_CLAIMS = ('email', 'name', 'is_staff', 'is_superuser')
+
+
+def _password_fingerprint(user):
+    # refresh tokens die with the password they were issued under
+    return hashlib.sha256(user.password.encode()).hexdigest()[:16]
+
+
+class JWTHelper:
+    """
+    Issues and verifies HMAC-signed access and refresh tokens. Verified
+    access-token claims are kept in a small per-process LRU, so a token
+    seen before is accepted with a dictionary lookup and an expiry check.
+    Access tokens carry the claims that API views read off request.user;
+    only refreshing a token reads the user row.
+    """
+
+    def __init__(self):
+        self._verified = LRUCache(maxsize=settings.JWT_CLAIMS_CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    def generate_tokens(self, user):
+        """
+        :param user: User instance
+        :return: (access token, refresh token)
+        """
+        now = datetime.now(timezone.utc)
+        access_token = jwt.encode({
+            'type': ACCESS_TOKEN,
+            'user_id': user.id,
+            **{claim: getattr(user, claim) for claim in USER_CLAIMS},
+            'iat': now,
+            'exp': now + settings.JWT_ACCESS_TOKEN_EXPIRY,
+        }, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        refresh_token = jwt.encode({
+            'type': REFRESH_TOKEN,
+            'user_id': user.id,
+            'pwd': _password_fingerprint(user),
+            'jti': uuid.uuid4().hex,
+            'iat': now,
+            'exp': now + settings.JWT_REFRESH_TOKEN_EXPIRY,
+        }, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        return access_token, refresh_token
+
+    def decode_token(self, token, token_type):
+        """
+        :return: The token's claims, or None if it is malformed, forged, expired or of another type
+        """
+        if not token:
+            return None
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM],
+                                 options={'require': ['exp', 'user_id', 'type']})
+        except jwt.InvalidTokenError:
+            return None
+        return payload if payload['type'] == token_type else None
+
+    def verify_access_token(self, token):
+        """
+        :return: The claims of a valid access token, or None
+        """
+        with self._lock:
+            payload = self._verified.get(token)
+        if payload is not None:
+            return payload if payload['exp'] > time.time() else None
+        payload = self.decode_token(token, ACCESS_TOKEN)
+        if payload is not None:
+            with self._lock:
+                self._verified[token] = payload
+        return payload
+
+    def get_user_for_refresh(self, payload):
+        """
+        :param payload: Claims of a decoded refresh token
+        :return: The active user the token was issued to, or None if the
+                 user is gone, deactivated or changed their password since
+        """
+        try:
+            user = User.objects.get(id=payload['user_id'], active=True)
+        except User.DoesNotExist:
+            return None
+        return user if payload.get('pwd') == _password_fingerprint(user) else None
+
+    @staticmethod
+    def user_from_claims(payload):
+        """
+        Builds the authenticated user from access-token claims without a
+        query. Only id and USER_CLAIMS are set; call refresh_from_db() on
+        it before reading or saving anything else.
+        """
+        user = User(id=payload['user_id'], **{claim: payload.get(claim) for claim in USER_CLAIMS})
+        user._state.adding = False
+        return user
+
+
+jwt_helper = JWTHelper()
+
+
+def generate_tokens(user):
+    return jwt_helper.generate_tokens(user)
+
+
+def decode_jwt_token(token, token_type=REFRESH_TOKEN):
+    return jwt_helper.decode_token(token, token_type)
@@ -0,0 +1,200 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import reduce
+import operator
+import pytz
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from users.app_settings import AVAILABILITY_RESOLUTION_MINUTES, DEFAULT_TIMEZONE, EventStatus
+from users.helpers.availability_bitmap import AvailabilityBitmap
+from users.helpers.slot_finder import subtract_intervals
+from users.models import BusyInterval, Event, OpenInterval, User, rebuild_availability_bitmap
+
+RESOLUTION = timedelta(minutes=AVAILABILITY_RESOLUTION_MINUTES)
+
+
+class OpenIntervalHelper:
+    """
+    Maintains the OpenInterval table: each user's free time per local date
+    from today up to User.open_intervals_until. Changes recompute only the
+    (user, date) pairs they touch; extend_horizon rolls the window forward.
+    """
+
+    @staticmethod
+    def _zone():
+        return pytz.timezone(DEFAULT_TIMEZONE)
+
+    def _today(self):
+        return datetime.now(self._zone()).date()
+
+    def is_materialized(self, user, start_datetime, end_datetime):
+        """
+        Whether the user's free time between two aware datetimes can be read
+        from OpenInterval. Busy time of users whose calendar is not mirrored
+        is only known to Google, so those users never qualify.
+        """
+        if not user.google_sync_token or user.open_intervals_until is None:
+            return False
+        zone = self._zone()
+        return (start_datetime.astimezone(zone).date() >= self._today()
+                and end_datetime.astimezone(zone).date() <= user.open_intervals_until)
+
+    def _open_intervals(self, user_id, start_datetime, end_datetime):
+        zone = self._zone()
+        return OpenInterval.objects.filter(
+            user_id=user_id,
+            date__range=(start_datetime.astimezone(zone).date(), end_datetime.astimezone(zone).date()),
+            start__lt=end_datetime,
+            end__gt=start_datetime,
+        ).order_by('start').values_list('start', 'end')
+
+    def get_open_intervals(self, user_id, start_datetime, end_datetime):
+        """
+        :return: Sorted (start, end) aware datetimes of free time overlapping the range
+        """
+        return list(self._open_intervals(user_id, start_datetime, end_datetime))
+
+    async def aget_open_intervals(self, user_id, start_datetime, end_datetime):
+        return [interval async for interval in self._open_intervals(user_id, start_datetime, end_datetime)]
+
+    def covers(self, user_id, start_datetime, end_datetime):
+        """
+        Whether the whole range is free, possibly across rows of consecutive dates.
+        """
+        return self._covers(self.get_open_intervals(user_id, start_datetime, end_datetime),
+                            start_datetime, end_datetime)
+
+    async def acovers(self, user_id, start_datetime, end_datetime):
+        return self._covers(await self.aget_open_intervals(user_id, start_datetime, end_datetime),
+                            start_datetime, end_datetime)
+
+    @staticmethod
+    def _covers(intervals, start_datetime, end_datetime):
+        covered_until = start_datetime
+        for start, end in intervals:
+            if start > covered_until:
+                return False
+            covered_until = max(covered_until, end)
+            if covered_until >= end_datetime:
+                return True
+        return False
+
+    def refresh_ranges(self, ranges):
+        """
+        Recomputes the dates touched by changed bookings or busy time.
+        :param ranges: Iterable of (user_id, start, end) aware datetimes
+        """
+        zone = self._zone()
+        dates = defaultdict(set)
+        for user_id, start, end in ranges:
+            if start is None or end is None:
+                continue
+            day = start.astimezone(zone).date()
+            last = max(day, (end - timedelta(microseconds=1)).astimezone(zone).date())
+            while day <= last:
+                dates[user_id].add(day)
+                day += timedelta(days=1)
+        self._refresh(dates, lambda day: True)
+
+    def refresh_weekdays(self, user_ids, weekdays):
+        """
+        Recomputes the dates falling on weekdays whose availability changed.
+        :param weekdays: Days as returned by date.weekday(), Monday being 0
+        """
+        weekdays = set(weekdays)
+        self._refresh({user_id: None for user_id in user_ids}, lambda day: day.weekday() in weekdays)
+
+    def refresh_users(self, user_ids):
+        self.refresh_weekdays(user_ids, range(7))
+
+    def _refresh(self, dates_by_user, predicate):
+        """
+        :param dates_by_user: {user_id: set of dates, or None for the whole materialized range}
+        :param predicate: Filter applied to those dates
+        """
+        if not dates_by_user:
+            return
+        today = self._today()
+        plan = {}
+        for user_id, bitmap, until in User.objects.filter(
+                id__in=dates_by_user, open_intervals_until__gte=today
+        ).values_list('id', 'availability_bitmap', 'open_intervals_until'):
+            candidates = dates_by_user[user_id]
+            if candidates is None:
+                candidates = (today + timedelta(days=offset) for offset in range((until - today).days + 1))
+            dates = sorted(day for day in candidates if today <= day <= until and predicate(day))
+            if dates:
+                plan[user_id] = (self._bitmap(user_id, bitmap), dates)
+        self._rebuild(plan)
+
+    def extend_horizon(self, user_ids):
+        """
+        Materializes the users' free time up to OPEN_INTERVAL_HORIZON_DAYS
+        ahead, computing only dates that are not materialized yet, and drops
+        dates that have passed.
+        :param user_ids: Ids of the users to extend
+        """
+        today = self._today()
+        last = today + timedelta(days=settings.OPEN_INTERVAL_HORIZON_DAYS - 1)
+        plan = {}
+        for user_id, bitmap, until in User.objects.filter(id__in=user_ids).values_list(
+                'id', 'availability_bitmap', 'open_intervals_until'):
+            first = today if until is None or until < today else until + timedelta(days=1)
+            dates = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+            plan[user_id] = (self._bitmap(user_id, bitmap), dates)
+        with transaction.atomic():
+            OpenInterval.objects.filter(user_id__in=plan, date__lt=today).delete()
+            self._rebuild(plan)
+            User.objects.filter(id__in=plan).update(open_intervals_until=last)
+
+    @staticmethod
+    def _bitmap(user_id, data):
+        if data is None:
+            data = rebuild_availability_bitmap(user_id)
+        return AvailabilityBitmap.from_bytes(data)
+
+    def _rebuild(self, plan):
+        """
+        Replaces the OpenInterval rows of the planned (user, date) pairs, with
+        one query each for bookings, mirrored busy time, the delete and the insert.
+        :param plan: {user_id: (AvailabilityBitmap, sorted dates)}
+        """
+        plan = {user_id: (bitmap, dates) for user_id, (bitmap, dates) in plan.items() if dates}
+        if not plan:
+            return
+        zone = self._zone()
+        window_start = zone.localize(datetime.combine(min(dates[0] for _, dates in plan.values()), time.min))
+        window_end = zone.localize(datetime.combine(
+            max(dates[-1] for _, dates in plan.values()) + timedelta(days=1), time.min))
+        busy = defaultdict(list)
+        for user_id, start, end in Event.objects.filter(
+                user_id__in=plan, start_datetime__lt=window_end, end_datetime__gt=window_start
+        ).exclude(status=EventStatus.FAILED).values_list('user_id', 'start_datetime', 'end_datetime'):
+            busy[user_id].append((start, end))
+        for user_id, start, end in BusyInterval.objects.filter(
+                user_id__in=plan, start__lt=window_end, end__gt=window_start
+        ).values_list('user_id', 'start', 'end'):
+            busy[user_id].append((start, end))
+
+        rows = []
+        users_by_dates = defaultdict(list)
+        for user_id, (bitmap, dates) in plan.items():
+            users_by_dates[tuple(dates)].append(user_id)
+            for day in dates:
+                midnight = datetime.combine(day, time.min)
+                windows = [
+                    (zone.localize(midnight + start * RESOLUTION), zone.localize(midnight + end * RESOLUTION))
+                    for start, end in bitmap.iter_day_runs(day.weekday())
+                ]
+                rows.extend(
+                    OpenInterval(user_id=user_id, date=day, start=start, end=end)
+                    for start, end in subtract_intervals(windows, busy[user_id])
+                )
+        with transaction.atomic():
+            OpenInterval.objects.filter(reduce(operator.or_, (
+                Q(user_id__in=user_ids, date__in=dates) for dates, user_ids in users_by_dates.items()
+            ))).delete()
+            OpenInterval.objects.bulk_create(rows, batch_size=1000)
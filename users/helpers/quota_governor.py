@@ -0,0 +1,268 @@
+import asyncio
+import contextvars
+import json
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+
+from SchedulEase.metrics import GOOGLE_QUOTA
+from users.app_settings import GoogleCallPriority
+from users.models import GoogleQuotaBucket
+
+PROJECT_BUCKET = 'project'
+# Error reasons of 403 and 429 responses that clear up within seconds. Daily
+# quota errors do not and are returned to the caller.
+USER_RATE_LIMIT_REASONS = {'userRateLimitExceeded'}
+PROJECT_RATE_LIMIT_REASONS = {'rateLimitExceeded'}
+# Seconds to wait when a bucket came up short but had refilled by the time
+# it was read back.
+RETRY_WAIT = 0.01
+
+_call_priority = contextvars.ContextVar('google_call_priority', default=GoogleCallPriority.NORMAL)
+
+
+class GoogleQuotaExceeded(Exception):
+    """
+    A Google API call was shed because its quota would not allow it within
+    the wait its priority tolerates.
+    """
+
+
+@contextmanager
+def google_call_priority(priority):
+    """
+    Runs the Google calls made in the block, including those of threads and
+    tasks it starts, at the given GoogleCallPriority.
+    """
+    token = _call_priority.set(priority)
+    try:
+        yield
+    finally:
+        _call_priority.reset(token)
+
+
+def user_bucket(user_id):
+    return f'user:{user_id}'
+
+
+def rate_limit_scope(status, content):
+    """
+    :param status: HTTP status of a Google API response
+    :param content: Its body
+    :return: 'user' or 'project', the quota a rate-limit error was charged
+             to, or None for any other response
+    """
+    if status not in (403, 429):
+        return None
+    try:
+        errors = json.loads(content)['error'].get('errors', [])
+        reasons = {error.get('reason') for error in errors}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        reasons = set()
+    if reasons & USER_RATE_LIMIT_REASONS:
+        return 'user'
+    if status == 429 or reasons & PROJECT_RATE_LIMIT_REASONS:
+        return 'project'
+    return None
+
+
+class GoogleQuotaGovernor:
+    """
+    Admits Google Calendar calls through two token buckets, the project's
+    and the calling user's, kept in GoogleQuotaBucket rows so that every
+    worker process draws from the same quota. A call takes a token from
+    both with conditional UPDATEs, never holding a row lock across a
+    round trip, or waits for the refill; lower priorities leave part of each
+    bucket to higher ones and are shed sooner, high-priority calls queue.
+
+    A rate-limit error halves the refill rate of the bucket it was charged
+    to and empties it, so all processes slow down together instead of
+    retrying into the limit; admitted calls win the rate back gradually.
+    The rejected call itself is retried with jittered exponential backoff.
+    """
+
+    def _limits(self, user_id):
+        # every call updates the user's row before the project's, so the
+        # contended project row stays locked only until the commit and two
+        # calls never wait on each other's rows in opposite order
+        return (
+            (user_bucket(user_id), settings.GOOGLE_QUOTA_USER_RATE, settings.GOOGLE_QUOTA_USER_BURST),
+            (PROJECT_BUCKET, settings.GOOGLE_QUOTA_PROJECT_RATE, settings.GOOGLE_QUOTA_PROJECT_BURST),
+        )
+
+    @staticmethod
+    def _refilled_tokens(rate, burst, now):
+        """
+        :return: Expression of a bucket's tokens refilled up to ``now``
+        """
+        elapsed = Greatest(Value(float(now)) - F('updated_at'), Value(0.0))
+        return Least(Value(float(burst)), F('tokens') + elapsed * Value(float(rate)) * F('rate_scale'))
+
+    def _take_tokens(self, limits, cost, reserve, now):
+        """
+        Refills and takes ``cost`` tokens from every bucket with one
+        conditional UPDATE each, which only matches while the bucket holds
+        enough, all in one transaction.
+        :return: Whether every bucket gave its tokens
+        """
+        with transaction.atomic():
+            for key, rate, burst in limits:
+                tokens = self._refilled_tokens(rate, burst, now)
+                taken = GoogleQuotaBucket.objects.filter(
+                    GreaterThanOrEqual(tokens, min(cost, burst) + reserve * burst), key=key,
+                ).update(
+                    tokens=tokens - Value(float(cost)),
+                    updated_at=now,
+                    rate_scale=Least(Value(1.0), F('rate_scale') + Value(float(settings.GOOGLE_QUOTA_RATE_RECOVERY))),
+                )
+                if not taken:
+                    transaction.set_rollback(True)
+                    return False
+        return True
+
+    @staticmethod
+    def _read_buckets(limits):
+        return GoogleQuotaBucket.objects.using(DEFAULT_DB_ALIAS).in_bulk(
+            [key for key, _, _ in limits], field_name='key')
+
+    def take(self, user_id, cost=1, reserve=0.0):
+        """
+        Takes ``cost`` tokens from the project's and the user's bucket if
+        both hold them on top of ``reserve`` (a share of their burst).
+        Calls costing more than a burst only need a full bucket and leave
+        it in debt. Buckets are only read back when they come up short.
+        :return: 0 once the tokens are taken, otherwise the seconds until they may be
+        """
+        limits = self._limits(user_id)
+        now = time.time()
+        if self._take_tokens(limits, cost, reserve, now):
+            return 0.0
+        buckets = self._read_buckets(limits)
+        if len(buckets) < len(limits):
+            GoogleQuotaBucket.objects.bulk_create([
+                GoogleQuotaBucket(key=key, tokens=burst, updated_at=now)
+                for key, _, burst in limits if key not in buckets
+            ], ignore_conflicts=True)
+            if self._take_tokens(limits, cost, reserve, now):
+                return 0.0
+            buckets = self._read_buckets(limits)
+        wait = 0.0
+        for key, rate, burst in limits:
+            bucket = buckets[key]
+            rate *= bucket.rate_scale
+            tokens = min(burst, bucket.tokens + max(0.0, now - bucket.updated_at) * rate)
+            needed = min(cost, burst) + reserve * burst
+            if tokens < needed:
+                wait = max(wait, (needed - tokens) / rate)
+        return wait or RETRY_WAIT
+
+    def throttle(self, key):
+        """
+        Empties the bucket and halves its refill rate after Google rejected
+        a call charged to it.
+        """
+        GoogleQuotaBucket.objects.filter(key=key).update(
+            tokens=Least(F('tokens'), Value(0.0)),
+            updated_at=time.time(),
+            rate_scale=Greatest(Value(float(settings.GOOGLE_QUOTA_MIN_RATE_SCALE)), F('rate_scale') / Value(2.0)),
+        )
+
+    def _atake(self, user_id, cost, reserve):
+        """
+        take() for aacquire, run on a pool thread rather than the one
+        thread that all thread-sensitive calls of the worker share. No
+        request closes that thread's connection, so it is closed here once
+        it outlives CONN_MAX_AGE.
+        """
+        try:
+            return self.take(user_id, cost, reserve)
+        finally:
+            close_old_connections()
+
+    def _admission_delay(self, wait, deadline, priority, queued):
+        if time.monotonic() + wait > deadline:
+            GOOGLE_QUOTA.inc(('shed', priority))
+            raise GoogleQuotaExceeded(f"Google API quota exhausted, {priority} priority call shed")
+        if not queued:
+            GOOGLE_QUOTA.inc(('queued', priority))
+        # spread the waiters out so they do not all come back at once
+        return wait * random.uniform(1.0, 1.2)
+
+    def _backoff_delay(self, attempt, retry_after, priority):
+        GOOGLE_QUOTA.inc(('retried', priority))
+        delay = random.uniform(0, min(settings.GOOGLE_QUOTA_BACKOFF_MAX,
+                                      settings.GOOGLE_QUOTA_BACKOFF_BASE * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after or 0))
+        except ValueError:
+            return delay
+
+    def acquire(self, user_id, cost=1):
+        """
+        Blocks until the user's call may go out at the current priority.
+        :raise GoogleQuotaExceeded: if that would take longer than the priority may wait
+        """
+        priority = _call_priority.get()
+        deadline = time.monotonic() + settings.GOOGLE_QUOTA_MAX_WAIT[priority]
+        queued = False
+        while wait := self.take(user_id, cost, settings.GOOGLE_QUOTA_RESERVE[priority]):
+            time.sleep(self._admission_delay(wait, deadline, priority, queued))
+            queued = True
+
+    async def aacquire(self, user_id, cost=1):
+        priority = _call_priority.get()
+        deadline = time.monotonic() + settings.GOOGLE_QUOTA_MAX_WAIT[priority]
+        queued = False
+        take = sync_to_async(self._atake, thread_sensitive=False)
+        while wait := await take(user_id, cost, settings.GOOGLE_QUOTA_RESERVE[priority]):
+            await asyncio.sleep(self._admission_delay(wait, deadline, priority, queued))
+            queued = True
+
+    def _charge(self, user_id, scope):
+        self.throttle(user_bucket(user_id) if scope == 'user' else PROJECT_BUCKET)
+
+    def call(self, user_id, send, cost=1):
+        """
+        Sends an httplib2 request once the quota admits it, retrying it
+        while Google answers with a rate-limit error.
+        :param send: Callable returning the (response, content) of httplib2
+        :param cost: Number of API calls the request makes, e.g. parts of a batch
+        :return: (response, content) of the last attempt
+        """
+        if not settings.GOOGLE_QUOTA_ENABLED:
+            return send()
+        for attempt in range(settings.GOOGLE_QUOTA_MAX_RETRIES + 1):
+            self.acquire(user_id, cost)
+            response, content = send()
+            scope = rate_limit_scope(response.status, content)
+            if scope is None or attempt == settings.GOOGLE_QUOTA_MAX_RETRIES:
+                return response, content
+            self._charge(user_id, scope)
+            time.sleep(self._backoff_delay(attempt, response.get('retry-after'), _call_priority.get()))
+
+    async def acall(self, user_id, send, cost=1):
+        """
+        Async variant of call for httpx requests.
+        :param send: Coroutine function returning an httpx response
+        """
+        if not settings.GOOGLE_QUOTA_ENABLED:
+            return await send()
+        for attempt in range(settings.GOOGLE_QUOTA_MAX_RETRIES + 1):
+            await self.aacquire(user_id, cost)
+            response = await send()
+            scope = rate_limit_scope(response.status_code, response.content)
+            if scope is None or attempt == settings.GOOGLE_QUOTA_MAX_RETRIES:
+                return response
+            await sync_to_async(self._charge)(user_id, scope)
+            await asyncio.sleep(self._backoff_delay(attempt, response.headers.get('retry-after'),
+                                                    _call_priority.get()))
+
+
+google_quota = GoogleQuotaGovernor()
@@ -0,0 +1,133 @@
+from datetime import datetime, time, timedelta
+
+from users.app_settings import AVAILABILITY_RESOLUTION_MINUTES
+from users.helpers.availability_bitmap import SLOTS_PER_DAY
+
+RESOLUTION = timedelta(minutes=AVAILABILITY_RESOLUTION_MINUTES)
+
+# numpy is imported by the functions that search for slots, so a worker
+# loads it with its first slot search rather than at startup.
+
+
+def find_open_slots(bitmap, busy_intervals, start_date, end_date, duration, zone, not_before=None):
+    """
+    Finds every start time between two dates at which a meeting of the given
+    duration fits inside the weekly availability and clear of busy time.
+    The whole range is laid out as one quarter-hour grid in ``zone`` so the
+    search is a handful of array operations regardless of its length.
+    :param bitmap: AvailabilityBitmap of the host
+    :param busy_intervals: Iterable of (start, end) aware datetimes
+    :param start_date: First date to search
+    :param end_date: Last date to search, inclusive
+    :param duration: timedelta of the meeting
+    :param zone: pytz timezone the weekly availability is expressed in
+    :param not_before: Optional aware datetime before which no slot may start
+    :return: numpy datetime64[m] array of local (naive) slot start times
+    """
+    import numpy as np
+
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return np.array([], dtype='datetime64[m]')
+    cells = days * SLOTS_PER_DAY
+    origin = zone.localize(datetime.combine(start_date, datetime.min.time()))
+
+    week = np.unpackbits(np.frombuffer(bitmap.to_bytes(), dtype=np.uint8), bitorder='little')
+    week = np.roll(week, -start_date.weekday() * SLOTS_PER_DAY)
+    free = np.resize(week, cells).astype(bool)
+
+    busy = np.array([(start.timestamp(), end.timestamp()) for start, end in busy_intervals],
+                    dtype=np.float64).reshape(-1, 2)
+    if not_before is not None and not_before > origin:
+        busy = np.vstack([busy, [origin.timestamp(), not_before.timestamp()]])
+    if len(busy):
+        offsets = (busy - origin.timestamp()) / RESOLUTION.total_seconds()
+        starts = np.clip(np.floor(offsets[:, 0]), 0, cells).astype(np.int64)
+        ends = np.clip(np.ceil(offsets[:, 1]), 0, cells).astype(np.int64)
+        depth = np.zeros(cells + 1, dtype=np.int64)
+        np.add.at(depth, starts, 1)
+        np.add.at(depth, ends, -1)
+        free &= np.cumsum(depth[:-1]) <= 0
+
+    length = max(1, -(-duration // RESOLUTION))
+    if length > cells:
+        return np.array([], dtype='datetime64[m]')
+    running = np.concatenate(([0], np.cumsum(free, dtype=np.int64)))
+    fits = np.flatnonzero(running[length:] - running[:-length] == length)
+    base = np.datetime64(origin.replace(tzinfo=None), 'm')
+    return base + fits * np.timedelta64(AVAILABILITY_RESOLUTION_MINUTES, 'm')
+
+
+def subtract_intervals(intervals, busy_intervals):
+    """
+    Removes busy time from a list of free intervals.
+    :param intervals: Sorted, disjoint (start, end) pairs
+    :param busy_intervals: (start, end) pairs in any order
+    :return: Sorted list of what remains of ``intervals``
+    """
+    busy = sorted(busy_intervals)
+    remaining = []
+    first = 0
+    for start, end in intervals:
+        while first < len(busy) and busy[first][1] <= start:
+            first += 1
+        cursor = start
+        for busy_start, busy_end in busy[first:]:
+            if busy_start >= end:
+                break
+            if busy_start > cursor:
+                remaining.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            remaining.append((cursor, end))
+    return remaining
+
+
+def find_slots_in_intervals(open_intervals, busy_intervals, start_date, duration, zone, not_before=None):
+    """
+    Counterpart of find_open_slots for free time that is already known as
+    intervals, such as materialized OpenInterval rows. Slots start on the
+    same quarter-hour grid and are returned in the same form.
+    :param open_intervals: Sorted, disjoint (start, end) aware datetimes
+    :param busy_intervals: Additional (start, end) aware datetimes to keep clear of
+    :param start_date: First date searched, whose local midnight anchors the grid
+    :param duration: timedelta of the meeting
+    :param zone: pytz timezone the slots are expressed in
+    :param not_before: Optional aware datetime before which no slot may start
+    :return: numpy datetime64[m] array of local (naive) slot start times
+    """
+    import numpy as np
+
+    origin = zone.localize(datetime.combine(start_date, time.min))
+    if not_before is not None and not_before > origin:
+        busy_intervals = list(busy_intervals) + [(origin, not_before)]
+    length = max(1, -(-duration // RESOLUTION))
+    merged = []
+    for start, end in subtract_intervals(open_intervals, busy_intervals):
+        if merged and merged[-1][1] >= start:
+            # rows of consecutive dates meet at midnight
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    offsets = [
+        np.arange(-(-(start - origin) // RESOLUTION), (end - origin) // RESOLUTION - length + 1)
+        for start, end in merged
+    ]
+    fits = np.concatenate(offsets) if offsets else np.array([], dtype=np.int64)
+    base = np.datetime64(origin.replace(tzinfo=None), 'm')
+    return base + fits * np.timedelta64(AVAILABILITY_RESOLUTION_MINUTES, 'm')
+
+
+def format_slot_times(slot_starts, duration):
+    """
+    :param slot_starts: Slot start times returned by find_open_slots or find_slots_in_intervals
+    :param duration: timedelta of the meeting
+    :return: List of (start, end) local times in ISO format, to the second
+    """
+    import numpy as np
+
+    slot_ends = slot_starts + np.timedelta64(int(duration.total_seconds()), 's')
+    return list(zip(
+        np.datetime_as_string(slot_starts, unit='s').tolist(),
+        np.datetime_as_string(slot_ends, unit='s').tolist()
+    ))
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from users.helpers.event_helper import EventHelper, is_booking_conflict
+from users.models import SlotHold
+
+
+class SlotHoldHelper:
+    event_helper = EventHelper()
+
+    def place_hold(self, user, guest_email, start_datetime, end_datetime, ttl=None):
+        """
+        Reserves a slot for a guest for ``ttl`` (SLOT_HOLD_TTL by default).
+        The hold is inserted before the calendar is consulted, so concurrent
+        guests racing for the same slot are turned away by slot_hold_no_overlap
+        without waiting on Google.
+        :param user: Host User instance
+        :param guest_email: Email of the guest holding the slot
+        :param start_datetime: Aware start datetime
+        :param end_datetime: Aware end datetime
+        :return: SlotHold instance, or None if the slot is taken
+        """
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                # expired holds still occupy the constraint until swept
+                SlotHold.objects.filter(
+                    user=user,
+                    start_datetime__lt=end_datetime,
+                    end_datetime__gt=start_datetime,
+                    expires_at__lte=now
+                ).delete()
+                hold = SlotHold.objects.create(
+                    user=user,
+                    guest_email=guest_email,
+                    start_datetime=start_datetime,
+                    end_datetime=end_datetime,
+                    expires_at=now + (ttl or settings.SLOT_HOLD_TTL)
+                )
+        except IntegrityError as e:
+            if is_booking_conflict(e):
+                return None
+            raise
+        try:
+            is_available = self.event_helper.check_user_availability(
+                user, start_datetime.isoformat(), end_datetime.isoformat(), exclude_hold_token=hold.token)
+        except Exception:
+            hold.delete()
+            raise
+        if not is_available:
+            hold.delete()
+            return None
+        return hold
+
+    def release_hold(self, token):
+        """
+        :return: True if an active hold was released
+        """
+        deleted, _ = SlotHold.objects.filter(token=token).delete()
+        return bool(deleted)
+
+    def consume_hold(self, token, user, start_datetime, end_datetime):
+        """
+        Deletes the hold a booking is made against. Must run inside the
+        transaction that inserts the Event, so the slot is never free in between.
+        :return: True if the hold was still valid for this user and time range
+        """
+        hold = SlotHold.objects.select_for_update().filter(
+            token=token,
+            user=user,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+            expires_at__gt=timezone.now()
+        ).first()
+        if hold is None:
+            return False
+        hold.delete()
+        return True
+
+    def sweep_expired(self):
+        """
+        :return: Number of expired holds removed
+        """
+        deleted, _ = SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
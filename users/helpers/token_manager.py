@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import threading
+import weakref
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+
+from users.helpers.google_libs import google_libs
+from users.models import User
+
+# first key of the advisory locks taken around token refreshes; the second is the user id
+TOKEN_REFRESH_LOCK_NAMESPACE = 1
+
+
+
+def _to_naive_utc(value):
+    # google-auth compares expiry against a naive UTC "now"
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value else None
+
+
+class GoogleTokenManager:
+    """
+    Keeps valid Google credentials in memory so request paths never refresh
+    or write tokens. Only credentials with a known expiry are kept, in an
+    LRU of GOOGLE_CREDENTIALS_CACHE_SIZE users; tokens without one are read
+    from the database every time, so a rotation by another process is seen.
+    Refreshes are single-flight across threads and processes: whoever waits
+    on the per-user lock re-reads the row and only refreshes if the token
+    is still due. The network call holds no row lock or transaction, and
+    the new token is only written if no fresher one was stored meanwhile.
+    The refresh_google_tokens command refreshes tokens ahead of expiry.
+    """
+
+    def __init__(self):
+        self._credentials = LRUCache(maxsize=settings.GOOGLE_CREDENTIALS_CACHE_SIZE)
+        self._credentials_guard = threading.Lock()
+        # a user's lock lives only while a thread holds or waits on it
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+
+    def _get_lock(self, user_id):
+        with self._locks_guard:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = self._locks[user_id] = threading.Lock()
+            return lock
+
+    @staticmethod
+    @contextmanager
+    def _refresh_lock(db, user_id):
+        """
+        Serializes refreshes of one user across processes with a session-level
+        Postgres advisory lock, which unlike a row lock keeps no transaction
+        open during the call to Google. Other databases rely on the
+        per-process lock alone.
+        """
+        connection = connections[db]
+        if connection.vendor != 'postgresql':
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s, %s)', [TOKEN_REFRESH_LOCK_NAMESPACE, user_id])
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s, %s)', [TOKEN_REFRESH_LOCK_NAMESPACE, user_id])
+
+    def _build_credentials(self, user):
+        return google_libs.Credentials(
+            token=user.google_access_token,
+            refresh_token=user.google_refresh_token,
+            token_uri=settings.GOOGLE_TOKEN_URI,
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+            expiry=_to_naive_utc(user.google_token_expiry),
+        )
+
+    def _remember(self, user_id, credentials):
+        if credentials.expiry is not None:
+            with self._credentials_guard:
+                self._credentials[user_id] = credentials
+
+    def get_cached_credentials(self, user_id):
+        """
+        :return: Valid in-memory Credentials, or None if a database read or refresh is needed
+        """
+        with self._credentials_guard:
+            credentials = self._credentials.get(user_id)
+        return credentials if credentials is not None and credentials.valid else None
+
+    def get_credentials(self, user):
+        """
+        :param user: User instance holding Google tokens
+        :return: Valid Credentials, refreshed only if no valid token is known
+        """
+        credentials = self.get_cached_credentials(user.id)
+        if credentials is not None:
+            return credentials
+        credentials = self._build_credentials(user)
+        if credentials.valid or not user.google_refresh_token:
+            self._remember(user.id, credentials)
+            return credentials
+        return self.refresh(user.id)
+
+    def refresh(self, user_id, margin=None):
+        """
+        Refreshes the user's access token unless another thread or process
+        already did, or it stays valid for at least ``margin``.
+        :param user_id: Id of the user
+        :param margin: timedelta the token must outlive to skip the refresh
+        :return: Valid Credentials
+        """
+        # the primary, so a token another process just stored is seen
+        db = DEFAULT_DB_ALIAS
+        with self._get_lock(user_id), self._refresh_lock(db, user_id):
+            user = User.objects.using(db).get(id=user_id)
+            credentials = self._build_credentials(user)
+            expires_soon = user.google_token_expiry is None or (
+                margin is not None and user.google_token_expiry <= datetime.now(timezone.utc) + margin)
+            if not credentials.valid or expires_soon:
+                credentials.refresh(google_libs.Request())
+                expiry = credentials.expiry.replace(tzinfo=timezone.utc)
+                User.objects.using(db).filter(
+                    Q(google_token_expiry__isnull=True) | Q(google_token_expiry__lt=expiry), id=user_id
+                ).update(google_access_token=credentials.token, google_token_expiry=expiry)
+            self._remember(user_id, credentials)
+            return credentials
+
+
+token_manager = GoogleTokenManager()
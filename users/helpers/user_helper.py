@@ -1,7 +1,4 @@
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from django.conf import settings
-
+from users.helpers.token_manager import token_manager
 from users.models import User
 
 class UserHelper:
@@ -13,16 +10,7 @@ class UserHelper:
         if not user.google_refresh_token:
             return {"error": "No Google refresh token available"}, False
         try:
-            creds = Credentials(
-                None, 
-                refresh_token=user.google_refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=settings.GOOGLE_CLIENT_ID,
-                client_secret=settings.GOOGLE_CLIENT_SECRET,
-            )
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            User.objects.filter(id=user_id).update(google_access_token=creds.token)
+            creds = token_manager.refresh(user_id)
             return {
                 "message": "Google access token refreshed successfully",
                 "data": {
@@ -31,4 +19,4 @@ class UserHelper:
                 }
             }, True
         except Exception as e:
-            return {"error": f"Failed to refresh Google access token: {str(e)}"}, False
\ No newline at end of file
+            return {"error": f"Failed to refresh Google access token: {str(e)}"}, False
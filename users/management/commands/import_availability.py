@@ -0,0 +1,77 @@
+import csv
+import json
+import os
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from users.app_settings import ScheduleMode
+from users.helpers.availability_import_helper import AvailabilityImportHelper
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import weekly availability for many users from a CSV or JSON file. Each row or object "
+        "has email (or user_id), day_of_week, start_time and end_time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON file to import")
+        parser.add_argument('--mode', choices=ScheduleMode.values, default=ScheduleMode.REPLACE,
+                            help="Replace each user's schedule or merge into it")
+
+    def handle(self, *args, **options):
+        rows = self.read_rows(options['path'])
+        import_helper = AvailabilityImportHelper()
+        emails = {row['email'].strip().lower() for row in rows if row.get('email')}
+        user_ids_by_email = {
+            email.lower(): user_id
+            for email, user_id in User.objects.filter(email__in=emails).values_list('email', 'id')
+        }
+        known_ids = set(User.objects.filter(
+            id__in=[row['user_id'] for row in rows if str(row.get('user_id', '')).isdigit()]
+        ).values_list('id', flat=True))
+
+        schedules = defaultdict(list)
+        skipped = set()
+        for line, row in enumerate(rows, start=1):
+            if row.get('email'):
+                user_id = user_ids_by_email.get(row['email'].strip().lower())
+            else:
+                user_id = int(row['user_id']) if str(row.get('user_id', '')).isdigit() else None
+                user_id = user_id if user_id in known_ids else None
+            if user_id is None:
+                self.stderr.write(f"Row {line}: user not found")
+                continue
+            try:
+                schedules[user_id].append(import_helper.parse_slot(row))
+            except ValidationError as e:
+                self.stderr.write(f"Row {line}: {e.messages[0]}")
+                skipped.add(user_id)
+        for user_id in skipped:
+            # a partial schedule would silently drop the user's other slots
+            schedules.pop(user_id, None)
+
+        errors = import_helper.save_schedules(schedules, options['mode'])
+        for user_id, error in errors.items():
+            self.stderr.write(f"User {user_id}: {error}")
+        imported = len(schedules) - len(errors)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported schedules of {imported} user(s), {len(errors) + len(skipped)} rejected"))
+
+    @staticmethod
+    def read_rows(path):
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        with open(path, newline='') as f:
+            if path.lower().endswith('.json'):
+                try:
+                    rows = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise CommandError(f"Invalid JSON: {e}")
+                if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                    raise CommandError("JSON file must contain a list of objects")
+                return rows
+            return list(csv.DictReader(f))
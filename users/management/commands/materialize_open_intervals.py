@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Extend every active user's materialized open intervals to OPEN_INTERVAL_HORIZON_DAYS ahead (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of users extended per transaction")
+
+    def handle(self, *args, **options):
+        open_interval_helper = OpenIntervalHelper()
+        user_ids = list(User.objects.filter(active=True).values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for offset in range(0, len(user_ids), batch_size):
+            open_interval_helper.extend_horizon(user_ids[offset:offset + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Extended open intervals of {len(user_ids)} user(s)"))
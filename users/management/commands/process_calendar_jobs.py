@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.app_settings import GoogleCallPriority
+from users.helpers.calendar_job_helper import CalendarJobHelper
+from users.helpers.quota_governor import google_call_priority
+
+
+class Command(BaseCommand):
+    help = "Run queued Google Calendar writes for asynchronously booked events"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10,
+                            help="Number of jobs claimed per round")
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the due jobs once and exit")
+
+    # queued bookings yield Google quota to guests booking interactively
+    @google_call_priority(GoogleCallPriority.LOW)
+    def handle(self, *args, **options):
+        job_helper = CalendarJobHelper()
+        while True:
+            jobs = job_helper.claim_jobs(options['batch_size'])
+            for job in jobs:
+                if job_helper.run_job(job):
+                    self.stdout.write(f"Created Google event for event {job.event_id}")
+                else:
+                    self.stderr.write(f"Calendar job {job.id} failed (attempt {job.attempts})")
+            if not jobs:
+                confirmed, dropped = job_helper.settle_abandoned_events()
+                if confirmed or dropped:
+                    self.stdout.write(f"Settled abandoned bookings: {confirmed} confirmed, {dropped} dropped")
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
@@ -0,0 +1,43 @@
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from users.helpers.token_manager import token_manager
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Refresh Google access tokens that expire within GOOGLE_TOKEN_REFRESH_MARGIN"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running, checking every given number of seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            self.refresh_expiring_tokens()
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def refresh_expiring_tokens(self):
+        margin = settings.GOOGLE_TOKEN_REFRESH_MARGIN
+        user_ids = User.objects.filter(
+            Q(google_token_expiry__isnull=True) |
+            Q(google_token_expiry__lte=datetime.now(timezone.utc) + margin),
+            active=True,
+            google_refresh_token__isnull=False,
+        ).values_list('id', flat=True)
+        refreshed = failed = 0
+        for user_id in user_ids:
+            try:
+                token_manager.refresh(user_id, margin=margin)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to refresh Google token for user {user_id}: {e}")
+                continue
+            refreshed += 1
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} token(s), {failed} failed"))
@@ -0,0 +1,97 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+
+from users.benchmarks.results import compare_to_baseline, load_results, save_results
+from users.benchmarks.runner import run_suite
+from users.benchmarks.startup import check_startup_budget, measure_startup
+
+
+class Command(BaseCommand):
+    help = ("Benchmark signup, availability setup, slot lookup and concurrent booking end to end against "
+            "a local fake Google Calendar, and the JSON serialization of list endpoints, in a throwaway "
+            "test database, after checking worker startup against STARTUP_IMPORT_BUDGET_MS and "
+            "STARTUP_RSS_BUDGET_MB")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=20, help="Number of hosts signed up")
+        parser.add_argument('--bookings-per-host', type=int, default=5)
+        parser.add_argument('--lookup-rounds', type=int, default=3,
+                            help="Times every host's open slots are looked up")
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help="Threads booking and listing events at once")
+        parser.add_argument('--latency-ms', type=float, default=50, help="Latency of every fake Google call")
+        parser.add_argument('--jitter-ms', type=float, default=20, help="Random extra latency, at most")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Share of fake Google calls failing with a 503")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--slot-minutes', type=int, default=15,
+                            help="Slot length of the all-week schedule whose listing is serialized")
+        parser.add_argument('--events', type=int, default=2500, help="Events in the serialized event page")
+        parser.add_argument('--serialization-rounds', type=int, default=20,
+                            help="Times each serialization path is run")
+        parser.add_argument('--output', help="Write the results as JSON to this path, e.g. to serve as a baseline")
+        parser.add_argument('--baseline', help="Results file of an earlier run to compare against")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed relative slowdown against the baseline")
+        parser.add_argument('--keepdb', action='store_true', help="Reuse the test database if it exists")
+
+    def handle(self, *args, **options):
+        config = {
+            'hosts': options['hosts'],
+            'bookings_per_host': options['bookings_per_host'],
+            'lookup_rounds': options['lookup_rounds'],
+            'concurrency': options['concurrency'],
+            'latency': options['latency_ms'] / 1000,
+            'jitter': options['jitter_ms'] / 1000,
+            'error_rate': options['error_rate'],
+            'seed': options['seed'],
+            'slot_minutes': options['slot_minutes'],
+            'events': options['events'],
+            'serialization_rounds': options['serialization_rounds'],
+        }
+        baseline = load_results(options['baseline']) if options['baseline'] else None
+        if baseline is not None and baseline.get('config') != config:
+            self.stderr.write(self.style.WARNING(
+                f"Baseline was recorded with a different configuration: {json.dumps(baseline.get('config'))}"))
+
+        # checked first, so a regressed or failing database run still reports it
+        self.check_startup()
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            summary = run_suite(**config)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.stdout.write(f"{'scenario':<20}{'requests':>9}{'errors':>8}{'req/s':>9}"
+                          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak kB':>10}")
+        for scenario, metrics in summary.items():
+            self.stdout.write(
+                f"{scenario:<20}{metrics['requests']:>9}{metrics['errors']:>8}{metrics['throughput']:>9}"
+                f"{metrics['p50_ms']:>9}{metrics['p95_ms']:>9}{metrics['p99_ms']:>9}"
+                f"{metrics.get('peak_kb', ''):>10}")
+        if options['output']:
+            save_results(options['output'], summary, config)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['output']}"))
+        if baseline is not None:
+            regressions = compare_to_baseline(summary, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Performance regressed against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def check_startup(self):
+        """
+        :raise CommandError: if booting a worker exceeds STARTUP_IMPORT_BUDGET_MS or STARTUP_RSS_BUDGET_MB
+        """
+        startup = measure_startup()
+        self.stdout.write(f"Worker startup: {startup['import_ms']:.0f} ms of imports, "
+                          f"{startup['rss_kb'] // 1024} MB peak RSS")
+        over_budget = check_startup_budget(startup)
+        if over_budget:
+            raise CommandError("Worker startup is over budget:\n" + "\n".join(over_budget))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.helpers.slot_hold_helper import SlotHoldHelper
+
+
+class Command(BaseCommand):
+    help = "Delete slot holds whose time to live has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running, sweeping every given number of seconds")
+
+    def handle(self, *args, **options):
+        hold_helper = SlotHoldHelper()
+        while True:
+            deleted = hold_helper.sweep_expired()
+            self.stdout.write(self.style.SUCCESS(f"Removed {deleted} expired slot hold(s)"))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from users.app_settings import GoogleCallPriority
+from users.helpers.calendar_sync_helper import CalendarSyncHelper
+from users.helpers.quota_governor import google_call_priority
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Incrementally sync users' Google Calendar busy times into the local BusyInterval mirror"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, action='append', dest='user_ids',
+                            help="Only sync the given user (may be repeated)")
+
+    @google_call_priority(GoogleCallPriority.LOW)
+    def handle(self, *args, **options):
+        sync_helper = CalendarSyncHelper()
+        users = User.objects.filter(active=True, google_refresh_token__isnull=False)
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        synced = failed = 0
+        for user in users.iterator():
+            try:
+                changed = sync_helper.sync_user(user)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to sync calendar for {user.email}: {e}")
+                continue
+            synced += 1
+            if changed:
+                self.stdout.write(f"Synced {changed} change(s) for {user.email}")
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} calendar(s), {failed} failed"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_is_staff_user_is_superuser_user_last_login_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='availability_bitmap',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
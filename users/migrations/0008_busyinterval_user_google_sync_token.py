@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_availability_bitmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='google_sync_token',
+            field=models.CharField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='google_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BusyInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('google_event_id', models.CharField(max_length=1024)),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'start', 'end'], name='users_busyi_user_id_c41878_idx')],
+                'unique_together': {('user', 'google_event_id')},
+            },
+        ),
+    ]
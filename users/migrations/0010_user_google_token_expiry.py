@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_event_status_calendarjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='google_token_expiry',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
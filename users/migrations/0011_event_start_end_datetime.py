@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:13
+
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+import users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_user_google_token_expiry'),
+    ]
+
+    operations = [
+        # needed to compare the plain user column inside a GiST exclusion constraint
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='event',
+            name='end_datetime',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='start_datetime',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('end_datetime__isnull', False), ('start_datetime__isnull', False), models.Q(('status', 'failed'), _negated=True)), expressions=[('user', '='), (users.models.TsTzRange('start_datetime', 'end_datetime'), '&&')], name='event_no_double_booking'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:16
+
+import django.contrib.postgres.constraints
+import django.db.models.deletion
+import users.models
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_event_start_end_datetime'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('guest_email', models.EmailField(max_length=254)),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='users_sloth_expires_605e69_idx')],
+                'constraints': [django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('user', '='), (users.models.TsTzRange('start_datetime', 'end_datetime'), '&&')], name='slot_hold_no_overlap')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_slothold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='schedule_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
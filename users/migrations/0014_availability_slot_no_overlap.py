@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:19
+
+import django.contrib.postgres.constraints
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_user_schedule_version'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='useravailabilityslot',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('user', '='), ('day_of_week', '='), (users.models.TimeRange('start_time', 'end_time'), '&&')], name='availability_slot_no_overlap'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_availability_slot_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='open_intervals_until',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='OpenInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date', 'start'], name='users_openi_user_id_776e03_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:35
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the indexes are built without locking out writes to the tables
+    atomic = False
+
+    dependencies = [
+        ('users', '0015_openinterval'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('guest_email'), name='gin_trgm_ops'), name='event_guest_email_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='eventtype',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='event_type_name_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='user_name_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='user_email_trgm'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_admin_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleQuotaBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.FloatField()),
+                ('rate_scale', models.FloatField(default=1.0)),
+            ],
+        ),
+    ]
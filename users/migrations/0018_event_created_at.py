@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_googlequotabucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+    ]
@@ -1,10 +1,18 @@
 import datetime
+import uuid
 
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.core.exceptions import ValidationError
 
-from users.app_settings import DaysOfWeek
+from users.app_settings import CalendarJobStatus, DaysOfWeek, EventStatus
+from users.helpers.availability_bitmap import AvailabilityBitmap
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -31,6 +39,12 @@ class User(AbstractBaseUser):
     active = models.BooleanField(default=True)
     google_access_token = models.CharField(default=None, null=True, blank=True)
     google_refresh_token = models.CharField(default=None, null=True, blank=True)
+    google_token_expiry = models.DateTimeField(null=True, blank=True)
+    availability_bitmap = models.BinaryField(null=True, blank=True, editable=False)
+    google_sync_token = models.CharField(default=None, null=True, blank=True)
+    google_synced_at = models.DateTimeField(null=True, blank=True)
+    schedule_version = models.PositiveBigIntegerField(default=0, editable=False)
+    open_intervals_until = models.DateField(null=True, blank=True, editable=False)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
@@ -41,6 +55,13 @@ class User(AbstractBaseUser):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # admin search runs UPPER(col) LIKE UPPER('%term%')
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='user_name_trgm'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='user_email_trgm'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -50,6 +71,11 @@ class User(AbstractBaseUser):
     def has_module_perms(self, app_label):
         return True
 
+    def get_availability_bitmap(self):
+        if self.availability_bitmap is None:
+            self.availability_bitmap = rebuild_availability_bitmap(self.id)
+        return AvailabilityBitmap.from_bytes(self.availability_bitmap)
+
 
 def validate_time_interval(start_time, end_time):
     if end_time <= start_time:
@@ -62,6 +88,7 @@ def validate_time_interval(start_time, end_time):
 
 
 def check_for_overlaps(user, day_of_week, start_time, end_time):
+    # exact times rather than the bitmap, which rounds slots to quarter hours
     overlapping_slots = UserAvailabilitySlot.objects.filter(
         user=user,
         day_of_week=day_of_week,
@@ -71,6 +98,40 @@ def check_for_overlaps(user, day_of_week, start_time, end_time):
     if overlapping_slots.exists():
         raise ValidationError("This availability slot overlaps with an existing one")
 
+def rebuild_availability_bitmap(user_id):
+    """
+    Recomputes the packed weekly availability of a user from their slots
+    and stores it on the user row.
+    :param user_id: Id of the user whose slots changed
+    :return: The stored bitmap bytes
+    """
+    slots = UserAvailabilitySlot.objects.filter(user_id=user_id).values_list(
+        'day_of_week', 'start_time', 'end_time')
+    bitmap = AvailabilityBitmap.from_slots(slots).to_bytes()
+    User.objects.filter(id=user_id).update(availability_bitmap=bitmap)
+    return bitmap
+
+
+def bump_schedule_version(user_ids):
+    """
+    Marks the schedules of the given users as changed, invalidating the
+    ETags handed out for their availability and events.
+    :param user_ids: Iterable or values queryset of user ids
+    """
+    User.objects.filter(id__in=user_ids).update(schedule_version=F('schedule_version') + 1)
+
+class TimeRange(models.Func):
+    """
+    TSRANGE over two time columns, both anchored to the same date. Postgres
+    has no built-in time range type, and date + time is immutable, so the
+    result can back an exclusion constraint.
+    """
+    function = 'TSRANGE'
+    template = "%(function)s(DATE '2000-01-01' + %(expressions)s)"
+    arg_joiner = ", DATE '2000-01-01' + "
+    output_field = DateTimeRangeField()
+
+
 class UserAvailabilitySlot(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     day_of_week = models.IntegerField(choices=DaysOfWeek.choices)  # Day of the week
@@ -80,15 +141,37 @@ class UserAvailabilitySlot(models.Model):
 
     class Meta:
         unique_together = ('user', 'day_of_week', 'start_time', 'end_time')
+        constraints = [
+            ExclusionConstraint(
+                name='availability_slot_no_overlap',
+                expressions=[
+                    ('user', RangeOperators.EQUAL),
+                    ('day_of_week', RangeOperators.EQUAL),
+                    (TimeRange('start_time', 'end_time'), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.get_day_of_week_display()} ({self.start_time} - {self.end_time})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        slot = super().from_db(db, field_names, values)
+        # the day the row held, which an update frees; see users.signals
+        slot._stored_day = slot.__dict__.get('day_of_week')
+        return slot
+
     def clean(self):
         validate_time_interval(self.start_time, self.end_time)
         check_for_overlaps(self.user, self.day_of_week, self.start_time, self.end_time)
 
 
+class TsTzRange(models.Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
 class EventType(models.Model):
     name = models.CharField(max_length=100)
     duration = models.DurationField() 
@@ -96,6 +179,11 @@ class EventType(models.Model):
     end_date = models.DateField() 
     user = models.ForeignKey(User, on_delete=models.CASCADE) 
 
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='event_type_name_trgm'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -106,6 +194,147 @@ class Event(models.Model):
     description = models.TextField()
     user = models.ForeignKey(User, on_delete=models.CASCADE)  
     meet_link = models.URLField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=EventStatus.choices, default=EventStatus.CONFIRMED)
+    start_datetime = models.DateTimeField(null=True, blank=True)
+    end_datetime = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # The database itself rejects a second booking of the same time.
+            # Failed bookings and legacy rows without times hold no slot.
+            ExclusionConstraint(
+                name='event_no_double_booking',
+                expressions=[
+                    ('user', RangeOperators.EQUAL),
+                    (TsTzRange('start_datetime', 'end_datetime'), RangeOperators.OVERLAPS),
+                ],
+                condition=Q(start_datetime__isnull=False, end_datetime__isnull=False) & ~Q(status=EventStatus.FAILED),
+            ),
+        ]
+        indexes = [
+            GinIndex(OpClass(Upper('guest_email'), name='gin_trgm_ops'), name='event_guest_email_trgm'),
+        ]
 
     def __str__(self):
         return f"Event for {self.guest_email} ({self.event_type.name})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        event = super().from_db(db, field_names, values)
+        # the time the row held, which an update frees; see users.signals
+        event._stored_range = tuple(event.__dict__.get(name) for name in ('user_id', 'start_datetime', 'end_datetime'))
+        return event
+
+
+class BusyInterval(models.Model):
+    """
+    Local mirror of a busy event on the user's primary Google Calendar,
+    kept current by incremental syncs.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    google_event_id = models.CharField(max_length=1024)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'google_event_id')
+        indexes = [
+            models.Index(fields=['user', 'start', 'end']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} busy ({self.start} - {self.end})"
+
+
+
+class OpenInterval(models.Model):
+    """
+    A stretch of free time of a user on one local date: their weekly
+    availability minus booked events and mirrored Google busy time.
+    Materialized up to User.open_intervals_until and kept current as
+    slots, events and the calendar mirror change.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date', 'start']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.start} - {self.end}"
+
+
+class SlotHold(models.Model):
+    """
+    A short-lived reservation of a candidate slot while a guest completes
+    their booking. Overlapping holds of one user are rejected by the
+    database; expired holds are cleared before inserting and swept in bulk.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    guest_email = models.EmailField()
+    start_datetime = models.DateTimeField()
+    end_datetime = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+        constraints = [
+            ExclusionConstraint(
+                name='slot_hold_no_overlap',
+                expressions=[
+                    ('user', RangeOperators.EQUAL),
+                    (TsTzRange('start_datetime', 'end_datetime'), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+
+    def __str__(self):
+        return f"Hold for {self.guest_email} ({self.start_datetime} - {self.end_datetime})"
+
+
+class CalendarJob(models.Model):
+    """
+    A pending Google Calendar write for an Event, claimed by the
+    process_calendar_jobs worker with SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=CalendarJobStatus.choices, default=CalendarJobStatus.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f"Calendar job for event {self.event_id} ({self.status})"
+
+
+class GoogleQuotaBucket(models.Model):
+    """
+    Token bucket of Google Calendar API calls shared by all worker
+    processes: one row for the project and one per user. Calls take their
+    tokens with conditional UPDATEs; see users.helpers.quota_governor.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField()  # unix time the tokens were last refilled
+    rate_scale = models.FloatField(default=1.0)  # share of the refill rate, lowered on rate-limit errors
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.1f} tokens"
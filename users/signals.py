@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.models import Event, EventType, UserAvailabilitySlot, bump_schedule_version, rebuild_availability_bitmap
+
+open_interval_helper = OpenIntervalHelper()
+
+
+# An update frees what the row held before as well as taking what it holds
+# now. The models keep what they were loaded with (see their from_db), and
+# every save here moves that on to the saved values, so no extra read is
+# needed.
+
+# Saves limited to other fields, such as a booking's Meet link, change no
+# open interval.
+BOOKED_RANGE_FIELDS = {'user', 'user_id', 'start_datetime', 'end_datetime', 'status'}
+
+
+@receiver([post_save, post_delete], sender=UserAvailabilitySlot)
+def refresh_availability_bitmap(sender, instance, **kwargs):
+    rebuild_availability_bitmap(instance.user_id)
+    days = {instance.day_of_week, getattr(instance, '_stored_day', None)} - {None}
+    instance._stored_day = instance.day_of_week
+    open_interval_helper.refresh_weekdays([instance.user_id], [day - 1 for day in days])
+
+
+@receiver([post_save, post_delete], sender=Event)
+def refresh_open_intervals(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not update_fields & BOOKED_RANGE_FIELDS:
+        return
+    booked = (instance.user_id, instance.start_datetime, instance.end_datetime)
+    ranges = {booked, getattr(instance, '_stored_range', None)} - {None}
+    instance._stored_range = booked
+    open_interval_helper.refresh_ranges(ranges)
+
+
+@receiver([post_save, post_delete], sender=UserAvailabilitySlot)
+@receiver([post_save, post_delete], sender=EventType)
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_schedule_version(sender, instance, **kwargs):
+    bump_schedule_version([instance.user_id])
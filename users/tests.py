@@ -1,3 +1,1647 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
 
-# Create your tests here.
+from unittest import mock, skipUnless
+
+import httplib2
+import pytz
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+
+from SchedulEase.db_router import (
+    PIN_COOKIE_NAME, REPLICA_DB_ALIAS, ReplicaRoutingMiddleware, lag_monitor, replica_reads
+)
+from SchedulEase.metrics import RequestTimingMiddleware, metrics_view, render_metrics
+from users.admin import EventAdmin
+from users.api.authentication import JWTAuthentication
+from users.api.renderers import ORJSONRenderer
+from users.api.data_utils import EventDataUtils
+from users.api.utils import EventUtils, UserAvailabilitySlotUtils, parse_flag
+from users.benchmarks.fake_calendar import FakeCalendarServer
+from users.app_settings import DEFAULT_TIMEZONE, CalendarJobStatus, DaysOfWeek, EventStatus, GoogleCallPriority, ScheduleMode
+from users.benchmarks.results import BenchmarkRecorder, compare_to_baseline
+from users.benchmarks.startup import check_startup_budget, measure_startup
+from users.benchmarks.serialization import SerializationScenarios, legacy_availability_slots
+from users.helpers.availability_bitmap import SLOTS_PER_WEEK, AvailabilityBitmap
+from users.helpers.availability_import_helper import AvailabilityImportHelper
+from users.helpers.busy_cache import busy_interval_cache, flags_stale_busy_data
+from users.helpers.calendar_job_helper import CalendarJobHelper
+from users.helpers.calendar_sync_helper import CalendarSyncHelper
+from users.helpers.circuit_breaker import CircuitBreaker, CircuitOpenError
+from users.helpers.collective_helper import CollectiveAvailabilityHelper
+from users.helpers.event_helper import (
+    EventHelper, calendar_read_breaker, can_use_stale_busy_data, decode_events_cursor, google_event_id,
+    is_booking_conflict, is_google_outage
+)
+from users.helpers.google_libs import GOOGLE_LIBRARY_PACKAGES
+from users.helpers.jwt_helper import decode_jwt_token, generate_tokens, jwt_helper
+from users.helpers.open_interval_helper import OpenIntervalHelper
+from users.helpers.quota_governor import (
+    PROJECT_BUCKET, GoogleQuotaExceeded, google_call_priority, google_quota, rate_limit_scope, user_bucket
+)
+from users.helpers.slot_finder import find_open_slots, find_slots_in_intervals
+from users.helpers.slot_hold_helper import SlotHoldHelper
+from users.helpers.token_manager import GoogleTokenManager, token_manager
+from users.models import (
+    BusyInterval, CalendarJob, Event, EventType, GoogleQuotaBucket, SlotHold, User, UserAvailabilitySlot
+)
+
+
+class FakeRequest:
+    def __init__(self, handler, **kwargs):
+        self.handler = handler
+        self.kwargs = kwargs
+
+    def execute(self):
+        return self.handler(**self.kwargs)
+
+
+class FakeCalendarService:
+    """
+    In-memory stand-in for the parts of the Calendar v3 events resource the
+    sync uses. Every change bumps a version; sync tokens are versions, so an
+    incremental list returns exactly the events changed since the token.
+    """
+
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.version = 0
+        self.changes = {}
+        self.expired_tokens = set()
+
+    def put_event(self, event_id, start, end, **fields):
+        self.version += 1
+        self.changes[event_id] = (self.version, {
+            'id': event_id,
+            'status': 'confirmed',
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': end.isoformat()},
+            **fields,
+        })
+
+    def cancel_event(self, event_id):
+        self.version += 1
+        self.changes[event_id] = (self.version, {'id': event_id, 'status': 'cancelled'})
+
+    def events(self):
+        return self
+
+    def list(self, **kwargs):
+        return FakeRequest(self._list, **kwargs)
+
+    def _list(self, syncToken=None, pageToken=None, **kwargs):
+        if syncToken in self.expired_tokens:
+            raise HttpError(httplib2.Response({'status': 410}), b'Sync token is no longer valid')
+        since = int(syncToken) if syncToken else 0
+        items = [
+            event for version, event in sorted(self.changes.values(), key=lambda change: change[0])
+            if version > since and (syncToken or event['status'] != 'cancelled')
+        ]
+        offset = int(pageToken or 0)
+        result = {'items': items[offset:offset + self.page_size]}
+        if offset + self.page_size < len(items):
+            result['nextPageToken'] = str(offset + self.page_size)
+        else:
+            result['nextSyncToken'] = str(self.version)
+        return result
+
+
+class CalendarSyncHelperTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        self.service = FakeCalendarService()
+        self.sync_helper = CalendarSyncHelper()
+        self.start = datetime(2024, 9, 20, 10, tzinfo=timezone.utc)
+
+    def busy_ids(self):
+        return set(BusyInterval.objects.filter(user=self.user).values_list('google_event_id', flat=True))
+
+    def test_full_sync_mirrors_busy_events_across_pages(self):
+        for index in range(3):
+            self.service.put_event(f'e{index}', self.start + timedelta(hours=index),
+                                   self.start + timedelta(hours=index, minutes=30))
+        self.service.put_event('free', self.start, self.start + timedelta(hours=1), transparency='transparent')
+        self.sync_helper.sync_user(self.user, service=self.service)
+        self.assertEqual(self.busy_ids(), {'e0', 'e1', 'e2'})
+        self.assertEqual(self.user.google_sync_token, str(self.service.version))
+
+    def test_incremental_sync_applies_only_changes(self):
+        self.service.put_event('e0', self.start, self.start + timedelta(hours=1))
+        self.service.put_event('e1', self.start + timedelta(hours=2), self.start + timedelta(hours=3))
+        self.sync_helper.sync_user(self.user, service=self.service)
+        self.service.cancel_event('e0')
+        self.service.put_event('e1', self.start + timedelta(hours=4), self.start + timedelta(hours=5))
+        changed = self.sync_helper.sync_user(self.user, service=self.service)
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.busy_ids(), {'e1'})
+        self.assertEqual(BusyInterval.objects.get(google_event_id='e1').start, self.start + timedelta(hours=4))
+
+    def test_expired_sync_token_triggers_full_resync(self):
+        self.service.put_event('e0', self.start, self.start + timedelta(hours=1))
+        self.sync_helper.sync_user(self.user, service=self.service)
+        BusyInterval.objects.create(user=self.user, google_event_id='stale',
+                                    start=self.start, end=self.start + timedelta(hours=1))
+        self.service.expired_tokens.add(self.user.google_sync_token)
+        self.sync_helper.sync_user(self.user, service=self.service)
+        self.assertEqual(self.busy_ids(), {'e0'})
+
+
+@override_settings(
+    DATABASE_ROUTERS=['SchedulEase.db_router.ReplicaRouter'],
+    DATABASE_REPLICA_MAX_LAG=5,
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL=0,
+)
+class ReplicaRouterTests(TestCase):
+    """
+    The replica is a separate test database holding different users than
+    the primary, so each test checks which database its reads come from.
+    """
+    databases = {'default', REPLICA_DB_ALIAS}
+
+    def setUp(self):
+        lag_monitor.reset()
+        patcher = mock.patch.object(lag_monitor, 'measure_lag', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        User.objects.db_manager(REPLICA_DB_ALIAS).create_user(
+            email='replica@example.com', password='secret', name='Replica')
+        self.factory = RequestFactory()
+
+    @staticmethod
+    def read_emails():
+        return list(User.objects.values_list('email', flat=True))
+
+    def test_reads_go_to_primary_outside_replica_views(self):
+        self.assertEqual(self.read_emails(), ['host@example.com'])
+
+    def test_replica_reads_until_the_request_writes(self):
+        with replica_reads():
+            self.assertEqual(self.read_emails(), ['replica@example.com'])
+            EventType.objects.create(name='Call', duration=timedelta(minutes=30), start_date='2024-09-01',
+                                     end_date='2024-09-30', user=self.user)
+            self.assertEqual(self.read_emails(), ['host@example.com'])
+        self.assertTrue(EventType.objects.using('default').exists())
+        self.assertFalse(EventType.objects.using(REPLICA_DB_ALIAS).exists())
+
+    @override_settings(GOOGLE_QUOTA_ENABLED=True)
+    def test_quota_bookkeeping_does_not_pin_to_primary(self):
+        with replica_reads():
+            google_quota.acquire(self.user.id)
+            self.assertEqual(self.read_emails(), ['replica@example.com'])
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(lag_monitor, 'measure_lag', return_value=30.0), replica_reads():
+            self.assertEqual(self.read_emails(), ['host@example.com'])
+        with mock.patch.object(lag_monitor, 'measure_lag', return_value=None), replica_reads():
+            self.assertEqual(self.read_emails(), ['host@example.com'])
+        with mock.patch.object(lag_monitor, 'measure_lag', return_value=1.0), replica_reads():
+            self.assertEqual(self.read_emails(), ['replica@example.com'])
+
+    def test_writing_request_pins_the_client_to_primary(self):
+        def admin_view(request):
+            return HttpResponse(','.join(self.read_emails()))
+
+        def writing_view(request):
+            User.objects.filter(id=self.user.id).update(name='Renamed')
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(admin_view)(self.factory.get('/admin/'))
+        self.assertEqual(response.content.decode(), 'replica@example.com')
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+        response = ReplicaRoutingMiddleware(writing_view)(self.factory.post('/api/users/create_event/'))
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+        request = self.factory.get('/admin/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        response = ReplicaRoutingMiddleware(admin_view)(request)
+        self.assertEqual(response.content.decode(), 'host@example.com')
+
+
+class RequestTimingTests(TestCase):
+
+    def test_request_time_is_split_into_phases(self):
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                        google_access_token='metrics-token')
+        start = datetime(2024, 9, 20, 10, tzinfo=timezone.utc)
+
+        def view(request):
+            request.resolver_match = mock.Mock(view_name='metrics_probe')
+            User.objects.get(id=user.id)
+            EventHelper().query_free_busy(user, ['primary'], start, start + timedelta(hours=1))
+            return HttpResponse()
+
+        # the quota governor's own queries would count as well
+        with FakeCalendarServer(latency=0.01) as server, override_settings(
+                GOOGLE_API_ROOT_URL=server.root_url, GOOGLE_QUOTA_ENABLED=False):
+            RequestTimingMiddleware(view)(RequestFactory().get('/probe/'))
+        exposition = render_metrics()
+        self.assertIn('schedulease_requests_total{endpoint="metrics_probe",method="GET",status="200"} 1', exposition)
+        self.assertIn('schedulease_db_queries_total{endpoint="metrics_probe"} 1', exposition)
+        self.assertIn('schedulease_google_calls_total{endpoint="metrics_probe"} 1', exposition)
+        self.assertIn('schedulease_request_phase_seconds_bucket{endpoint="metrics_probe",phase="google",le="0.005"} 0',
+                      exposition)
+        self.assertIn('schedulease_request_phase_seconds_count{endpoint="metrics_probe",phase="render"} 1', exposition)
+
+    def test_metrics_require_the_token_outside_debug(self):
+        factory = RequestFactory()
+        with override_settings(METRICS_TOKEN=None, DEBUG=False):
+            self.assertEqual(metrics_view(factory.get('/metrics')).status_code, 403)
+        with override_settings(METRICS_TOKEN=None, DEBUG=True):
+            self.assertEqual(metrics_view(factory.get('/metrics')).status_code, 200)
+        with override_settings(METRICS_TOKEN='scrape', DEBUG=True):
+            self.assertEqual(metrics_view(factory.get('/metrics')).status_code, 403)
+            self.assertEqual(metrics_view(factory.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')).status_code, 403)
+            self.assertEqual(metrics_view(factory.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')).status_code, 200)
+
+
+class GoogleEventLinksTests(TestCase):
+
+    def test_event_links_tolerate_a_pending_conference(self):
+        pending = {'id': 'abc', 'htmlLink': 'https://calendar.google.com/event?eid=abc',
+                   'conferenceData': {'createRequest': {'status': {'statusCode': 'pending'}}}}
+        self.assertEqual(EventHelper._get_event_links(pending)['google_meet_link'], None)
+        pending['hangoutLink'] = 'https://meet.google.com/abc'
+        self.assertEqual(EventHelper._get_event_links(pending)['google_meet_link'], 'https://meet.google.com/abc')
+
+
+class BenchmarkTests(TestCase):
+
+    def test_fake_calendar_server_serves_the_calendar_client(self):
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                        google_access_token='bench-token')
+        start = datetime(2024, 9, 20, 10, tzinfo=timezone.utc)
+        with FakeCalendarServer() as server, override_settings(GOOGLE_API_ROOT_URL=server.root_url):
+            server.add_event('bench-token', start, start + timedelta(hours=1))
+            busy, failed = EventHelper().query_free_busy(user, ['primary'], start - timedelta(hours=1),
+                                                         start + timedelta(hours=2))
+        self.assertEqual(failed, set())
+        self.assertEqual(busy['primary'], [(start, start + timedelta(hours=1))])
+        self.assertEqual(server.request_count, 1)
+
+    def test_compare_to_baseline_flags_slower_percentiles(self):
+        recorder = BenchmarkRecorder()
+        with recorder.scenario('slot_lookup'):
+            for milliseconds in range(1, 101):
+                recorder.record('slot_lookup', milliseconds / 1000)
+        summary = recorder.summary()
+        self.assertEqual(summary['slot_lookup']['p50_ms'], 50.5)
+        baseline = {'scenarios': {'slot_lookup': dict(summary['slot_lookup'], p95_ms=50.0)}}
+        regressions = compare_to_baseline(summary, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('slot_lookup: p95_ms'))
+        self.assertEqual(compare_to_baseline(summary, {'scenarios': {'slot_lookup': summary['slot_lookup']}}, 0.2), [])
+
+
+class LargeTableAdminTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='admin@example.com', password='secret', name='Admin')
+        event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                              start_date=datetime(2024, 9, 1).date(),
+                                              end_date=datetime(2024, 9, 30).date())
+        self.event_ids = [
+            Event.objects.create(event_type=event_type, guest_email=f'guest{index}@example.com',
+                                 description='', user=self.user).id
+            for index in range(5)
+        ]
+        self.model_admin = EventAdmin(Event, site)
+        self.model_admin.list_per_page = 2
+
+    def changelist(self, **params):
+        request = RequestFactory().get('/admin/users/event/', params)
+        request.user = self.user
+        return self.model_admin.get_changelist_instance(request)
+
+    def test_pages_by_primary_key_cursor(self):
+        newest_first = self.event_ids[::-1]
+        changelist = self.changelist()
+        self.assertTrue(changelist.keyset_pagination)
+        self.assertEqual([event.id for event in changelist.result_list], newest_first[:2])
+        self.assertFalse(changelist.previous_page_url)
+        self.assertEqual(changelist.next_page_url, f'?after={newest_first[1]}')
+
+        changelist = self.changelist(after=newest_first[1])
+        self.assertEqual([event.id for event in changelist.result_list], newest_first[2:4])
+        self.assertEqual(changelist.previous_page_url, f'?before={newest_first[2]}')
+
+        changelist = self.changelist(before=newest_first[2])
+        self.assertEqual([event.id for event in changelist.result_list], newest_first[:2])
+        self.assertFalse(changelist.previous_page_url)
+
+    def test_joins_only_listed_foreign_keys(self):
+        self.assertEqual(self.model_admin.get_list_select_related(None), ['event_type', 'user'])
+
+
+class JWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        self.access_token, self.refresh_token = generate_tokens(self.user)
+
+    def authenticate(self, token):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return JWTAuthentication().authenticate(request)
+
+    def test_access_token_authenticates_without_queries(self):
+        with self.assertNumQueries(0):
+            user, claims = self.authenticate(self.access_token)
+        self.assertEqual((user.id, user.email, user.name), (self.user.id, 'host@example.com', 'Host'))
+        self.assertFalse(user._state.adding)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(self.refresh_token)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(self.access_token[:-2] + 'xx')
+
+    def test_refresh_token_dies_with_the_password(self):
+        payload = decode_jwt_token(self.refresh_token)
+        self.assertEqual(jwt_helper.get_user_for_refresh(payload), self.user)
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertIsNone(jwt_helper.get_user_for_refresh(payload))
+
+
+@override_settings(GOOGLE_QUOTA_USER_RATE=1, GOOGLE_QUOTA_USER_BURST=2)
+class GoogleQuotaGovernorTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+
+    def test_lower_priorities_are_shed_before_the_bucket_runs_dry(self):
+        with override_settings(GOOGLE_QUOTA_MAX_WAIT={'high': 0, 'normal': 0, 'low': 0}):
+            with google_call_priority(GoogleCallPriority.LOW):
+                google_quota.acquire(self.user.id)
+                with self.assertRaises(GoogleQuotaExceeded):
+                    google_quota.acquire(self.user.id)
+            with google_call_priority(GoogleCallPriority.HIGH):
+                google_quota.acquire(self.user.id)
+                with self.assertRaises(GoogleQuotaExceeded):
+                    google_quota.acquire(self.user.id)
+        self.assertLess(GoogleQuotaBucket.objects.get(key=user_bucket(self.user.id)).tokens, 1)
+        self.assertGreater(GoogleQuotaBucket.objects.get(key=PROJECT_BUCKET).tokens, 100)
+
+    @override_settings(GOOGLE_QUOTA_USER_RATE=1000)
+    @mock.patch('users.helpers.quota_governor.time.sleep')
+    def test_rate_limit_errors_back_off_and_slow_the_bucket(self, sleep):
+        rate_limited = httplib2.Response({'status': 403, 'retry-after': '2'})
+        content = b'{"error": {"errors": [{"reason": "userRateLimitExceeded"}]}}'
+        responses = iter([(rate_limited, content), (httplib2.Response({'status': 200}), b'{}')])
+        response, _ = google_quota.call(self.user.id, lambda: next(responses))
+        self.assertEqual(response.status, 200)
+        self.assertGreaterEqual(sleep.call_args_list[0].args[0], 2)
+        bucket = GoogleQuotaBucket.objects.get(key=user_bucket(self.user.id))
+        self.assertLess(bucket.rate_scale, 1)
+        self.assertEqual(GoogleQuotaBucket.objects.get(key=PROJECT_BUCKET).rate_scale, 1)
+        self.assertIsNone(rate_limit_scope(403, b'{"error": {"errors": [{"reason": "forbidden"}]}}'))
+
+    @override_settings(GOOGLE_QUOTA_PROJECT_RATE=0.001)
+    def test_tokens_are_taken_with_one_update_per_bucket(self):
+        google_quota.take(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(google_quota.take(self.user.id), 0)
+        statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(all(statement.startswith('UPDATE') for statement in statements))
+        self.assertAlmostEqual(GoogleQuotaBucket.objects.get(key=PROJECT_BUCKET).tokens,
+                               settings.GOOGLE_QUOTA_PROJECT_BURST - 2, places=2)
+
+    @override_settings(GOOGLE_QUOTA_USER_RATE=1, GOOGLE_QUOTA_USER_BURST=2)
+    def test_a_short_bucket_takes_nothing_from_the_other(self):
+        self.assertEqual(google_quota.take(self.user.id, cost=2), 0)
+        project_tokens = GoogleQuotaBucket.objects.get(key=PROJECT_BUCKET).tokens
+        wait = google_quota.take(self.user.id)
+        self.assertGreater(wait, 0.5)
+        self.assertEqual(GoogleQuotaBucket.objects.get(key=PROJECT_BUCKET).tokens, project_tokens)
+
+    @override_settings(DATABASE_ROUTERS=['SchedulEase.db_router.ReplicaRouter'])
+    @mock.patch.object(lag_monitor, 'measure_lag', return_value=0.0)
+    def test_quota_writes_do_not_pin_reads_to_the_primary(self, measure_lag):
+        with replica_reads() as routing:
+            google_quota.take(self.user.id)
+            self.assertFalse(routing.pinned)
+        with override_settings(DATABASE_REPLICA_UNPINNED_MODELS=[]), replica_reads() as routing:
+            google_quota.take(self.user.id)
+            self.assertTrue(routing.pinned)
+
+
+class CalendarCircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        calendar_read_breaker.reset()
+        self.addCleanup(calendar_read_breaker.reset)
+        # user ids repeat across tests, so drop credentials cached for them
+        token_manager._credentials.clear()
+
+    @mock.patch('users.helpers.circuit_breaker.time.monotonic')
+    def test_breaker_opens_on_error_rate_and_closes_after_a_probe(self, monotonic):
+        monotonic.return_value = 100.0
+        breaker = CircuitBreaker('test', error_threshold=0.5, min_calls=4, window=10, open_seconds=30)
+        for failed in (False, True, False, True):
+            breaker.allow()
+            breaker.record_failure() if failed else breaker.record_success()
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        monotonic.return_value = 130.0
+        breaker.allow()
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()  # only one probe at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    @mock.patch('users.helpers.circuit_breaker.time.monotonic')
+    def test_cancelled_probe_is_released(self, monotonic):
+        monotonic.return_value = 100.0
+        breaker = CircuitBreaker('test', error_threshold=0.5, min_calls=1, window=10, open_seconds=30)
+        breaker.allow()
+        breaker.record_failure()
+        monotonic.return_value = 130.0
+        with self.assertRaises(asyncio.CancelledError), breaker.guard():
+            raise asyncio.CancelledError
+        self.assertEqual(breaker.state, 'half_open')
+        with breaker.guard():
+            pass
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_only_unreachable_or_failing_google_counts_as_an_outage(self):
+        self.assertTrue(is_google_outage(TimeoutError('timed out')))
+        self.assertTrue(is_google_outage(HttpError(httplib2.Response({'status': 503}), b'')))
+        self.assertTrue(is_google_outage(ConnectionResetError('reset by peer')))
+        self.assertTrue(is_google_outage(HttpError(httplib2.Response({'status': 500}), b'')))
+        self.assertFalse(is_google_outage(HttpError(httplib2.Response({'status': 429}), b'')))
+        self.assertFalse(is_google_outage(HttpError(httplib2.Response({'status': 404}), b'')))
+        self.assertFalse(is_google_outage(RefreshError('invalid_grant: Token has been expired or revoked.')))
+        self.assertFalse(is_google_outage(KeyError('entryPoints')))
+
+    def test_rate_limit_errors_do_not_open_the_circuit(self):
+        for status, state in ((429, 'closed'), (502, 'open')):
+            breaker = CircuitBreaker('test', error_threshold=0.5, min_calls=3, window=10, open_seconds=30)
+            for _ in range(3):
+                with self.assertRaises(HttpError), breaker.guard(is_google_outage):
+                    raise HttpError(httplib2.Response({'status': status}), b'')
+            self.assertEqual(breaker.state, state)
+        # cached busy times still answer once the retries gave up
+        self.assertTrue(can_use_stale_busy_data(HttpError(httplib2.Response({'status': 429}), b'')))
+
+    def test_outage_is_answered_from_cached_busy_times(self):
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                        google_access_token='outage-token')
+        start = datetime(2024, 9, 20, 10, tzinfo=timezone.utc)
+        helper = EventHelper()
+
+        @flags_stale_busy_data
+        def read_busy_times(window_start, window_end):
+            return {'busy': helper.get_busy_intervals(user, window_start, window_end)}, 200
+
+        with FakeCalendarServer() as server, override_settings(GOOGLE_API_ROOT_URL=server.root_url):
+            server.add_event('outage-token', start, start + timedelta(hours=1))
+            data, _ = read_busy_times(start, start + timedelta(hours=2))
+            self.assertEqual(data, {'busy': [(start, start + timedelta(hours=1))]})
+            server.error_rate = 1.0
+            data, _ = read_busy_times(start - timedelta(hours=2), start + timedelta(minutes=30))
+            self.assertTrue(data['busy_data_stale'])
+            self.assertEqual(data['busy'], [(start, start + timedelta(hours=1))])
+            with self.assertRaises(HttpError):
+                read_busy_times(start + timedelta(days=1), start + timedelta(days=1, hours=1))
+            for _ in range(settings.GOOGLE_CIRCUIT_MIN_CALLS):
+                with contextlib.suppress(HttpError, CircuitOpenError):
+                    helper.query_free_busy(user, ['primary'], start, start + timedelta(hours=1))
+            requests_made = server.request_count
+            data, _ = read_busy_times(start, start + timedelta(hours=1))
+        self.assertEqual(server.request_count, requests_made)
+        self.assertTrue(data['busy_data_stale'])
+
+
+class SerializationTests(TestCase):
+
+    def test_availability_listing_matches_the_legacy_json(self):
+        user_id = SerializationScenarios(BenchmarkRecorder()).setup_schedule(slot_minutes=240)
+        with self.assertNumQueries(1):
+            data, status_code = UserAvailabilitySlotUtils().get_availability_slots(user_id=[str(user_id)])
+        self.assertEqual(status_code, 200)
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)),
+                         json.loads(JSONRenderer().render(legacy_availability_slots(user_id)[0])))
+        self.assertEqual(data['data'][-1]['end_time'].isoformat(), '23:59:00')
+        _, status_code = UserAvailabilitySlotUtils().get_availability_slots(user_id=[str(user_id + 1)])
+        self.assertEqual(status_code, 404)
+
+    def test_renderer_encodes_like_drf(self):
+        data = {'start': datetime(2024, 9, 20, 10, tzinfo=timezone.utc), 'errors': {0: ['Invalid']},
+                'price': Decimal('12.50')}
+        self.assertEqual(ORJSONRenderer().render(data),
+                         b'{"start":"2024-09-20T10:00:00Z","errors":{"0":["Invalid"]},"price":12.5}')
+
+
+class WorkerStartupTests(TestCase):
+
+    def test_worker_starts_within_budget_without_heavy_libraries(self):
+        startup = measure_startup()
+        self.assertEqual(check_startup_budget(startup), [])
+        packages = {name.split('.')[0] for name in startup['modules']}
+        self.assertEqual(packages & {*GOOGLE_LIBRARY_PACKAGES, 'numpy'}, set())
+
+    def test_startup_over_budget_is_reported(self):
+        startup = {'import_ms': 2000.0, 'rss_kb': 100 * 1024}
+        with override_settings(STARTUP_IMPORT_BUDGET_MS=1500, STARTUP_RSS_BUDGET_MB=50):
+            self.assertEqual(check_startup_budget(startup), [
+                "imports took 2000 ms, budget 1500 ms", "peak RSS was 100 MB, budget 50 MB"])
+
+    def test_preload_imports_google_libraries_at_startup(self):
+        startup = measure_startup({'GOOGLE_PRELOAD': 'true'})
+        self.assertIn('googleapiclient.discovery', startup['modules'])
+        self.assertIn('users.helpers.google_client', startup['modules'])
+
+
+@override_settings(GOOGLE_QUOTA_ENABLED=False)
+class CalendarJobTests(TestCase):
+
+    def setUp(self):
+        token_manager._credentials.clear()
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                             google_access_token='jobs-token')
+        self.event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                                   start_date=datetime(2030, 1, 1).date(),
+                                                   end_date=datetime(2030, 12, 31).date())
+        self.helper = CalendarJobHelper()
+        self.server = FakeCalendarServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GOOGLE_API_ROOT_URL=self.server.root_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def enqueue(self):
+        event = Event.objects.create(
+            event_type=self.event_type, guest_email='guest@example.com', description='', user=self.user,
+            start_datetime=datetime(2030, 1, 7, 4, 30, tzinfo=timezone.utc),
+            end_datetime=datetime(2030, 1, 7, 5, tzinfo=timezone.utc), status=EventStatus.PENDING)
+        return event, self.helper.enqueue_event(event, '2030-01-07T10:00:00Z', '2030-01-07T10:30:00Z')
+
+    def test_claimed_job_creates_the_event_once(self):
+        event, job = self.enqueue()
+        CalendarJob.objects.filter(id=job.id).update(run_at=datetime.now(timezone.utc) + timedelta(minutes=1))
+        self.assertEqual(self.helper.claim_jobs(10), [])
+        CalendarJob.objects.filter(id=job.id).update(run_at=datetime.now(timezone.utc))
+        [claimed] = self.helper.claim_jobs(10)
+        self.assertEqual((claimed.id, claimed.attempts), (job.id, 1))
+        self.assertEqual(self.helper.claim_jobs(10), [])
+        self.assertTrue(self.helper.run_job(claimed))
+        event.refresh_from_db()
+        self.assertEqual(event.status, EventStatus.CONFIRMED)
+        [google_event] = self.server.get_events('jobs-token')
+        self.assertEqual(google_event['id'], google_event_id(event.id))
+        self.assertEqual(event.meet_link, google_event['hangoutLink'])
+
+    def test_failed_job_is_retried_later(self):
+        event, job = self.enqueue()
+        self.server.error_rate = 1.0
+        self.assertFalse(self.helper.run_job(self.helper.claim_jobs(10)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, CalendarJobStatus.QUEUED)
+        self.assertGreater(job.run_at, datetime.now(timezone.utc))
+        self.server.error_rate = 0.0
+        CalendarJob.objects.filter(id=job.id).update(run_at=datetime.now(timezone.utc))
+        [claimed] = self.helper.claim_jobs(10)
+        self.assertEqual(claimed.attempts, 2)
+        self.assertTrue(self.helper.run_job(claimed))
+        self.assertEqual(len(self.server.get_events('jobs-token')), 1)
+
+    def test_reclaimed_job_does_not_insert_twice(self):
+        event, job = self.enqueue()
+        # the first worker inserted the event and died before recording it
+        self.assertTrue(self.helper.run_job(self.helper.claim_jobs(10)[0]))
+        CalendarJob.objects.filter(id=job.id).update(
+            status=CalendarJobStatus.RUNNING,
+            locked_at=datetime.now(timezone.utc) - settings.CALENDAR_JOB_LOCK_TIMEOUT - timedelta(seconds=1))
+        Event.objects.filter(id=event.id).update(status=EventStatus.PENDING, meet_link=None)
+        [claimed] = self.helper.claim_jobs(10)
+        self.assertTrue(self.helper.run_job(claimed))
+        event.refresh_from_db()
+        self.assertEqual(event.status, EventStatus.CONFIRMED)
+        self.assertEqual(len(self.server.get_events('jobs-token')), 1)
+        self.assertEqual(event.meet_link, self.server.get_events('jobs-token')[0]['hangoutLink'])
+
+    def test_abandoned_sync_bookings_are_settled(self):
+        inserted, lost, fresh = (Event.objects.create(
+            event_type=self.event_type, guest_email='guest@example.com', description='', user=self.user,
+            start_datetime=datetime(2030, 1, 7, hour, 30, tzinfo=timezone.utc),
+            end_datetime=datetime(2030, 1, 7, hour + 1, tzinfo=timezone.utc), status=EventStatus.PENDING)
+            for hour in (4, 5, 6))
+        # the request booking ``inserted`` died after Google created its event
+        self.helper.event_helper.create_google_event(
+            self.user, self.event_type, 'guest@example.com', '', '2030-01-07T10:00:00Z', '2030-01-07T10:30:00Z',
+            event_id=google_event_id(inserted.id))
+        Event.objects.filter(id__in=[inserted.id, lost.id]).update(
+            created_at=datetime.now(timezone.utc) - settings.PENDING_EVENT_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(self.helper.settle_abandoned_events(), (1, 1))
+        inserted.refresh_from_db()
+        self.assertEqual(inserted.status, EventStatus.CONFIRMED)
+        self.assertEqual(inserted.meet_link, self.server.get_events('jobs-token')[0]['hangoutLink'])
+        self.assertFalse(Event.objects.filter(id=lost.id).exists())
+        self.assertEqual(Event.objects.get(id=fresh.id).status, EventStatus.PENDING)
+
+    async def test_async_view_books_through_google_once(self):
+        booking = {'event_type_id': self.event_type.id, 'guest_email': 'guest@example.com', 'user_id': self.user.id,
+                   'description': 'Intro call',
+                   'start_datetime': '2030-01-07T10:00:00Z', 'end_datetime': '2030-01-07T10:30:00Z'}
+        with mock.patch.object(EventHelper, 'acheck_user_availability', return_value=True):
+            response, status_code = await EventUtils().acreate_event(**booking, async_booking='false')
+        self.assertEqual(status_code, 200)
+        event = await Event.objects.aget()
+        self.assertEqual(event.status, EventStatus.CONFIRMED)
+        [google_event] = self.server.get_events('jobs-token')
+        self.assertEqual(google_event['id'], google_event_id(event.id))
+        self.assertEqual(response['google_meet_link'], google_event['hangoutLink'])
+        # a repeated insert finds the event instead of creating a second one
+        links, created = await EventHelper().acreate_google_event(
+            self.user, self.event_type, 'guest@example.com', 'Intro call', booking['start_datetime'],
+            booking['end_datetime'], event_id=google_event_id(event.id))
+        self.assertTrue(created)
+        self.assertEqual(links['google_meet_link'], google_event['hangoutLink'])
+        self.assertEqual(len(self.server.get_events('jobs-token')), 1)
+
+    def test_async_booking_flag_is_parsed(self):
+        booking = {'event_type_id': self.event_type.id, 'guest_email': 'guest@example.com', 'user_id': self.user.id,
+                   'description': 'Intro call',
+                   'start_datetime': '2030-01-07T10:00:00Z', 'end_datetime': '2030-01-07T10:30:00Z'}
+        with mock.patch.object(EventHelper, 'check_user_availability', return_value=True):
+            _, status_code = EventUtils().create_event(**booking, async_booking='false')
+            self.assertEqual(status_code, 200)
+            self.assertFalse(CalendarJob.objects.exists())
+            _, status_code = EventUtils().create_event(
+                **dict(booking, start_datetime='2030-01-07T11:00:00Z', end_datetime='2030-01-07T11:30:00Z'),
+                async_booking='true')
+        self.assertEqual(status_code, 202)
+        self.assertEqual(CalendarJob.objects.count(), 1)
+
+
+@override_settings(GOOGLE_QUOTA_ENABLED=False)
+class AsyncEventViewTests(TestCase):
+
+    def setUp(self):
+        token_manager._credentials.clear()
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                             google_access_token='async-token')
+        self.event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                                   start_date=datetime(2030, 1, 1).date(),
+                                                   end_date=datetime(2030, 12, 31).date())
+        self.booking = {'event_type_id': self.event_type.id, 'guest_email': 'guest@example.com',
+                        'user_id': self.user.id, 'description': 'Intro call', 'async_booking': False,
+                        'start_datetime': '2030-01-07T10:00:00Z', 'end_datetime': '2030-01-07T10:30:00Z'}
+        self.server = FakeCalendarServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GOOGLE_API_ROOT_URL=self.server.root_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    async def book(self, available=True):
+        with mock.patch.object(EventHelper, 'acheck_user_availability', return_value=available):
+            return await self.async_client.post('/api/users/async/create_event/', self.booking,
+                                                content_type='application/json')
+
+    def add_upcoming_events(self, count):
+        start = datetime.now(timezone.utc) + timedelta(days=1)
+        for hour in range(count):
+            begins = start + timedelta(hours=hour)
+            self.server.add_event('async-token', begins, begins + timedelta(minutes=30), summary=f'Meeting {hour}')
+
+    async def test_create_event_confirms_the_booking(self):
+        response = await self.book()
+        self.assertEqual(response.status_code, 200)
+        event = await Event.objects.aget()
+        self.assertEqual(event.status, EventStatus.CONFIRMED)
+        [google_event] = self.server.get_events('async-token')
+        self.assertEqual(response.json()['google_meet_link'], google_event['hangoutLink'])
+
+    async def test_create_event_reports_a_busy_host(self):
+        response = await self.book(available=False)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "User is not available at this time"})
+        self.assertFalse(await Event.objects.aexists())
+        self.assertEqual(self.server.request_count, 0)
+
+    async def test_create_event_reports_a_double_booking(self):
+        conflict = DoubleBookingConstraintTests.integrity_error('23P01')
+        with mock.patch.object(EventDataUtils, 'create_event', side_effect=conflict):
+            response = await self.book()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "User is not available at this time"})
+        self.assertFalse(await Event.objects.aexists())
+        self.assertEqual(self.server.get_events('async-token'), [])
+
+    async def test_create_event_requires_a_json_object(self):
+        response = await self.async_client.post('/api/users/async/create_event/', [self.booking],
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_user_events_are_paged_with_a_cursor(self):
+        self.add_upcoming_events(3)
+        url = f'/api/users/async/get_user_events/?user_id={self.user.id}&page_size=2'
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([event['summary'] for event in data['data']], ['Meeting 0', 'Meeting 1'])
+        response = await self.async_client.get(f"{url}&cursor={data['next_cursor']}")
+        data = response.json()
+        self.assertEqual([event['summary'] for event in data['data']], ['Meeting 2'])
+        self.assertIsNone(data['next_cursor'])
+        response = await self.async_client.get(f'{url}&cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_user_events_stream_as_ndjson(self):
+        self.add_upcoming_events(3)
+        response = await self.async_client.get(
+            f'/api/users/async/get_user_events/?user_id={self.user.id}&page_size=2&stream=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([json.loads(line)['summary'] for line in body.splitlines()],
+                         ['Meeting 0', 'Meeting 1', 'Meeting 2'])
+        self.assertEqual(self.server.request_count, 2)
+        response = await self.async_client.get('/api/users/async/get_user_events/?user_id=0&stream=true')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(GOOGLE_QUOTA_ENABLED=False)
+class BulkBookingTests(TestCase):
+
+    def setUp(self):
+        token_manager._credentials.clear()
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                             google_access_token='bulk-token')
+        self.event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                                   start_date=datetime(2030, 1, 1).date(),
+                                                   end_date=datetime(2030, 12, 31).date())
+        self.server = FakeCalendarServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GOOGLE_API_ROOT_URL=self.server.root_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def bookings(self, count):
+        return [
+            {'event_type_id': self.event_type.id, 'guest_email': f'guest{index}@example.com',
+             'start_datetime': f'2030-01-07T{10 + index}:00:00Z', 'end_datetime': f'2030-01-07T{10 + index}:30:00Z'}
+            for index in range(count)
+        ]
+
+    def book(self, bookings, async_booking=False):
+        with mock.patch.object(EventHelper, 'check_bulk_availability',
+                               side_effect=lambda user, ranges: [None] * len(ranges)):
+            return EventUtils().bulk_create_events(user_id=self.user.id, events=bookings,
+                                                   async_booking=async_booking)
+
+    @mock.patch('users.helpers.event_helper.GOOGLE_BATCH_SIZE', 2)
+    def test_inserts_are_split_into_batches(self):
+        data, status_code = self.book(self.bookings(5))
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['message'], "5 of 5 events booked")
+        self.assertEqual(self.server.request_count, 3)
+        events = Event.objects.order_by('start_datetime')
+        self.assertEqual({event.status for event in events}, {EventStatus.CONFIRMED})
+        google_events = {event['id']: event for event in self.server.get_events('bulk-token')}
+        self.assertEqual(set(google_events), {google_event_id(event.id) for event in events})
+        for result, event in zip(data['data'], events):
+            self.assertEqual(result['google_meet_link'], google_events[google_event_id(event.id)]['hangoutLink'])
+
+    def test_invalid_rows_are_reported_on_their_own(self):
+        unknown_type = dict(self.bookings(1)[0], event_type_id=self.event_type.id + 1)
+        bookings = self.bookings(2) + [{'event_type_id': self.event_type.id}, unknown_type]
+        data, _ = self.book(bookings)
+        self.assertEqual([result['code'] for result in data['data']], [0, 0, 1, 1])
+        self.assertEqual(data['data'][3]['error'], "EventType not found")
+        self.assertEqual(Event.objects.count(), 2)
+
+    @mock.patch('users.helpers.event_helper.GOOGLE_BATCH_SIZE', 2)
+    def test_existing_events_are_read_back_on_conflict(self):
+        bookings = [
+            dict(event_type=self.event_type, description='', event_id=f'bulk{index}', **{
+                key: value for key, value in booking.items() if key != 'event_type_id'})
+            for index, booking in enumerate(self.bookings(3))
+        ]
+        helper = EventHelper()
+        first = helper.create_google_events(self.user, bookings)
+        self.server.request_count = 0
+        again = helper.create_google_events(self.user, bookings)
+        self.assertEqual(again, first)
+        self.assertTrue(all(created for _, created in again))
+        # two batches of inserts answered with 409, then two batches of reads
+        self.assertEqual(self.server.request_count, 4)
+        self.assertEqual(len(self.server.get_events('bulk-token')), 3)
+
+    def test_async_booking_queues_a_job_per_event(self):
+        data, _ = self.book(self.bookings(3), async_booking=True)
+        self.assertEqual([result['code'] for result in data['data']], [0, 0, 0])
+        self.assertEqual(set(CalendarJob.objects.values_list('event_id', flat=True)),
+                         set(Event.objects.values_list('id', flat=True)))
+        self.assertEqual(self.server.request_count, 0)
+
+    def test_events_are_not_left_without_their_jobs(self):
+        with mock.patch.object(CalendarJobHelper, 'enqueue_events', side_effect=RuntimeError('queue down')):
+            with self.assertRaises(RuntimeError):
+                self.book(self.bookings(3), async_booking=True)
+        self.assertFalse(Event.objects.exists())
+
+
+class OpenIntervalUpkeepTests(TestCase):
+    """
+    Changes to one booking or slot recompute only the dates they touch,
+    never the user's whole materialized window.
+    """
+
+    def setUp(self):
+        self.zone = pytz.timezone(DEFAULT_TIMEZONE)
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                             google_sync_token='sync-token')
+        self.event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                                   start_date='2024-09-01', end_date='2024-09-30')
+        self.slot = UserAvailabilitySlot.objects.create(user=self.user, day_of_week=DaysOfWeek.MONDAY,
+                                                        start_time=time(9), end_time=time(17))
+        self.helper = OpenIntervalHelper()
+        self.helper.extend_horizon([self.user.id])
+        today = datetime.now(self.zone).date()
+        self.monday = today + timedelta(days=7 - today.weekday())
+        patcher = mock.patch.object(OpenIntervalHelper, 'refresh_users', side_effect=AssertionError)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def at(self, day, hour):
+        return self.zone.localize(datetime.combine(day, time(hour)))
+
+    def open_hours(self, day):
+        return [(start.astimezone(self.zone).hour, end.astimezone(self.zone).hour)
+                for start, end in self.helper.get_open_intervals(self.user.id, self.at(day, 0), self.at(day, 23))]
+
+    def test_booking_moves_and_deletes_refresh_their_dates(self):
+        next_monday = self.monday + timedelta(days=7)
+        event = Event.objects.create(event_type=self.event_type, guest_email='guest@example.com', description='',
+                                     user=self.user, start_datetime=self.at(self.monday, 10),
+                                     end_datetime=self.at(self.monday, 11), status=EventStatus.PENDING)
+        self.assertEqual(self.open_hours(self.monday), [(9, 10), (11, 17)])
+        event.start_datetime = self.at(next_monday, 12)
+        event.end_datetime = self.at(next_monday, 13)
+        event.save()
+        self.assertEqual(self.open_hours(self.monday), [(9, 17)])
+        self.assertEqual(self.open_hours(next_monday), [(9, 12), (13, 17)])
+        event.delete()
+        self.assertEqual(self.open_hours(next_monday), [(9, 17)])
+
+    def test_moved_slot_refreshes_both_weekdays(self):
+        self.slot.day_of_week = DaysOfWeek.TUESDAY
+        self.slot.save()
+        self.assertEqual(self.open_hours(self.monday), [])
+        self.assertEqual(self.open_hours(self.monday + timedelta(days=1)), [(9, 17)])
+
+    def test_loaded_slot_is_moved_without_reading_it_first(self):
+        slot = UserAvailabilitySlot.objects.get(id=self.slot.id)
+        slot.day_of_week = DaysOfWeek.TUESDAY
+        with CaptureQueriesContext(connection) as queries:
+            slot.save()
+        self.assertTrue(queries.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(self.open_hours(self.monday), [])
+        self.assertEqual(self.open_hours(self.monday + timedelta(days=1)), [(9, 17)])
+
+    def test_loaded_booking_is_moved_without_reading_it_first(self):
+        Event.objects.create(event_type=self.event_type, guest_email='guest@example.com', description='',
+                             user=self.user, start_datetime=self.at(self.monday, 10),
+                             end_datetime=self.at(self.monday, 11), status=EventStatus.PENDING)
+        event = Event.objects.get()
+        event.start_datetime = self.at(self.monday, 14)
+        event.end_datetime = self.at(self.monday, 15)
+        with CaptureQueriesContext(connection) as queries:
+            event.save()
+        self.assertTrue(queries.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(self.open_hours(self.monday), [(9, 14), (15, 17)])
+
+    def test_saving_other_fields_refreshes_nothing(self):
+        event = Event.objects.create(event_type=self.event_type, guest_email='guest@example.com', description='',
+                                     user=self.user, start_datetime=self.at(self.monday, 10),
+                                     end_datetime=self.at(self.monday, 11), status=EventStatus.PENDING)
+        event.meet_link = 'https://meet.google.com/abc'
+        with mock.patch.object(OpenIntervalHelper, 'refresh_ranges') as refresh_ranges:
+            event.save(update_fields=['meet_link'])
+            refresh_ranges.assert_not_called()
+            event.status = EventStatus.CONFIRMED
+            event.save(update_fields=['meet_link', 'status'])
+        refresh_ranges.assert_called_once()
+
+
+@override_settings(GOOGLE_QUOTA_ENABLED=False)
+class CollectiveBusyIntervalTests(TestCase):
+
+    def setUp(self):
+        token_manager._credentials.clear()
+        self.server = FakeCalendarServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GOOGLE_API_ROOT_URL=self.server.root_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_hosts(self, count, start):
+        hosts = []
+        for index in range(count):
+            host = User.objects.create_user(email=f'host{index}@example.com', password='secret', name='Host',
+                                            google_access_token=f'host{index}-token')
+            self.server.add_event(host.google_access_token, start + timedelta(hours=index),
+                                  start + timedelta(hours=index, minutes=30))
+            hosts.append(host)
+        return hosts
+
+    def test_each_host_is_queried_with_their_own_credentials(self):
+        start = datetime(2031, 3, 3, 9, tzinfo=timezone.utc)
+        hosts = self.create_hosts(2, start)
+        busy = EventHelper().get_busy_intervals_for_users(hosts, start, start + timedelta(hours=4))
+        self.assertEqual(busy, {
+            host.id: [(start + timedelta(hours=index), start + timedelta(hours=index, minutes=30))]
+            for index, host in enumerate(hosts)
+        })
+
+    def test_hosts_are_queried_in_one_batch_request(self):
+        start = datetime(2031, 3, 3, 9, tzinfo=timezone.utc)
+        hosts = self.create_hosts(3, start)
+        busy = EventHelper().get_busy_intervals_for_users(hosts, start, start + timedelta(hours=4))
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(busy, {
+            host.id: [(start + timedelta(hours=index), start + timedelta(hours=index, minutes=30))]
+            for index, host in enumerate(hosts)
+        })
+
+    def test_batches_are_split_at_the_batch_size(self):
+        start = datetime(2031, 3, 3, 9, tzinfo=timezone.utc)
+        hosts = self.create_hosts(5, start)
+        with mock.patch('users.helpers.event_helper.GOOGLE_BATCH_SIZE', 2):
+            busy = EventHelper().get_busy_intervals_for_users(hosts, start, start + timedelta(hours=6))
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual([len(busy[host.id]) for host in hosts], [1] * 5)
+
+    def test_failed_batch_falls_back_to_the_cached_busy_times(self):
+        busy_interval_cache._days.clear()
+        calendar_read_breaker.reset()
+        self.addCleanup(calendar_read_breaker.reset)
+        start = datetime(2031, 3, 3, 9, tzinfo=timezone.utc)
+        hosts = self.create_hosts(2, start)
+        fresh = EventHelper().get_busy_intervals_for_users(hosts, start, start + timedelta(hours=4))
+        self.server.error_rate = 1.0
+        cached = EventHelper().get_busy_intervals_for_users(hosts, start, start + timedelta(hours=4))
+        self.assertEqual(self.server.request_count, 2)
+        self.assertEqual(cached, fresh)
+
+
+
+class CollectiveAvailabilityTests(TestCase):
+
+    def setUp(self):
+        self.zone = pytz.timezone(DEFAULT_TIMEZONE)
+        self.monday = self.zone.localize(datetime(2031, 3, 3))
+        self.hosts = []
+        for index, slots in enumerate([
+            [(time(9), time(12)), (time(13), time(17))],
+            [(time(8), time(10, 30)), (time(10, 30), time(15))],
+            [(time(9, 30), time(16))],
+        ]):
+            host = User.objects.create_user(email=f'host{index}@example.com', password='secret', name='Host')
+            for start_time, end_time in slots:
+                UserAvailabilitySlot.objects.create(user=host, day_of_week=DaysOfWeek.MONDAY,
+                                                    start_time=start_time, end_time=end_time)
+            self.hosts.append(User.objects.get(id=host.id))
+
+    def at(self, hour, minute=0):
+        return self.monday + timedelta(hours=hour, minutes=minute)
+
+    def busy_intervals(self, users, start_datetime, end_datetime):
+        first, second, third = self.hosts
+        return {
+            # overlapping busy intervals of one host are merged
+            first.id: [(self.at(11, 10), self.at(11, 30)), (self.at(11), self.at(11, 15))],
+            # busy time outside the host's hours changes nothing
+            second.id: [(self.at(7), self.at(8, 30))],
+            third.id: [(self.at(14), self.at(14, 45))],
+        }
+
+    def test_sweep_intersects_hours_and_subtracts_busy_time(self):
+        helper = CollectiveAvailabilityHelper()
+        with mock.patch.object(helper.event_helper, 'get_busy_intervals_for_users', self.busy_intervals):
+            free = helper.get_free_intervals(self.hosts, self.monday, self.monday + timedelta(days=1))
+            self.assertTrue(helper.check_availability(self.hosts, self.at(9, 30), self.at(11)))
+            self.assertFalse(helper.check_availability(self.hosts, self.at(10, 45), self.at(11, 15)))
+            self.assertFalse(helper.check_availability(self.hosts, self.at(11, 45), self.at(13, 15)))
+            slots = helper.find_slots(self.hosts, self.monday, self.monday + timedelta(days=1), timedelta(minutes=30))
+        self.assertEqual(free, [
+            (self.at(9, 30), self.at(11)),
+            (self.at(11, 30), self.at(12)),
+            (self.at(13), self.at(14)),
+            (self.at(14, 45), self.at(15)),
+        ])
+        self.assertEqual(slots, [
+            self.at(9, 30), self.at(9, 45), self.at(10), self.at(10, 15), self.at(10, 30),
+            self.at(11, 30),
+            self.at(13), self.at(13, 15), self.at(13, 30),
+        ])
+
+    def test_sweep_repeats_weekly_windows(self):
+        helper = CollectiveAvailabilityHelper()
+        with mock.patch.object(helper.event_helper, 'get_busy_intervals_for_users',
+                               lambda users, start, end: {}):
+            free = helper.get_free_intervals(self.hosts, self.monday, self.monday + timedelta(weeks=2))
+        self.assertEqual(free, [
+            (self.at(hours + 9, 30), self.at(hours + 12)) if index % 2 == 0 else
+            (self.at(hours + 13), self.at(hours + 15))
+            for hours in (0, 24 * 7) for index in range(2)
+        ])
+
+    def test_non_numeric_user_ids_are_rejected(self):
+        utils = EventUtils()
+        data, status_code = utils.check_collective_availability(
+            user_ids=[self.hosts[0].id, 'abc'], start_datetime='2031-03-03T10:00:00Z',
+            end_datetime='2031-03-03T10:30:00Z')
+        self.assertEqual((data, status_code), ({"error": "User ids must be integers"}, 400))
+        data, status_code = utils.get_collective_slots(
+            user_ids=['1', '2;'], start_date=['2031-03-03'], end_date=['2031-03-03'], duration=['30'])
+        self.assertEqual((data, status_code), ({"error": "User ids must be integers"}, 400))
+
+    def test_repeated_user_ids_count_once(self):
+        with mock.patch.object(CollectiveAvailabilityHelper, 'check_availability', return_value=True):
+            data, status_code = EventUtils().check_collective_availability(
+                user_ids=[self.hosts[0].id, str(self.hosts[0].id)], start_datetime='2031-03-03T10:00:00Z',
+                end_datetime='2031-03-03T10:30:00Z')
+        self.assertEqual(status_code, 200)
+
+
+class GoogleTokenManagerTests(TestCase):
+
+    def setUp(self):
+        token_manager._credentials.clear()
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                             google_access_token='old-token', google_refresh_token='refresh')
+
+    @staticmethod
+    def fake_refresh(credentials, request):
+        credentials.token = 'new-token'
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    def test_tokens_without_expiry_are_reread(self):
+        self.assertEqual(token_manager.get_credentials(self.user).token, 'old-token')
+        User.objects.filter(id=self.user.id).update(google_access_token='rotated-token')
+        self.user.refresh_from_db()
+        self.assertEqual(token_manager.get_credentials(self.user).token, 'rotated-token')
+
+    def test_refresh_stores_the_new_token_unless_a_fresher_one_exists(self):
+        with mock.patch.object(Credentials, 'refresh', autospec=True, side_effect=self.fake_refresh):
+            self.assertEqual(token_manager.refresh(self.user.id).token, 'new-token')
+            self.user.refresh_from_db()
+            self.assertEqual(self.user.google_access_token, 'new-token')
+            self.assertEqual(token_manager.get_cached_credentials(self.user.id).token, 'new-token')
+
+            later = datetime.now(timezone.utc) + timedelta(hours=2)
+            User.objects.filter(id=self.user.id).update(google_access_token='other-process-token',
+                                                        google_token_expiry=later)
+            token_manager.refresh(self.user.id, margin=timedelta(hours=3))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.google_access_token, 'other-process-token')
+
+
+    def test_token_valid_beyond_the_margin_is_not_refreshed(self):
+        User.objects.filter(id=self.user.id).update(
+            google_token_expiry=datetime.now(timezone.utc) + timedelta(minutes=5))
+        with mock.patch.object(Credentials, 'refresh', autospec=True, side_effect=self.fake_refresh) as refresh:
+            self.assertEqual(token_manager.refresh(self.user.id).token, 'old-token')
+            self.assertEqual(token_manager.refresh(self.user.id, margin=timedelta(minutes=1)).token, 'old-token')
+            refresh.assert_not_called()
+            self.assertEqual(token_manager.refresh(self.user.id, margin=timedelta(minutes=10)).token, 'new-token')
+        refresh.assert_called_once()
+
+
+class GoogleTokenRefreshConcurrencyTests(TransactionTestCase):
+    """
+    Refreshing threads need their own database connections, which only see
+    committed rows.
+    """
+
+    def setUp(self):
+        token_manager._credentials.clear()
+        self.user = User.objects.create_user(
+            email='host@example.com', password='secret', name='Host', google_access_token='old-token',
+            google_refresh_token='refresh', google_token_expiry=datetime.now(timezone.utc) - timedelta(minutes=1))
+        self.refreshes = 0
+
+    def fake_refresh(self, credentials, request):
+        self.refreshes += 1
+        time_module.sleep(0.2)
+        credentials.token = f'new-token-{self.refreshes}'
+        credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    def refresh_concurrently(self, managers):
+        tokens = []
+
+        def refresh(manager):
+            try:
+                tokens.append(manager.refresh(self.user.id).token)
+            finally:
+                connection.close()
+
+        with mock.patch.object(Credentials, 'refresh', autospec=True,
+                               side_effect=lambda credentials, request: self.fake_refresh(credentials, request)):
+            threads = [threading.Thread(target=refresh, args=(manager,)) for manager in managers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return tokens
+
+    def test_threads_refresh_once(self):
+        self.assertEqual(self.refresh_concurrently([token_manager] * 4), ['new-token-1'] * 4)
+        self.assertEqual(self.refreshes, 1)
+
+    @skipUnless(connection.vendor == 'postgresql', "cross-process locking uses Postgres advisory locks")
+    def test_processes_refresh_once(self):
+        # separate managers share nothing in memory, like separate worker processes
+        self.assertEqual(self.refresh_concurrently([GoogleTokenManager() for _ in range(4)]), ['new-token-1'] * 4)
+        self.assertEqual(self.refreshes, 1)
+
+
+class AvailabilityBitmapTests(TestCase):
+
+    def test_bitmap_covers_only_whole_slots(self):
+        bitmap = AvailabilityBitmap.from_slots([
+            (1, time(9), time(12)),  # Monday
+            (3, time(9, 5), time(10, 5)),  # Wednesday, rounded inwards to 09:15-10:00
+        ])
+        monday = datetime(2024, 9, 16)
+        self.assertTrue(bitmap.covers(monday.replace(hour=9), monday.replace(hour=12)))
+        self.assertFalse(bitmap.covers(monday.replace(hour=11, minute=30), monday.replace(hour=12, minute=30)))
+        self.assertFalse(bitmap.covers(monday.replace(day=17, hour=9), monday.replace(day=17, hour=10)))
+        wednesday = datetime(2024, 9, 18)
+        self.assertTrue(bitmap.covers(wednesday.replace(hour=9, minute=15), wednesday.replace(hour=10)))
+        self.assertFalse(bitmap.covers(wednesday.replace(hour=9, minute=5), wednesday.replace(hour=10)))
+        self.assertEqual(list(bitmap.iter_day_runs(0)), [(36, 48)])
+        self.assertEqual(AvailabilityBitmap.from_bytes(bitmap.to_bytes()).bits, bitmap.bits)
+
+    def test_adjacent_slots_cover_a_booking_together(self):
+        bitmap = AvailabilityBitmap.from_slots([(1, time(9), time(10)), (1, time(10), time(11))])
+        monday = datetime(2024, 9, 16)
+        self.assertTrue(bitmap.covers(monday.replace(hour=9, minute=30), monday.replace(hour=10, minute=30)))
+        gap = AvailabilityBitmap.from_slots([(1, time(9), time(10)), (1, time(10, 15), time(11))])
+        self.assertFalse(gap.covers(monday.replace(hour=9, minute=30), monday.replace(hour=10, minute=30)))
+
+    def test_bookings_do_not_run_past_midnight(self):
+        # a slot ends before midnight, so the day's last quarter hour is never available
+        bitmap = AvailabilityBitmap.from_slots([(2, time(22), time(23, 59, 59)), (3, time(0), time(2))])
+        tuesday = datetime(2024, 9, 17, 23)
+        self.assertTrue(bitmap.covers(tuesday, tuesday + timedelta(minutes=45)))
+        self.assertFalse(bitmap.covers(tuesday, tuesday + timedelta(hours=1, minutes=30)))
+        self.assertFalse(bitmap.covers(tuesday.replace(minute=45), tuesday + timedelta(hours=1)))
+        self.assertTrue(bitmap.covers(datetime(2024, 9, 18, 0), datetime(2024, 9, 18, 1, 30)))
+
+    def test_ranges_wrap_from_sunday_into_monday(self):
+        sunday = datetime(2024, 9, 22, 23)
+        bitmap = AvailabilityBitmap.from_slots([(7, time(22), time(23, 59, 59)), (1, time(0), time(2))])
+        self.assertFalse(bitmap.covers(sunday, sunday + timedelta(hours=2)))
+        # the week is a ring: the Monday morning bits follow the Sunday night ones
+        bitmap = AvailabilityBitmap(AvailabilityBitmap._mask(SLOTS_PER_WEEK - 4, SLOTS_PER_WEEK + 4))
+        self.assertEqual(list(bitmap.iter_day_runs(0)), [(0, 4)])
+        self.assertEqual(list(bitmap.iter_day_runs(6)), [(92, 96)])
+        self.assertTrue(bitmap.covers(sunday, sunday + timedelta(hours=2)))
+        self.assertFalse(bitmap.covers(sunday, sunday + timedelta(hours=2, minutes=15)))
+        self.assertFalse(bitmap.covers(sunday - timedelta(minutes=15), sunday + timedelta(hours=1)))
+
+    def test_bookings_off_the_quarter_hour_need_the_whole_quarter_hours(self):
+        bitmap = AvailabilityBitmap.from_slots([(1, time(9), time(10))])
+        monday = datetime(2024, 9, 16)
+        self.assertTrue(bitmap.covers(monday.replace(hour=9, minute=5), monday.replace(hour=9, minute=50)))
+        self.assertFalse(bitmap.covers(monday.replace(hour=8, minute=55), monday.replace(hour=9, minute=30)))
+        self.assertFalse(bitmap.covers(monday.replace(hour=9, minute=30), monday.replace(hour=10, minute=1)))
+        self.assertFalse(bitmap.covers(monday.replace(hour=9, minute=30), monday.replace(hour=9, minute=30)))
+
+    def test_slots_rebuild_the_bitmap(self):
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        UserAvailabilitySlot.objects.create(user=user, day_of_week=2, start_time=time(9), end_time=time(10))
+        user.refresh_from_db()
+        tuesday = datetime(2024, 9, 17, 9)
+        self.assertTrue(user.get_availability_bitmap().covers(tuesday, tuesday + timedelta(hours=1)))
+
+    def test_overlaps_off_the_quarter_hour_are_rejected(self):
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        UserAvailabilitySlot.objects.create(user=user, day_of_week=1, start_time=time(9, 5), end_time=time(10, 5))
+        with self.assertRaises(ValidationError):
+            UserAvailabilitySlot(user=user, day_of_week=1, start_time=time(8, 10), end_time=time(9, 10)).clean()
+        UserAvailabilitySlot(user=user, day_of_week=1, start_time=time(10, 5), end_time=time(11, 5)).clean()
+
+
+@override_settings(GOOGLE_QUOTA_ENABLED=False)
+class UpcomingEventsTests(TestCase):
+
+    def test_cursor_repeats_the_first_page_time_min(self):
+        token_manager._credentials.clear()
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host',
+                                        google_access_token='events-token')
+        start = datetime.now(timezone.utc) + timedelta(days=1)
+        with FakeCalendarServer() as server, override_settings(GOOGLE_API_ROOT_URL=server.root_url):
+            for hour in range(3):
+                begins = start + timedelta(hours=hour)
+                server.add_event('events-token', begins, begins + timedelta(minutes=30), summary=f'Meeting {hour}')
+            utils = EventUtils()
+            data, status_code = utils.get_user_events(user_id=[str(user.id)], page_size=['2'])
+            self.assertEqual([event['summary'] for event in data['data']], ['Meeting 0', 'Meeting 1'])
+            time_min, page_token = decode_events_cursor(data['next_cursor'])
+            self.assertLessEqual(datetime.fromisoformat(time_min), datetime.now(timezone.utc))
+            data, status_code = utils.get_user_events(
+                user_id=[str(user.id)], page_size=['2'], cursor=[data['next_cursor']])
+            self.assertEqual([event['summary'] for event in data['data']], ['Meeting 2'])
+            self.assertIsNone(data['next_cursor'])
+            _, status_code = utils.get_user_events(user_id=[str(user.id)], cursor=[page_token])
+        self.assertEqual(status_code, 400)
+
+    def test_flags_are_parsed_as_booleans(self):
+        self.assertFalse(parse_flag(['0']))
+        self.assertFalse(parse_flag('false'))
+        self.assertTrue(parse_flag(['true']))
+        self.assertTrue(parse_flag(True))
+        self.assertTrue(parse_flag(None, default=True))
+
+
+class AvailabilityImportTests(TestCase):
+
+    def setUp(self):
+        self.helper = AvailabilityImportHelper()
+
+    @staticmethod
+    def create_hosts(count):
+        hosts = [User.objects.create_user(email=f'host{index}@example.com', password='secret', name='Host')
+                 for index in range(count)]
+        UserAvailabilitySlot.objects.bulk_create(
+            UserAvailabilitySlot(user=host, day_of_week=1, start_time=time(9), end_time=time(12)) for host in hosts)
+        return hosts
+
+    @staticmethod
+    def slots_of(user):
+        return set(UserAvailabilitySlot.objects.filter(user=user).values_list('day_of_week', 'start_time', 'end_time'))
+
+    def test_replace_drops_and_merge_keeps_existing_slots(self):
+        [host] = self.create_hosts(1)
+        tuesday = (2, time(13), time(17))
+        self.assertEqual(self.helper.save_schedules({host.id: [tuesday]}, ScheduleMode.MERGE), {})
+        self.assertEqual(self.slots_of(host), {(1, time(9), time(12)), tuesday})
+        self.assertEqual(self.helper.save_schedules({host.id: [tuesday]}, ScheduleMode.REPLACE), {})
+        self.assertEqual(self.slots_of(host), {tuesday})
+        host.refresh_from_db()
+        self.assertEqual(host.availability_bitmap, AvailabilityBitmap.from_slots([tuesday]).to_bytes())
+
+    def test_overlapping_schedule_is_rejected_and_left_untouched(self):
+        hosts = self.create_hosts(2)
+        errors = self.helper.save_schedules({
+            hosts[0].id: [(1, time(11), time(13))],
+            hosts[1].id: [(3, time(9), time(10))],
+        }, ScheduleMode.MERGE)
+        self.assertEqual(errors, {hosts[0].id: "Slots Monday 09:00-12:00 and Monday 11:00-13:00 overlap"})
+        self.assertEqual(self.slots_of(hosts[0]), {(1, time(9), time(12))})
+        self.assertEqual(self.slots_of(hosts[1]), {(1, time(9), time(12)), (3, time(9), time(10))})
+        self.assertIsNone(self.helper.find_overlap([(1, time(9), time(10)), (1, time(10), time(11))]))
+
+    def test_query_count_does_not_grow_with_users(self):
+        counts = []
+        for hosts in (self.create_hosts(1), [User.objects.create_user(
+                email=f'other{index}@example.com', password='secret', name='Host') for index in range(5)]):
+            UserAvailabilitySlot.objects.bulk_create(
+                UserAvailabilitySlot(user=host, day_of_week=day, start_time=time(9), end_time=time(12))
+                for host in hosts for day in (4, 5))
+            schedules = {host.id: [(2, time(9), time(12)), (3, time(9), time(12))] for host in hosts}
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.helper.save_schedules(schedules, ScheduleMode.REPLACE), {})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_set_availability_slots_validates_each_slot(self):
+        [host] = self.create_hosts(1)
+        utils = UserAvailabilitySlotUtils()
+        data, status_code = utils.set_availability_slots(user_id=host.id, slots=[
+            {'day_of_week': 'Friday', 'start_time': '09:00', 'end_time': '10:00'},
+            {'day_of_week': 'Funday', 'start_time': '09:00', 'end_time': '10:00'},
+        ])
+        self.assertEqual((status_code, data['data']), (400, {1: "Invalid day of week"}))
+        _, status_code = utils.set_availability_slots(user_id=host.id, slots=[
+            {'day_of_week': 'Friday', 'start_time': '09:00', 'end_time': '10:00'}])
+        self.assertEqual(status_code, 200)
+        self.assertEqual(self.slots_of(host), {(5, time(9), time(10))})
+
+    def test_import_command_reads_csv(self):
+        hosts = self.create_hosts(2)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("email,day_of_week,start_time,end_time\n"
+                    "host0@example.com,Tuesday,09:00,11:00\n"
+                    "host1@example.com,Tuesday,25:00,11:00\n"
+                    "nobody@example.com,Tuesday,09:00,11:00\n")
+        self.addCleanup(os.remove, f.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_availability', f.name, stdout=stdout, stderr=stderr)
+        self.assertIn("Imported schedules of 1 user(s), 1 rejected", stdout.getvalue())
+        self.assertIn("Row 3: user not found", stderr.getvalue())
+        self.assertEqual(self.slots_of(hosts[0]), {(2, time(9), time(11))})
+        self.assertEqual(self.slots_of(hosts[1]), {(1, time(9), time(12))})
+
+
+class DoubleBookingConstraintTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        self.event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                                   start_date=datetime(2030, 1, 1).date(),
+                                                   end_date=datetime(2030, 12, 31).date())
+        self.start = datetime(2030, 1, 7, 4, 30, tzinfo=timezone.utc)
+
+    def create_event(self, status=EventStatus.CONFIRMED, start=None, end=None):
+        return Event.objects.create(event_type=self.event_type, guest_email='guest@example.com', description='',
+                                    user=self.user, start_datetime=start, end_datetime=end, status=status)
+
+    @staticmethod
+    def integrity_error(pgcode):
+        # the driver error Django wraps carries the SQLSTATE
+        cause = Exception()
+        cause.pgcode = pgcode
+        error = IntegrityError()
+        error.__cause__ = cause
+        return error
+
+    def book(self):
+        # another request booked the slot after this one checked availability
+        with mock.patch.object(EventHelper, 'check_user_availability', return_value=True):
+            return EventUtils().create_event(
+                event_type_id=self.event_type.id, guest_email='late@example.com', user_id=self.user.id,
+                description='Intro call', start_datetime='2030-01-07T10:00:00Z', end_datetime='2030-01-07T10:30:00Z')
+
+    def test_only_exclusion_violations_count_as_conflicts(self):
+        self.assertTrue(is_booking_conflict(self.integrity_error('23P01')))
+        self.assertFalse(is_booking_conflict(self.integrity_error('23505')))
+        self.assertFalse(is_booking_conflict(IntegrityError()))
+
+    def test_conflict_is_reported_without_creating_the_event(self):
+        with mock.patch.object(EventDataUtils, 'create_event', side_effect=self.integrity_error('23P01')):
+            data, status_code = self.book()
+        self.assertEqual((status_code, data), (400, {"error": "User is not available at this time"}))
+        self.assertFalse(Event.objects.exists())
+
+    @skipUnless(connection.vendor == 'postgresql', "event_no_double_booking is a Postgres exclusion constraint")
+    def test_database_rejects_overlapping_booking(self):
+        self.create_event(start=self.start, end=self.start + timedelta(minutes=30))
+        data, status_code = self.book()
+        self.assertEqual((status_code, data), (400, {"error": "User is not available at this time"}))
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertFalse(Event.objects.filter(status=EventStatus.PENDING).exists())
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            self.create_event(start=self.start + timedelta(minutes=15), end=self.start + timedelta(minutes=45))
+        self.assertTrue(is_booking_conflict(raised.exception))
+
+    @skipUnless(connection.vendor == 'postgresql', "event_no_double_booking is a Postgres exclusion constraint")
+    def test_failed_and_untimed_events_hold_no_slot(self):
+        self.create_event(EventStatus.FAILED, self.start, self.start + timedelta(minutes=30))
+        self.create_event(EventStatus.FAILED, self.start, self.start + timedelta(minutes=30))
+        self.create_event()
+        self.create_event()
+        self.create_event(start=self.start, end=self.start + timedelta(minutes=30))
+        self.assertEqual(Event.objects.count(), 5)
+
+
+class SlotHoldTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        self.event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                                   start_date=datetime(2030, 1, 1).date(),
+                                                   end_date=datetime(2030, 12, 31).date())
+        self.start = datetime(2030, 1, 7, 4, 30, tzinfo=timezone.utc)
+        self.end = self.start + timedelta(minutes=30)
+        self.helper = SlotHoldHelper()
+        patcher = mock.patch.object(EventHelper, 'check_user_availability', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def hold(self, expires_in=timedelta(minutes=5), start=None):
+        start = start or self.start
+        return SlotHold.objects.create(user=self.user, guest_email='guest@example.com', start_datetime=start,
+                                       end_datetime=start + timedelta(minutes=30),
+                                       expires_at=datetime.now(timezone.utc) + expires_in)
+
+    def book(self, hold_token):
+        return EventUtils().create_event(
+            event_type_id=self.event_type.id, guest_email='guest@example.com', user_id=self.user.id,
+            description='Intro call', start_datetime='2030-01-07T10:00:00Z', end_datetime='2030-01-07T10:30:00Z',
+            hold_token=str(hold_token), async_booking='true')
+
+    @skipUnless(connection.vendor == 'postgresql', "slot_hold_no_overlap is a Postgres exclusion constraint")
+    def test_overlapping_hold_is_rejected(self):
+        self.assertIsNotNone(self.helper.place_hold(self.user, 'first@example.com', self.start, self.end))
+        self.assertIsNone(self.helper.place_hold(
+            self.user, 'second@example.com', self.start + timedelta(minutes=15), self.end + timedelta(minutes=15)))
+        data, status_code = EventUtils().hold_slot(
+            user_id=self.user.id, guest_email='third@example.com',
+            start_datetime='2030-01-07T10:00:00Z', end_datetime='2030-01-07T10:30:00Z')
+        self.assertEqual((status_code, data), (409, {"error": "User is not available at this time"}))
+        self.assertEqual(SlotHold.objects.count(), 1)
+
+    def test_expired_hold_is_cleared_before_insert(self):
+        expired = self.hold(expires_in=-timedelta(seconds=1))
+        hold = self.helper.place_hold(self.user, 'next@example.com', self.start, self.end)
+        self.assertEqual(list(SlotHold.objects.values_list('token', flat=True)), [hold.token])
+        self.assertNotEqual(hold.token, expired.token)
+
+    def test_hold_is_consumed_by_the_booking(self):
+        hold = self.hold()
+        _, status_code = self.book(hold.token)
+        self.assertEqual(status_code, 202)
+        self.assertFalse(SlotHold.objects.exists())
+        self.assertEqual(Event.objects.get().status, EventStatus.PENDING)
+        data, status_code = self.book(hold.token)
+        self.assertEqual((status_code, data),
+                         (409, {"error": "Slot hold has expired or does not match this booking"}))
+
+    def test_hold_survives_a_booking_that_rolls_back(self):
+        hold = self.hold()
+        with mock.patch.object(CalendarJobHelper, 'enqueue_event', side_effect=IntegrityError('job insert failed')):
+            _, status_code = self.book(hold.token)
+        self.assertEqual(status_code, 400)
+        self.assertTrue(SlotHold.objects.filter(token=hold.token).exists())
+        self.assertFalse(Event.objects.exists())
+
+    def test_release_slot_hold(self):
+        hold = self.hold()
+        utils = EventUtils()
+        self.assertEqual(utils.release_slot_hold(hold_token='not-a-token')[1], 400)
+        self.assertEqual(utils.release_slot_hold(hold_token=str(hold.token))[1], 200)
+        self.assertEqual(utils.release_slot_hold(hold_token=str(hold.token))[1], 404)
+
+    def test_sweep_deletes_expired_holds_in_one_query(self):
+        counts = []
+        for holds in (1, 10):
+            for offset in range(holds):
+                self.hold(expires_in=-timedelta(seconds=1), start=self.start + timedelta(hours=offset))
+            active = self.hold(start=self.start - timedelta(hours=1))
+            stdout = io.StringIO()
+            with CaptureQueriesContext(connection) as queries:
+                call_command('sweep_slot_holds', stdout=stdout)
+            counts.append(len(queries))
+            self.assertIn(f"Removed {holds} expired slot hold(s)", stdout.getvalue())
+            self.assertEqual(list(SlotHold.objects.values_list('token', flat=True)), [active.token])
+            active.delete()
+        self.assertEqual(counts, [1, 1])
+
+
+class ScheduleETagTests(TestCase):
+    databases = {'default', REPLICA_DB_ALIAS}
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        self.url = f'/api/users/get_availability_slots/?user_id={self.user.id}'
+
+    def get(self, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(self.url, headers=headers)
+
+    def test_matching_etag_is_answered_with_304(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+        self.assertEqual(self.get('"other"').status_code, 200)
+
+    def test_etag_changes_with_the_schedule(self):
+        etags = [self.get()['ETag']]
+        UserAvailabilitySlot.objects.create(user=self.user, day_of_week=1, start_time=time(9), end_time=time(12))
+        etags.append(self.get()['ETag'])
+        event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=self.user,
+                                              start_date='2030-01-01', end_date='2030-12-31')
+        etags.append(self.get()['ETag'])
+        event_type.name = 'Renamed'
+        event_type.save()
+        etags.append(self.get()['ETag'])
+        Event.objects.create(event_type=event_type, guest_email='guest@example.com', description='', user=self.user,
+                             start_datetime=datetime(2030, 1, 7, 4, 30, tzinfo=timezone.utc),
+                             end_datetime=datetime(2030, 1, 7, 5, tzinfo=timezone.utc))
+        etags.append(self.get()['ETag'])
+        self.assertEqual(len(set(etags)), 5)
+        self.assertEqual(self.get(etags[-1]).status_code, 304)
+
+    @override_settings(DATABASE_ROUTERS=['SchedulEase.db_router.ReplicaRouter'])
+    def test_lagging_replica_neither_answers_304_nor_serves_an_old_body(self):
+        lag_monitor.reset()
+        with mock.patch.object(lag_monitor, 'measure_lag', return_value=0.0):
+            # the replica still has the user as they were before adding a slot
+            User.objects.db_manager(REPLICA_DB_ALIAS).create_user(
+                id=self.user.id, email='host@example.com', password='secret', name='Host')
+            old_etag = self.get()['ETag']
+            UserAvailabilitySlot.objects.create(user=self.user, day_of_week=1, start_time=time(9), end_time=time(12))
+            response = self.get(old_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], old_etag)
+        self.assertEqual(response.json()['data'],
+                         [{'day_of_week': 'Monday', 'start_time': '09:00:00', 'end_time': '12:00:00'}])
+
+
+class SlotFinderTests(TestCase):
+
+    def setUp(self):
+        self.zone = pytz.timezone(DEFAULT_TIMEZONE)
+        self.monday = datetime(2030, 1, 7).date()
+        self.bitmap = AvailabilityBitmap.from_slots([(1, time(9), time(11)), (3, time(14), time(15, 30))])
+
+    def at(self, hour, minute=0, days=0):
+        return self.zone.localize(datetime.combine(self.monday + timedelta(days=days), time(hour, minute)))
+
+    def local(self, hour, minute=0, days=0):
+        return self.at(hour, minute, days).replace(tzinfo=None)
+
+    def find(self, busy=(), duration=timedelta(minutes=30), days=7, not_before=None):
+        return find_open_slots(self.bitmap, busy, self.monday, self.monday + timedelta(days=days - 1), duration,
+                               self.zone, not_before).tolist()
+
+    def loop_slots(self, busy, duration, days):
+        """
+        Straightforward reference: try every quarter hour and check each of
+        the cells the meeting would take.
+        """
+        step = timedelta(minutes=15)
+        slots = []
+        start = self.at(0)
+        while start + duration <= self.at(0, days=days):
+            cells = [start + step * index for index in range(-(-duration // step))]
+            free = all(
+                self.bitmap.bits >> (cell.weekday() * 96 + (cell.hour * 60 + cell.minute) // 15) & 1
+                and not any(busy_start < cell + step and busy_end > cell for busy_start, busy_end in busy)
+                for cell in (cell.astimezone(self.zone) for cell in cells)
+            )
+            if free:
+                slots.append(start.replace(tzinfo=None))
+            start = self.zone.normalize(start + step)
+        return slots
+
+    def test_slots_fit_inside_availability_boundaries(self):
+        local = self.local
+        self.assertEqual(self.find(days=1), [local(9), local(9, 15), local(9, 30), local(9, 45), local(10),
+                                             local(10, 15), local(10, 30)])
+        self.assertEqual(self.find(duration=timedelta(minutes=45), days=3),
+                         [local(9), local(9, 15), local(9, 30), local(9, 45), local(10), local(10, 15),
+                          local(14, days=2), local(14, 15, days=2), local(14, 30, days=2), local(14, 45, days=2)])
+        self.assertEqual(self.find(duration=timedelta(hours=3)), [])
+
+    def test_busy_time_cuts_through_slots(self):
+        local = self.local
+        busy = [(self.at(9, 40), self.at(10, 5))]
+        self.assertEqual(self.find(busy, days=1), [local(9), local(10, 15), local(10, 30)])
+        self.assertEqual(self.find(days=1, not_before=self.at(10, 20)), [local(10, 30)])
+
+    def test_matches_the_reference_loop(self):
+        busy = [(self.at(9, 40), self.at(10, 5)), (self.at(14, 50, days=2), self.at(15, days=2)),
+                (self.at(23, days=5), self.at(9, 20, days=7))]
+        for minutes in (10, 15, 30, 50, 90):
+            duration = timedelta(minutes=minutes)
+            self.assertEqual(self.find(busy, duration, days=14), self.loop_slots(busy, duration, 14))
+
+    def test_interval_search_matches_the_grid_search(self):
+        busy = [(self.at(9, 40), self.at(10, 5))]
+        open_intervals = [(self.at(9), self.at(11)), (self.at(14, days=2), self.at(15, 30, days=2))]
+        for minutes in (15, 30, 45):
+            duration = timedelta(minutes=minutes)
+            self.assertEqual(
+                find_slots_in_intervals(open_intervals, busy, self.monday, duration, self.zone).tolist(),
+                self.find(busy, duration))
+
+    def test_empty_availability_has_no_slots(self):
+        self.bitmap = AvailabilityBitmap()
+        self.assertEqual(self.find(), [])
+        self.assertEqual(self.loop_slots([], timedelta(minutes=30), 7), [])
+        self.assertEqual(find_slots_in_intervals([], [], self.monday, timedelta(minutes=30), self.zone).tolist(), [])
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=30), user=user,
+                                              start_date=self.monday, end_date=self.monday + timedelta(days=6))
+        with mock.patch.object(EventHelper, 'get_busy_intervals', return_value=[]):
+            data, status_code = EventUtils().get_available_slots(event_type_id=[str(event_type.id)])
+        self.assertEqual((status_code, data['data']), (200, []))
+
+    def test_endpoint_lists_slots_with_their_end_times(self):
+        user = User.objects.create_user(email='host@example.com', password='secret', name='Host')
+        UserAvailabilitySlot.objects.create(user=user, day_of_week=1, start_time=time(9), end_time=time(10))
+        event_type = EventType.objects.create(name='Intro', duration=timedelta(minutes=45), user=user,
+                                              start_date=self.monday, end_date=self.monday + timedelta(days=6))
+        with mock.patch.object(EventHelper, 'get_busy_intervals', return_value=[]):
+            data, status_code = EventUtils().get_available_slots(event_type_id=[str(event_type.id)])
+        self.assertEqual(data['data'], [
+            {'start_time': '2030-01-07T09:00:00', 'end_time': '2030-01-07T09:45:00'},
+            {'start_time': '2030-01-07T09:15:00', 'end_time': '2030-01-07T10:00:00'},
+        ])